@@ -4,13 +4,16 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
 import logging
 
-from config.database import get_db
+from config.database import get_db, get_async_db
 from config.settings import settings
 from models.user import User
 from schemas.auth import Token, TokenData, UserCreate, UserResponse, UserLogin, AuthResponse
+from utils.cache import TTLCache
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -24,6 +27,9 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 # OAuth2 密码Bearer
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+# 用户缓存: 用户名 -> 与会话分离的用户快照
+_user_cache = TTLCache(maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """验证密码"""
     return pwd_context.verify(plain_password, hashed_password)
@@ -43,24 +49,62 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    """获取当前用户"""
-    credentials_exception = HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
+def _credentials_exception() -> HTTPException:
+    """认证失败时抛出的异常"""
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
         detail="无效的认证凭据",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def _get_token_username(token: str) -> str:
+    """解析访问令牌中的用户名，令牌无效时抛出401"""
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
-            raise credentials_exception
+            raise _credentials_exception()
         token_data = TokenData(username=username)
     except JWTError:
-        raise credentials_exception
-    user = db.query(User).filter(User.username == token_data.username).first()
+        raise _credentials_exception()
+    return token_data.username
+
+def _snapshot_user(user: User) -> User:
+    """复制用户的列属性，生成不属于任何会话的快照用于缓存"""
+    snapshot = User(**{attr.key: getattr(user, attr.key) for attr in User.__mapper__.column_attrs})
+    make_transient_to_detached(snapshot)
+    return snapshot
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+    """
+    获取当前用户
+
+    用户信息按用户名缓存 AUTH_CACHE_TTL 秒。命中缓存时通过 merge(load=False) 将快照复制到
+    当前会话，不查询数据库，返回的对象与查询得到的一样可以访问关系属性。
+    """
+    username = _get_token_username(token)
+    cached = _user_cache.get(username)
+    if cached is not None:
+        return db.merge(cached, load=False)
+
+    user = db.query(User).filter(User.username == username).first()
+    if user is None:
+        raise _credentials_exception()
+    _user_cache.set(username, _snapshot_user(user))
+    return user
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> User:
+    """获取当前用户（异步数据库会话），与 get_current_user 共用缓存"""
+    username = _get_token_username(token)
+    cached = _user_cache.get(username)
+    if cached is not None:
+        return await db.merge(cached, load=False)
+
+    result = await db.execute(select(User).where(User.username == username))
+    user = result.scalars().first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    _user_cache.set(username, _snapshot_user(user))
     return user
 
 # @router.post("/register", response_model=AuthResponse)
@@ -113,7 +157,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
 #     )
 
 @router.post("/login", response_model=AuthResponse)
-async def login(user_login: UserLogin, db: Session = Depends(get_db)):
+def login(user_login: UserLogin, db: Session = Depends(get_db)):
     """用户登录"""
     # 查找用户
     user = db.query(User).filter(User.username == user_login.username).first()
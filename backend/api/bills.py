@@ -1,15 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, func, desc
-from typing import List, Optional, Dict, Any
-from datetime import datetime, date
+from sqlalchemy import and_, or_, func, desc, tuple_, literal_column
+from typing import List, Optional, Dict, Any, Iterable, Tuple
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+import base64
+import json
 import logging
 
 from config.database import get_db
-from models.user import User
-from models.bill import Bill, BillCategory
-from models.family import FamilyMember
-from api.auth import get_current_user
+from config.settings import settings
+from models.bill import Bill, BillCategory, BillMonthlyRollup
+from api.deps import async_db_endpoint, get_current_family_ids
+from services.bill_import import invalidate_category_cache
+from services.bill_rollup import RollupDelta
+from utils.cache import TTLCache
 from schemas.bills import (
     BillResponse,
     BillListResponse,
@@ -27,16 +32,50 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/bills", tags=["bills"])
 
 
-async def get_user_families(user: User, db: Session) -> List[int]:
-    """获取用户所属的家庭ID列表"""
-    family_members = db.query(FamilyMember).filter(
-        FamilyMember.user_id == user.id
-    ).all()
-    return [fm.family_id for fm in family_members]
+# 游标分页支持的排序字段，均为非空列，保证 (排序字段, id) 组成稳定的全序
+CURSOR_SORT_FIELDS = ("transaction_time", "amount", "created_at", "id")
+
+# 游标分页的总数缓存: 筛选条件 -> 总数
+_bill_count_cache = TTLCache(maxsize=settings.BILL_COUNT_CACHE_SIZE, ttl=settings.BILL_COUNT_CACHE_TTL)
+
+
+def _encode_cursor(sort_by: str, sort_order: str, bill: Bill) -> str:
+    """将当前页最后一条账单的 (排序字段值, id) 编码为不透明的游标"""
+    value = getattr(bill, sort_by)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    elif isinstance(value, Decimal):
+        value = str(value)
+    payload = {"s": sort_by, "o": sort_order, "v": value, "id": bill.id}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort_by: str, sort_order: str) -> Tuple[Any, int]:
+    """解析游标，返回 (排序字段值, id)，游标无效或与当前排序不一致时抛出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        value, last_id = payload["v"], int(payload["id"])
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("游标格式错误")
+
+    if payload.get("s") != sort_by or payload.get("o") != sort_order:
+        raise ValueError("游标与当前排序方式不一致")
+
+    if sort_by in ("transaction_time", "created_at"):
+        value = datetime.fromisoformat(value)
+    elif sort_by == "amount":
+        # 与 Float 列一致按浮点数比较；Decimal(浮点数) 是二进制展开值，与数据库中的 DECIMAL 列比较时边界记录会重复或遗漏
+        value = float(value)
+    else:
+        value = int(value)
+    return value, last_id
 
 
 @router.get("/", response_model=ApiResponse[BillListResponse])
-async def get_bills(
+@async_db_endpoint
+def get_bills(
     page: int = Query(1, ge=1, description="页码"),
     size: int = Query(20, ge=1, le=100, description="每页大小"),
     family_id: Optional[int] = Query(None, description="家庭ID筛选"),
@@ -51,13 +90,20 @@ async def get_bills(
     search: Optional[str] = Query(None, description="搜索关键词"),
     sort_by: str = Query("transaction_time", description="排序字段"),
     sort_order: str = Query("desc", regex="^(asc|desc)$", description="排序顺序"),
-    current_user: User = Depends(get_current_user),
+    use_cursor: bool = Query(False, description="是否使用游标分页（首页请求时开启）"),
+    cursor: Optional[str] = Query(None, description="游标，取自上一页返回的next_cursor"),
+    user_family_ids: List[int] = Depends(get_current_family_ids),
     db: Session = Depends(get_db)
 ):
-    """获取账单列表"""
+    """
+    获取账单列表
+
+    默认使用页码分页；传入 use_cursor=true 或 cursor 时使用游标分页，
+    按 (排序字段, id) 定位下一页，翻页开销与页码深度无关。
+    """
     try:
-        # 获取用户所属家庭
-        user_family_ids = await get_user_families(current_user, db)
+        cursor_mode = use_cursor or cursor is not None
+
         if not user_family_ids:
             return ApiResponse(
                 data=BillListResponse(
@@ -106,7 +152,7 @@ async def get_bills(
         
         if end_date:
             # 结束日期包含当天，所以加1天
-            query = query.filter(Bill.transaction_time < end_date.replace(day=end_date.day + 1))
+            query = query.filter(Bill.transaction_time < end_date + timedelta(days=1))
         
         if min_amount is not None:
             query = query.filter(Bill.amount >= min_amount)
@@ -120,20 +166,51 @@ async def get_bills(
                 Bill.transaction_desc.ilike(search_term)
             )
         
-        # 排序
-        if hasattr(Bill, sort_by):
-            order_column = getattr(Bill, sort_by)
-            if sort_order == "desc":
-                query = query.order_by(desc(order_column))
-            else:
-                query = query.order_by(order_column)
+        # 排序，始终以 id 作为第二排序键，保证翻页时顺序稳定
+        if sort_by not in CURSOR_SORT_FIELDS and (cursor_mode or not hasattr(Bill, sort_by)):
+            sort_by = "transaction_time"
+        order_column = getattr(Bill, sort_by)
+        if sort_order == "desc":
+            ordered_query = query.order_by(desc(order_column), desc(Bill.id))
         else:
-            query = query.order_by(desc(Bill.transaction_time))
-        
-        # 分页
-        total = query.count()
-        offset = (page - 1) * size
-        bills = query.offset(offset).limit(size).all()
+            ordered_query = query.order_by(order_column, Bill.id)
+        
+        if not cursor_mode:
+            # 页码分页
+            total = query.count()
+            offset = (page - 1) * size
+            bills = ordered_query.offset(offset).limit(size).all()
+            next_cursor = None
+        else:
+            # 游标分页: 从上一页最后一条记录之后继续读取
+            if cursor:
+                try:
+                    last_value, last_id = _decode_cursor(cursor, sort_by, sort_order)
+                except ValueError as e:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"无效的游标: {e}"
+                    )
+                if sort_order == "desc":
+                    ordered_query = ordered_query.filter(tuple_(order_column, Bill.id) < tuple_(last_value, last_id))
+                else:
+                    ordered_query = ordered_query.filter(tuple_(order_column, Bill.id) > tuple_(last_value, last_id))
+            
+            bills = ordered_query.limit(size + 1).all()
+            next_cursor = None
+            if len(bills) > size:
+                bills = bills[:size]
+                next_cursor = _encode_cursor(sort_by, sort_order, bills[-1])
+            
+            # 总数只在首页精确统计，后续页使用缓存值
+            count_key = (
+                tuple(sorted(user_family_ids)), family_id, category_id, transaction_type, source_type,
+                merchant_name, start_date, end_date, min_amount, max_amount, search
+            )
+            total = _bill_count_cache.get(count_key) if cursor else None
+            if total is None:
+                total = query.count()
+                _bill_count_cache.set(count_key, total)
         
         # 计算总页数
         pages = (total + size - 1) // size
@@ -144,12 +221,15 @@ async def get_bills(
                 total=total,
                 page=page,
                 size=size,
-                pages=pages
+                pages=pages,
+                next_cursor=next_cursor
             ),
             success=True,
             message="获取账单列表成功"
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"获取账单列表失败: {e}")
         raise HTTPException(
@@ -158,18 +238,142 @@ async def get_bills(
         )
 
 
+def _aggregate_stats_grouping_sets(db: Session, conditions: list) -> List[tuple]:
+    """
+    使用 GROUPING SETS 在一次查询中完成汇总、分类、来源、月份四个维度的统计
+
+    返回 (维度, 维度值, 交易类型, 金额合计, 笔数) 列表
+    """
+    month = func.date_trunc(literal_column("'month'"), Bill.transaction_time)
+    grouping_id = func.grouping(BillCategory.category_name, Bill.source_type, month)
+    
+    rows = db.query(
+        grouping_id.label("grouping_id"),
+        BillCategory.category_name,
+        Bill.source_type,
+        month.label("month"),
+        Bill.transaction_type,
+        func.sum(Bill.amount).label("total_amount"),
+        func.count(Bill.id).label("count")
+    ).outerjoin(BillCategory, Bill.category_id == BillCategory.id)\
+     .filter(*conditions)\
+     .group_by(func.grouping_sets(
+        tuple_(Bill.transaction_type),
+        tuple_(BillCategory.category_name, Bill.transaction_type),
+        tuple_(Bill.source_type, Bill.transaction_type),
+        tuple_(month, Bill.transaction_type)
+     )).all()
+    
+    # GROUPING() 的位为1表示该列未参与分组：分类=4、来源=2、月份=1
+    stats_rows = []
+    for row in rows:
+        if row.grouping_id == 0b111:
+            stats_rows.append(("total", None, row.transaction_type, float(row.total_amount), row.count))
+        elif row.grouping_id == 0b011:
+            if row.category_name is not None:
+                stats_rows.append(("category", row.category_name, row.transaction_type, float(row.total_amount), row.count))
+        elif row.grouping_id == 0b101:
+            stats_rows.append(("source", row.source_type, row.transaction_type, float(row.total_amount), row.count))
+        elif row.grouping_id == 0b110:
+            stats_rows.append(("month", row.month.strftime("%Y-%m"), row.transaction_type, float(row.total_amount), row.count))
+    return stats_rows
+
+
+def _accumulate_stats_rows(rows: Iterable[tuple]) -> List[tuple]:
+    """
+    将 (分类名称, 来源, 月份, 交易类型, 金额, 笔数) 明细行汇总到各统计维度
+
+    返回 (维度, 维度值, 交易类型, 金额合计, 笔数) 列表
+    """
+    totals: Dict[tuple, list] = {}
+    for category_name, source_type, month, transaction_type, amount, count in rows:
+        keys = [
+            ("total", None),
+            ("source", source_type),
+            ("month", month.strftime("%Y-%m"))
+        ]
+        if category_name is not None:
+            keys.append(("category", category_name))
+        for dimension, key in keys:
+            total = totals.setdefault((dimension, key, transaction_type), [0.0, 0])
+            total[0] += float(amount)
+            total[1] += count
+    
+    return [
+        (dimension, key, transaction_type, amount, count)
+        for (dimension, key, transaction_type), (amount, count) in totals.items()
+    ]
+
+
+def _aggregate_stats_python(db: Session, conditions: list) -> List[tuple]:
+    """不支持 GROUPING SETS 的数据库（SQLite）：只查询统计所需的列，在 Python 中聚合"""
+    rows = db.query(
+        BillCategory.category_name,
+        Bill.source_type,
+        Bill.transaction_time,
+        Bill.transaction_type,
+        Bill.amount
+    ).outerjoin(BillCategory, Bill.category_id == BillCategory.id)\
+     .filter(*conditions).all()
+    
+    return _accumulate_stats_rows(
+        (row.category_name, row.source_type, row.transaction_time, row.transaction_type, row.amount, 1)
+        for row in rows
+    )
+
+
+def _is_month_aligned(start_date: Optional[date], end_date: Optional[date]) -> bool:
+    """日期范围是否按整月划分（开始于月初、结束于月末，未指定视为不限）"""
+    if start_date and start_date.day != 1:
+        return False
+    if end_date and (end_date + timedelta(days=1)).day != 1:
+        return False
+    return True
+
+
+def _aggregate_stats_rollup(
+    db: Session,
+    family_ids: List[int],
+    start_date: Optional[date],
+    end_date: Optional[date]
+) -> List[tuple]:
+    """按整月统计时直接读取月度汇总表，无需扫描账单明细"""
+    query = db.query(
+        BillCategory.category_name,
+        BillMonthlyRollup.source_type,
+        BillMonthlyRollup.month,
+        BillMonthlyRollup.transaction_type,
+        func.sum(BillMonthlyRollup.total_amount).label("total_amount"),
+        func.sum(BillMonthlyRollup.bill_count).label("count")
+    ).outerjoin(BillCategory, BillMonthlyRollup.category_id == BillCategory.id)\
+     .filter(BillMonthlyRollup.family_id.in_(family_ids))
+    
+    if start_date:
+        query = query.filter(BillMonthlyRollup.month >= start_date)
+    if end_date:
+        query = query.filter(BillMonthlyRollup.month <= end_date)
+    
+    rows = query.group_by(
+        BillCategory.category_name,
+        BillMonthlyRollup.source_type,
+        BillMonthlyRollup.month,
+        BillMonthlyRollup.transaction_type
+    ).all()
+    
+    return _accumulate_stats_rows(rows)
+
+
 @router.get("/stats", response_model=BillStatsResponse)
-async def get_bill_stats(
+@async_db_endpoint
+def get_bill_stats(
     family_id: Optional[int] = Query(None, description="家庭ID筛选"),
     start_date: Optional[date] = Query(None, description="开始日期"),
     end_date: Optional[date] = Query(None, description="结束日期"),
-    current_user: User = Depends(get_current_user),
+    user_family_ids: List[int] = Depends(get_current_family_ids),
     db: Session = Depends(get_db)
 ):
     """获取账单统计信息"""
     try:
-        # 获取用户所属家庭
-        user_family_ids = await get_user_families(current_user, db)
         if not user_family_ids:
             return BillStatsResponse(
                 total_income=0.0,
@@ -183,110 +387,59 @@ async def get_bill_stats(
                 by_month={}
             )
         
-        # 构建基础查询
-        query = db.query(Bill).filter(Bill.family_id.in_(user_family_ids))
-        
-        # 应用筛选条件
+        # 统计条件
+        conditions = [Bill.family_id.in_(user_family_ids)]
         if family_id and family_id in user_family_ids:
-            query = query.filter(Bill.family_id == family_id)
-        
+            conditions.append(Bill.family_id == family_id)
         if start_date:
-            query = query.filter(Bill.transaction_time >= start_date)
-        
+            conditions.append(Bill.transaction_time >= start_date)
         if end_date:
-            query = query.filter(Bill.transaction_time < end_date.replace(day=end_date.day + 1))
-        
-        # 基础统计
-        bills = query.all()
-        
-        total_income = sum(bill.amount for bill in bills if bill.transaction_type == "收入")
-        total_expense = sum(bill.amount for bill in bills if bill.transaction_type == "支出")
-        total_count = len(bills)
-        income_count = sum(1 for bill in bills if bill.transaction_type == "收入")
-        expense_count = sum(1 for bill in bills if bill.transaction_type == "支出")
-        avg_amount = sum(bill.amount for bill in bills) / total_count if total_count > 0 else 0
-        
-        # 按分类统计
+            # 结束日期包含当天
+            conditions.append(Bill.transaction_time < end_date + timedelta(days=1))
+        
+        # 按整月查询时读取月度汇总表；否则 PostgreSQL 用一条 GROUPING SETS 查询完成所有统计，
+        # 其他数据库在 Python 中聚合
+        if settings.STATS_USE_ROLLUP and _is_month_aligned(start_date, end_date):
+            stats_family_ids = [family_id] if family_id and family_id in user_family_ids else user_family_ids
+            stats_rows = _aggregate_stats_rollup(db, stats_family_ids, start_date, end_date)
+        elif db.get_bind().dialect.name == "postgresql":
+            stats_rows = _aggregate_stats_grouping_sets(db, conditions)
+        else:
+            stats_rows = _aggregate_stats_python(db, conditions)
+        
+        total_income = 0.0
+        total_expense = 0.0
+        total_count = 0
+        income_count = 0
+        expense_count = 0
+        total_amount = 0.0
         by_category = {}
-        category_stats = db.query(
-            BillCategory.category_name,
-            Bill.transaction_type,
-            func.sum(Bill.amount).label("total_amount"),
-            func.count(Bill.id).label("count")
-        ).join(Bill, Bill.category_id == BillCategory.id)\
-         .filter(Bill.family_id.in_(user_family_ids))
-        
-        if family_id and family_id in user_family_ids:
-            category_stats = category_stats.filter(Bill.family_id == family_id)
-        if start_date:
-            category_stats = category_stats.filter(Bill.transaction_time >= start_date)
-        if end_date:
-            category_stats = category_stats.filter(Bill.transaction_time < end_date.replace(day=end_date.day + 1))
-        
-        category_stats = category_stats.group_by(BillCategory.category_name, Bill.transaction_type).all()
-        
-        for stat in category_stats:
-            category_name = stat.category_name
-            if category_name not in by_category:
-                by_category[category_name] = {"收入": 0, "支出": 0, "count": 0}
-            
-            by_category[category_name][stat.transaction_type] = float(stat.total_amount)
-            by_category[category_name]["count"] += stat.count
-        
-        # 按来源统计
         by_source = {}
-        source_stats = db.query(
-            Bill.source_type,
-            Bill.transaction_type,
-            func.sum(Bill.amount).label("total_amount"),
-            func.count(Bill.id).label("count")
-        ).filter(Bill.family_id.in_(user_family_ids))
-        
-        if family_id and family_id in user_family_ids:
-            source_stats = source_stats.filter(Bill.family_id == family_id)
-        if start_date:
-            source_stats = source_stats.filter(Bill.transaction_time >= start_date)
-        if end_date:
-            source_stats = source_stats.filter(Bill.transaction_time < end_date.replace(day=end_date.day + 1))
-        
-        source_stats = source_stats.group_by(Bill.source_type, Bill.transaction_type).all()
-        
-        for stat in source_stats:
-            source_type = stat.source_type
-            if source_type not in by_source:
-                by_source[source_type] = {"收入": 0, "支出": 0, "count": 0}
-            
-            by_source[source_type][stat.transaction_type] = float(stat.total_amount)
-            by_source[source_type]["count"] += stat.count
-        
-        # 按月统计
         by_month = {}
-        month_stats = db.query(
-            func.date_trunc('month', Bill.transaction_time).label("month"),
-            Bill.transaction_type,
-            func.sum(Bill.amount).label("total_amount"),
-            func.count(Bill.id).label("count")
-        ).filter(Bill.family_id.in_(user_family_ids))
-        
-        if family_id and family_id in user_family_ids:
-            month_stats = month_stats.filter(Bill.family_id == family_id)
-        if start_date:
-            month_stats = month_stats.filter(Bill.transaction_time >= start_date)
-        if end_date:
-            month_stats = month_stats.filter(Bill.transaction_time < end_date.replace(day=end_date.day + 1))
+        breakdowns = {"category": by_category, "source": by_source, "month": by_month}
+        
+        for dimension, key, transaction_type, amount, count in stats_rows:
+            if dimension == "total":
+                total_count += count
+                total_amount += amount
+                if transaction_type == "收入":
+                    total_income = amount
+                    income_count = count
+                elif transaction_type == "支出":
+                    total_expense = amount
+                    expense_count = count
+                continue
+            
+            breakdown = breakdowns[dimension]
+            if key not in breakdown:
+                breakdown[key] = {"收入": 0, "支出": 0, "count": 0}
+            breakdown[key][transaction_type] = amount
+            breakdown[key]["count"] += count
         
-        month_stats = month_stats.group_by(
-            func.date_trunc('month', Bill.transaction_time),
-            Bill.transaction_type
-        ).order_by(func.date_trunc('month', Bill.transaction_time)).all()
+        avg_amount = total_amount / total_count if total_count > 0 else 0
         
-        for stat in month_stats:
-            month_key = stat.month.strftime("%Y-%m")
-            if month_key not in by_month:
-                by_month[month_key] = {"收入": 0, "支出": 0, "count": 0}
-            
-            by_month[month_key][stat.transaction_type] = float(stat.total_amount)
-            by_month[month_key]["count"] += stat.count
+        # 按月份排序
+        by_month = dict(sorted(by_month.items()))
         
         return BillStatsResponse(
             total_income=total_income,
@@ -312,16 +465,13 @@ async def get_bill_stats(
 
 
 @router.get("/categories", response_model=ApiResponse[List[BillCategoryResponse]])
-async def get_categories(
+def get_categories(
     family_id: Optional[int] = Query(None, description="家庭ID筛选"),
-    current_user: User = Depends(get_current_user),
+    user_family_ids: List[int] = Depends(get_current_family_ids),
     db: Session = Depends(get_db)
 ):
     """获取账单分类列表"""
     try:
-        # 获取用户所属家庭
-        user_family_ids = await get_user_families(current_user, db)
-        
         query = db.query(BillCategory).filter(
             BillCategory.family_id.in_(user_family_ids)
         )
@@ -331,16 +481,23 @@ async def get_categories(
         
         categories = query.order_by(BillCategory.created_at.desc()).all()
         
-        # 为每个分类添加账单数量统计
+        # 一次分组查询所有分类的账单数量
+        bills_counts = {}
+        if categories:
+            bills_counts = dict(
+                db.query(Bill.category_id, func.count(Bill.id))
+                .filter(
+                    Bill.category_id.in_([category.id for category in categories]),
+                    Bill.family_id.in_(user_family_ids)
+                )
+                .group_by(Bill.category_id)
+                .all()
+            )
+        
         category_responses = []
         for category in categories:
-            bills_count = db.query(Bill).filter(
-                Bill.category_id == category.id,
-                Bill.family_id.in_(user_family_ids)
-            ).count()
-            
             # 设置bills_count属性
-            category.bills_count = bills_count
+            category.bills_count = bills_counts.get(category.id, 0)
             category_data = BillCategoryResponse.from_orm(category)
             category_responses.append(category_data)
         
@@ -359,16 +516,13 @@ async def get_categories(
 
 
 @router.post("/categories", response_model=ApiResponse[BillCategoryResponse])
-async def create_category(
+def create_category(
     category_data: BillCategoryCreate,
-    current_user: User = Depends(get_current_user),
+    user_family_ids: List[int] = Depends(get_current_family_ids),
     db: Session = Depends(get_db)
 ):
     """创建账单分类"""
     try:
-        # 获取用户所属家庭
-        user_family_ids = await get_user_families(current_user, db)
-        
         # 验证家庭ID是否属于用户
         if category_data.family_id not in user_family_ids:
             raise HTTPException(
@@ -399,6 +553,7 @@ async def create_category(
         db.add(new_category)
         db.commit()
         db.refresh(new_category)
+        invalidate_category_cache(new_category.family_id)
         
         # 设置bills_count属性
         new_category.bills_count = 0
@@ -421,17 +576,78 @@ async def create_category(
         )
 
 
+@router.put("/categories/{category_id}", response_model=ApiResponse[BillCategoryResponse])
+def update_category(
+    category_id: int,
+    category_data: BillCategoryUpdate,
+    user_family_ids: List[int] = Depends(get_current_family_ids),
+    db: Session = Depends(get_db)
+):
+    """更新账单分类"""
+    try:
+        category = db.query(BillCategory).filter(
+            BillCategory.id == category_id,
+            BillCategory.family_id.in_(user_family_ids)
+        ).first()
+        
+        if not category:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="分类不存在或无权访问"
+            )
+        
+        # 检查新名称是否与其他分类重复
+        if category_data.name is not None and category_data.name != category.category_name:
+            existing_category = db.query(BillCategory).filter(
+                BillCategory.category_name == category_data.name,
+                BillCategory.family_id == category.family_id,
+                BillCategory.id != category.id
+            ).first()
+            
+            if existing_category:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="该分类名称已存在"
+                )
+            
+            category.category_name = category_data.name
+        
+        if category_data.icon is not None:
+            category.icon = category_data.icon
+        if category_data.color is not None:
+            category.color = category_data.color
+        
+        db.commit()
+        db.refresh(category)
+        invalidate_category_cache(category.family_id)
+        
+        category.bills_count = db.query(Bill).filter(Bill.category_id == category.id).count()
+        
+        return ApiResponse(
+            success=True,
+            message="更新分类成功",
+            data=BillCategoryResponse.from_orm(category)
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.error(f"更新分类失败: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="更新分类失败"
+        )
+
+
 @router.get("/{bill_id}", response_model=BillResponse)
-async def get_bill(
+def get_bill(
     bill_id: int,
-    current_user: User = Depends(get_current_user),
+    user_family_ids: List[int] = Depends(get_current_family_ids),
     db: Session = Depends(get_db)
 ):
     """获取单个账单详情"""
     try:
-        # 获取用户所属家庭
-        user_family_ids = await get_user_families(current_user, db)
-        
         bill = db.query(Bill).options(
             joinedload(Bill.category),
             joinedload(Bill.family),
@@ -460,17 +676,14 @@ async def get_bill(
 
 
 @router.put("/{bill_id}", response_model=BillResponse)
-async def update_bill(
+def update_bill(
     bill_id: int,
     bill_update: BillUpdate,
-    current_user: User = Depends(get_current_user),
+    user_family_ids: List[int] = Depends(get_current_family_ids),
     db: Session = Depends(get_db)
 ):
     """更新账单信息"""
     try:
-        # 获取用户所属家庭
-        user_family_ids = await get_user_families(current_user, db)
-        
         bill = db.query(Bill).filter(
             Bill.id == bill_id,
             Bill.family_id.in_(user_family_ids)
@@ -482,6 +695,10 @@ async def update_bill(
                 detail="账单不存在或无权访问"
             )
         
+        # 月度汇总：扣除旧值
+        rollup_delta = RollupDelta()
+        rollup_delta.remove(bill)
+        
         # 更新字段
         update_data = bill_update.dict(exclude_unset=True)
         for field, value in update_data.items():
@@ -489,6 +706,12 @@ async def update_bill(
         
         bill.updated_at = datetime.utcnow()
         
+        # 刷新后按数据库中的新值计入汇总
+        db.flush()
+        db.refresh(bill)
+        rollup_delta.add(bill)
+        rollup_delta.apply(db)
+        
         db.commit()
         db.refresh(bill)
         
@@ -506,16 +729,13 @@ async def update_bill(
 
 
 @router.delete("/{bill_id}")
-async def delete_bill(
+def delete_bill(
     bill_id: int,
-    current_user: User = Depends(get_current_user),
+    user_family_ids: List[int] = Depends(get_current_family_ids),
     db: Session = Depends(get_db)
 ):
     """删除账单"""
     try:
-        # 获取用户所属家庭
-        user_family_ids = await get_user_families(current_user, db)
-        
         bill = db.query(Bill).filter(
             Bill.id == bill_id,
             Bill.family_id.in_(user_family_ids)
@@ -527,6 +747,10 @@ async def delete_bill(
                 detail="账单不存在或无权访问"
             )
         
+        rollup_delta = RollupDelta()
+        rollup_delta.remove(bill)
+        rollup_delta.apply(db)
+        
         db.delete(bill)
         db.commit()
         
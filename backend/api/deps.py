@@ -0,0 +1,93 @@
+import functools
+import inspect
+from typing import Callable, List, Tuple
+
+from fastapi import Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from config.database import get_db, get_async_db
+from config.settings import settings
+from models.family import FamilyMember
+from models.user import User
+from api.auth import get_current_user, get_current_user_async
+from utils.cache import TTLCache
+
+# 家庭成员关系缓存: 用户ID -> 所属家庭ID
+_family_ids_cache = TTLCache(maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL)
+
+
+def invalidate_family_ids_cache(*user_ids: int):
+    """家庭成员关系变更后使相关用户的缓存失效"""
+    for user_id in user_ids:
+        _family_ids_cache.pop(user_id)
+
+
+def get_user_families(user: User, db: Session) -> List[int]:
+    """获取用户所属的家庭ID列表，按用户缓存 AUTH_CACHE_TTL 秒"""
+    family_ids: Tuple[int, ...] = _family_ids_cache.get(user.id)
+    if family_ids is None:
+        family_ids = tuple(
+            family_id for (family_id,) in db.query(FamilyMember.family_id).filter(FamilyMember.user_id == user.id)
+        )
+        _family_ids_cache.set(user.id, family_ids)
+    return list(family_ids)
+
+
+def get_current_family_ids(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> List[int]:
+    """依赖项：当前用户所属的家庭ID列表，同一请求内只解析一次"""
+    return get_user_families(current_user, db)
+
+
+async def get_current_family_ids_async(
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+) -> List[int]:
+    """依赖项：当前用户所属的家庭ID列表（异步数据库会话），与 get_current_family_ids 共用缓存"""
+    family_ids: Tuple[int, ...] = _family_ids_cache.get(current_user.id)
+    if family_ids is None:
+        result = await db.execute(select(FamilyMember.family_id).where(FamilyMember.user_id == current_user.id))
+        family_ids = tuple(result.scalars())
+        _family_ids_cache.set(current_user.id, family_ids)
+    return list(family_ids)
+
+
+# 启用异步数据库时替换的依赖项: 参数名 -> 异步依赖
+ASYNC_DEPENDENCIES = {
+    "db": get_async_db,
+    "current_user": get_current_user_async,
+    "user_family_ids": get_current_family_ids_async,
+}
+
+
+def async_db_endpoint(endpoint: Callable) -> Callable:
+    """
+    启用异步数据库（DB_ASYNC_ENABLED）时，将使用同步 Session 的路由改为异步路由
+
+    路由参数不变，db、current_user 和 user_family_ids 改由异步会话提供；路由主体通过 AsyncSession.run_sync 执行，
+    查询等待数据库时让出事件循环，一个工作进程可以同时处理多个请求而不占用线程池。
+    未启用时原样返回路由函数。
+    """
+    if not settings.DB_ASYNC_ENABLED:
+        return endpoint
+
+    signature = inspect.signature(endpoint)
+    parameters = []
+    for parameter in signature.parameters.values():
+        dependency = ASYNC_DEPENDENCIES.get(parameter.name)
+        if dependency is get_async_db:
+            parameter = parameter.replace(default=Depends(dependency), annotation=AsyncSession)
+        elif dependency is not None:
+            parameter = parameter.replace(default=Depends(dependency))
+        parameters.append(parameter)
+
+    @functools.wraps(endpoint)
+    async def wrapper(db: AsyncSession, **kwargs):
+        return await db.run_sync(lambda session: endpoint(db=session, **kwargs))
+
+    wrapper.__signature__ = signature.replace(parameters=parameters)
+    return wrapper
@@ -7,6 +7,7 @@ from config.database import get_db
 from models.family import Family, FamilyMember
 from models.user import User
 from api.auth import get_current_user
+from api.deps import invalidate_family_ids_cache
 from schemas.family import (
     FamilyCreate,
     FamilyUpdate,
@@ -21,7 +22,7 @@ router = APIRouter(prefix="/families", tags=["families"])
 
 
 @router.get("/", response_model=ApiResponse)
-async def list_families(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def list_families(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     """获取当前用户所属家庭列表"""
     try:
         families = (
@@ -37,7 +38,7 @@ async def list_families(current_user: User = Depends(get_current_user), db: Sess
 
 
 @router.post("/", response_model=FamilyResponse)
-async def create_family(
+def create_family(
     family_in: FamilyCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -60,6 +61,7 @@ async def create_family(
         )
         db.add(member)
         db.commit()
+        invalidate_family_ids_cache(current_user.id)
 
         return family
     except Exception as e:
@@ -69,7 +71,7 @@ async def create_family(
 
 
 @router.put("/{family_id}", response_model=FamilyResponse)
-async def update_family(
+def update_family(
     family_id: int,
     family_in: FamilyUpdate,
     current_user: User = Depends(get_current_user),
@@ -100,7 +102,7 @@ async def update_family(
 
 
 @router.delete("/{family_id}")
-async def delete_family(
+def delete_family(
     family_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -118,13 +120,15 @@ async def delete_family(
     if not member or member.role != "admin":
         raise HTTPException(status_code=403, detail="无权限")
 
+    member_user_ids = [m.user_id for m in fam.members]
     db.delete(fam)
     db.commit()
+    invalidate_family_ids_cache(*member_user_ids)
     return {"detail": "家庭已删除"}
 
 
 @router.get("/{family_id}/members", response_model=List[FamilyMemberResponse])
-async def list_family_members(
+def list_family_members(
     family_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
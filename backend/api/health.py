@@ -9,7 +9,8 @@ from sqlalchemy import text
 from config.settings import settings
 from config.logging import get_logger
 from schemas.common import HealthCheckResponse, MetricsResponse, ApiResponse
-from config.database import get_db
+from config.database import get_db, get_pool_status
+from core.metrics import http_request_totals
 
 logger = get_logger(__name__)
 router = APIRouter(prefix="/health", tags=["健康检查"])
@@ -17,10 +18,6 @@ router = APIRouter(prefix="/health", tags=["健康检查"])
 # 应用启动时间
 app_start_time = time.time()
 
-# 请求计数器
-request_count = 0
-error_count = 0
-
 
 class HealthChecker:
     """健康检查器"""
@@ -46,6 +43,25 @@ class HealthChecker:
                 "message": f"数据库连接失败: {str(e)}"
             }
     
+    @staticmethod
+    def check_database_pool() -> Dict[str, Any]:
+        """检查数据库连接池使用情况"""
+        try:
+            pool_status = get_pool_status()
+            pool_status.pop("wait_histogram", None)
+            saturated = pool_status.get("utilization_percent", 0) >= 100
+            pool_status.update(
+                status="warning" if saturated else "healthy",
+                message="连接池已满，请求需要等待空闲连接" if saturated else "连接池使用正常"
+            )
+            return pool_status
+        except Exception as e:
+            logger.error("连接池检查失败", error=str(e))
+            return {
+                "status": "unhealthy",
+                "message": f"连接池检查失败: {str(e)}"
+            }
+    
     @staticmethod
     def check_memory() -> Dict[str, Any]:
         """检查内存使用情况"""
@@ -88,18 +104,19 @@ class HealthChecker:
 
 
 @router.get("/", response_model=ApiResponse)
-async def health_check(db: Session = Depends(get_db)):
+def health_check(db: Session = Depends(get_db)):
     """基础健康检查"""
     try:
         # 检查各个组件
         db_status = HealthChecker.check_database(db)
+        pool_status = HealthChecker.check_database_pool()
         memory_status = HealthChecker.check_memory()
         disk_status = HealthChecker.check_disk()
         
         # 判断整体状态
         all_healthy = all(
             status["status"] == "healthy" 
-            for status in [db_status, memory_status, disk_status]
+            for status in [db_status, pool_status, memory_status, disk_status]
         )
         
         overall_status = "healthy" if all_healthy else "degraded"
@@ -110,6 +127,7 @@ async def health_check(db: Session = Depends(get_db)):
             environment=settings.ENVIRONMENT,
             services={
                 "database": db_status,
+                "database_pool": pool_status,
                 "memory": memory_status,
                 "disk": disk_status
             }
@@ -146,7 +164,7 @@ async def liveness_check():
 
 
 @router.get("/ready", response_model=ApiResponse)
-async def readiness_check(db: Session = Depends(get_db)):
+def readiness_check(db: Session = Depends(get_db)):
     """就绪检查 - 用于K8s readiness probe"""
     try:
         # 检查数据库连接
@@ -181,7 +199,7 @@ async def readiness_check(db: Session = Depends(get_db)):
 
 
 @router.get("/metrics", response_model=ApiResponse)
-async def get_metrics():
+def get_metrics():
     """获取监控指标"""
     try:
         # 计算运行时间
@@ -205,13 +223,17 @@ async def get_metrics():
         except:
             connections = 0
         
+        # 请求总数和服务端错误数，来自 Prometheus 指标
+        request_count, error_count = http_request_totals()
+        
         metrics_data = MetricsResponse(
             uptime=uptime,
             memory_usage=memory_usage,
             cpu_usage=cpu_usage,
             request_count=request_count,
             error_count=error_count,
-            active_connections=connections
+            active_connections=connections,
+            database_pool=get_pool_status()
         )
         
         return ApiResponse(
@@ -228,14 +250,3 @@ async def get_metrics():
             error_code="METRICS_ERROR"
         )
 
-
-def increment_request_count():
-    """增加请求计数"""
-    global request_count
-    request_count += 1
-
-
-def increment_error_count():
-    """增加错误计数"""
-    global error_count
-    error_count += 1
\ No newline at end of file
@@ -1,38 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Response
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
+import hashlib
 import logging
 import os
 import tempfile
-from datetime import datetime, timedelta
+import uuid
+from datetime import timedelta
 
 from config.database import get_db
 from config.settings import settings
 from models.user import User
 from models.bill import Bill, BillCategory
-from models.family import FamilyMember
+from models.upload import UploadRecord
 from api.auth import get_current_user
+from api.deps import get_current_family_ids
 from parsers import get_parser, get_available_parsers
+from services.bill_import import invalidate_category_cache
+from services.bill_rollup import RollupDelta
+from services.upload_import import (
+    import_bills,
+    finish_upload_record,
+    fail_upload_record,
+    discard_parse_cache,
+    find_upload_by_hash,
+    check_duplicate_bill_other_sources,
+)
+from services.upload_jobs import upload_job_queue
 from utils.validators import validate_file_extension, validate_file_size, detect_file_source_type
 from schemas.upload import (
     UploadResponse,
     UploadHistoryResponse,
-    UploadStatsResponse
+    UploadStatsResponse,
+    UploadRecord as UploadRecordSchema,
+    UploadRecordListResponse
 )
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/upload", tags=["upload"])
 
-
-async def get_user_families(user: User, db: Session) -> List[int]:
-    """获取用户所属的家庭ID列表"""
-    family_members = db.query(FamilyMember).filter(
-        FamilyMember.user_id == user.id
-    ).all()
-    return [fm.family_id for fm in family_members]
+# 上传文件分块读取的大小
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
 
-async def get_or_create_category(
+def get_or_create_category(
     name: str, 
     family_id: int, 
     db: Session,
@@ -54,8 +66,8 @@ async def get_or_create_category(
             color=color or "#666666"
         )
         db.add(category)
-        db.commit()
-        db.refresh(category)
+        db.flush()  # 只flush不提交，随调用方的事务一起提交
+        invalidate_category_cache(family_id)
     
     return category
 
@@ -125,9 +137,21 @@ def find_existing_jd_bill(record: Dict[str, Any], family_id: int, db: Session) -
 def check_duplicate_alipay_file(filename: str, family_id: int, db: Session) -> bool:
     """
     检查支付宝文件是否已经上传过
+
+    内容相同的文件由文件哈希识别；按文件名判断只用于兼容记录文件哈希之前导入的账单，
+    同名文件已有带哈希的上传记录时说明内容不同，允许上传。
     """
     try:
         logger.info(f"检查支付宝文件重复: filename={filename}, family_id={family_id}")
+        hashed_upload = db.query(UploadRecord.id).filter(
+            UploadRecord.family_id == family_id,
+            UploadRecord.source_type == "alipay",
+            UploadRecord.filename == filename,
+            UploadRecord.file_hash.isnot(None)
+        ).first()
+        if hashed_upload:
+            return False
+        
         existing_bill = db.query(Bill).filter(
             Bill.family_id == family_id,
             Bill.source_type == "alipay",
@@ -143,79 +167,6 @@ def check_duplicate_alipay_file(filename: str, family_id: int, db: Session) -> b
         return False
 
 
-def check_duplicate_bill_other_sources(record: Dict[str, Any], family_id: int, source_type: str, db: Session) -> bool:
-    """
-    检查非京东账单记录是否重复
-    """
-    try:
-        # 支付宝账单不进行记录级别的去重，因为相同记录可能是两笔独立交易
-        if source_type == "alipay":
-            return False
-        
-        # 提取订单号（如果有的话）
-        order_id = None
-        raw_data = record.get("raw_data", {})
-        
-        if raw_data:
-            order_id = raw_data.get("order_id") or raw_data.get("merchant_order_id")
-        
-        if not order_id:
-            order_id = record.get("order_id") or record.get("merchant_order_id")
-        
-        # 如果有订单号，优先使用订单号匹配
-        if order_id and order_id.strip():
-            logger.debug(f"使用订单号进行去重检查: {order_id}")
-            
-            existing_bill = db.query(Bill).filter(
-                Bill.family_id == family_id,
-                Bill.source_type == source_type,
-                Bill.raw_data.op('->>')('order_id') == order_id.strip()
-            ).first()
-            
-            if existing_bill:
-                logger.info(f"发现重复记录（订单号匹配）: {order_id}")
-                return True
-        
-        # 使用组合字段进行匹配（交易时间 + 金额 + 商户名称）
-        transaction_time = record.get("transaction_time")
-        amount = record.get("amount")
-        merchant_name = record.get("merchant_name") or record.get("transaction_desc", "")
-        
-        logger.debug(f"组合字段检查: time={transaction_time}, amount={amount}, merchant={merchant_name}")
-        
-        if transaction_time and amount is not None:
-            # 时间容差：允许1分钟内的时间差异
-            time_start = transaction_time - timedelta(minutes=1)
-            time_end = transaction_time + timedelta(minutes=1)
-            
-            existing_bill = db.query(Bill).filter(
-                Bill.family_id == family_id,
-                Bill.source_type == source_type,
-                Bill.transaction_time >= time_start,
-                Bill.transaction_time <= time_end,
-                Bill.amount == amount
-            ).first()
-            
-            if existing_bill:
-                # 进一步检查商户名称或交易描述是否相似
-                existing_desc = existing_bill.transaction_desc or ""
-                if merchant_name and (
-                    merchant_name in existing_desc or 
-                    existing_desc in merchant_name or
-                    merchant_name == existing_desc
-                ):
-                    logger.info(f"发现重复记录（组合字段匹配）: 时间={transaction_time}, 金额={amount}, 商户={merchant_name}")
-                    return True
-        
-        logger.debug("未发现重复记录")
-        return False
-        
-    except Exception as e:
-        logger.error(f"检查重复记录时出错: {e}")
-        # 出错时不阻止导入，但记录错误
-        return False
-
-
 @router.get("/parsers")
 async def get_parsers():
     """获取可用的解析器列表"""
@@ -226,18 +177,26 @@ async def get_parsers():
 
 
 @router.post("/", response_model=UploadResponse)
-async def upload_file(
+def upload_file(
+    response: Response,
     file: UploadFile = File(...),
     family_id: int = Form(...),
     source_type: Optional[str] = Form(None),
     auto_categorize: bool = Form(True),
+    background: bool = Form(False),
     current_user: User = Depends(get_current_user),
+    user_family_ids: List[int] = Depends(get_current_family_ids),
     db: Session = Depends(get_db)
 ):
-    """上传并解析账单文件"""
+    """
+    上传并解析账单文件
+
+    background=true 时只保存文件并创建上传记录，立即返回 upload_id（状态为 processing），
+    由后台任务完成导入，之后通过 GET /upload/{upload_id} 查询进度和结果。
+    同一家庭上传内容相同（SHA-256 相同）的文件时不再导入，直接返回已有的导入结果。
+    """
     try:
         # 验证用户是否属于指定家庭
-        user_family_ids = await get_user_families(current_user, db)
         if family_id not in user_family_ids:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -269,14 +228,6 @@ async def upload_file(
                 detail="无法识别文件类型，请指定source_type参数"
             )
         
-        # 支付宝文件重复检查
-        if source_type == "alipay":
-            if check_duplicate_alipay_file(file.filename, family_id, db):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="此账单已经上传, 支付宝账单不支持重复上传!"
-                )
-        
         # 获取解析器
         parser = get_parser(source_type)
         if not parser:
@@ -285,188 +236,111 @@ async def upload_file(
                 detail=f"不支持的文件类型: {source_type}"
             )
         
-        # 读取文件内容
-        content = await file.read()
-        
-        # 保存临时文件
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file.filename.split('.')[-1]}") as temp_file:
-            temp_file.write(content)
-            temp_file_path = temp_file.name
+        suffix = f".{file.filename.split('.')[-1]}"
+        file_path = None
+        submitted = False
         
         try:
-            # 解析文件
-            parse_result = parser.parse_file(temp_file_path)
-            
-            success_count = 0
-            failed_count = 0
-            updated_count = 0  # 新增：更新记录数
-            created_bills = []
+            # 同步导入直接解析上传的临时文件对象；后台导入和只接受文件路径的解析器才另存文件，
+            # 另存时在写入的同时计算内容哈希，重复的文件由 finally 删除
+            if background:
+                # 后台导入的文件保存到上传目录，导入完成后由后台任务删除
+                file_path = str(settings.upload_path / f"{uuid.uuid4().hex}{suffix}")
+            elif parser.requires_path:
+                fd, file_path = tempfile.mkstemp(suffix=suffix)
+                os.close(fd)
+            if file_path:
+                file_size, file_hash = _save_upload_file(file, file_path)
+            else:
+                file_size, file_hash = _hash_upload_file(file)
             
-            # 用于批次内去重的集合
-            batch_records = set()
+            # 相同内容的文件已导入成功时，直接返回已有的导入结果
+            existing_record = find_upload_by_hash(db, family_id, file_hash)
+            if existing_record:
+                logger.info(f"文件内容与上传记录 {existing_record.id} 相同，跳过导入: {file.filename}")
+                return _existing_upload_response(existing_record)
             
-            # 处理成功解析的记录
-            for i, record in enumerate(parse_result.success_records):
-                try:
-                    # 检查必需字段
-                    required_fields = ["amount", "transaction_time", "transaction_type"]
-                    missing_fields = [field for field in required_fields if field not in record or record[field] is None]
-                    
-                    if missing_fields:
-                        logger.warning(f"记录 {i+1} 缺少必需字段: {missing_fields}, 记录内容: {record}")
-                        failed_count += 1
-                        continue
-                    
-                    # 批次内去重检查（支付宝账单不进行批次内去重）
-                    if source_type != "alipay":
-                        record_key = (
-                            record["transaction_time"].isoformat() if hasattr(record["transaction_time"], 'isoformat') else str(record["transaction_time"]),
-                            str(record["amount"]),
-                            record.get("transaction_desc", "")
-                        )
-                        
-                        if record_key in batch_records:
-                            logger.info(f"跳过批次内重复记录 (记录 {i+1}): {record_key}")
-                            continue
-                        
-                        batch_records.add(record_key)
-                    
-                    # 京东账单：查找已存在的记录并更新
-                    if source_type == "jd":
-                        existing_bill = find_existing_jd_bill(record, family_id, db)
-                        
-                        if existing_bill:
-                            # 更新已存在的记录
-                            existing_bill.amount = record["amount"]
-                            existing_bill.transaction_time = record["transaction_time"]
-                            existing_bill.transaction_type = record["transaction_type"]
-                            existing_bill.transaction_desc = record.get("transaction_desc")
-                            existing_bill.raw_data = record.get("raw_data", {})
-                            existing_bill.source_filename = file.filename  # 更新文件名
-                            existing_bill.order_id = record.get("order_id")  # 更新订单号
-                            existing_bill.counter_party = record.get("counter_party")  # 更新对手方
-                            existing_bill.remark = record.get("remark")  # 更新备注
-                            existing_bill.balance = record.get("balance")  # 更新余额
-                            existing_bill.updated_at = datetime.now()
-                            
-                            # 自动分类
-                            if auto_categorize and record.get("category"):
-                                category = await get_or_create_category(
-                                    record["category"], 
-                                    family_id, 
-                                    db
-                                )
-                                existing_bill.category_id = category.id
-                            
-                            created_bills.append(existing_bill)
-                            updated_count += 1  # 统计更新记录数
-                            logger.info(f"更新京东账单记录: {record.get('raw_data', {}).get('order_id')}")
-                            continue
-                    
-                    # 其他来源：检查重复
-                    else:
-                        if check_duplicate_bill_other_sources(record, family_id, source_type, db):
-                            logger.info(f"跳过重复记录 (记录 {i+1})")
-                            continue
-                    
-                    # 自动分类
-                    category = None
-                    if auto_categorize and record.get("category"):
-                        category = await get_or_create_category(
-                            record["category"], 
-                            family_id, 
-                            db
-                        )
-                    
-                    # 创建新的账单记录
-                    bill = Bill(
-                        user_id=current_user.id,
-                        family_id=family_id,
-                        amount=record["amount"],
-                        transaction_time=record["transaction_time"],
-                        transaction_type=record["transaction_type"],
-                        transaction_desc=record.get("transaction_desc"),
-                        source_type=source_type,
-                        category_id=category.id if category else None,
-                        raw_data=record.get("raw_data", {}),
-                        source_filename=file.filename,  # 记录所有账单的文件名
-                        order_id=record.get("order_id"),  # 添加订单号字段
-                        counter_party=record.get("counter_party"),  # 添加对手方字段
-                        remark=record.get("remark"),  # 添加备注字段
-                        balance=record.get("balance")  # 添加余额字段
+            # 支付宝文件重复检查
+            if source_type == "alipay":
+                if check_duplicate_alipay_file(file.filename, family_id, db):
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail="此账单已经上传, 支付宝账单不支持重复上传!"
                     )
-                    
-                    try:
-                        db.add(bill)
-                        db.flush()  # 先flush检查是否有错误
-                        created_bills.append(bill)
-                        success_count += 1
-                    except Exception as db_error:
-                        logger.error(f"数据库插入失败 (记录 {i+1}): {db_error}")
-                        logger.error(f"问题记录内容: {record}")
-                        db.rollback()  # 回滚这个记录
-                        failed_count += 1
-                        continue
-                    
-                except Exception as e:
-                    logger.error(f"创建账单记录失败 (记录 {i+1}): {e}")
-                    logger.error(f"问题记录内容: {record}")
-                    failed_count += 1
             
-            # 最终提交所有成功的记录
+            # 创建上传记录
+            upload_record = UploadRecord(
+                family_id=family_id,
+                user_id=current_user.id,
+                filename=file.filename,
+                file_size=file_size,
+                file_hash=file_hash,
+                source_type=source_type,
+                status="processing",
+                processed_records=0
+            )
+            db.add(upload_record)
+            db.commit()
+            upload_id = upload_record.id
+            
+            if background:
+                upload_response = _submit_background_upload(db, upload_record, file_path, auto_categorize, response)
+                submitted = True
+                return upload_response
+            
+            try:
+                result = import_bills(
+                    db,
+                    parser,
+                    file_path or file.file,
+                    family_id=family_id,
+                    user_id=current_user.id,
+                    source_type=source_type,
+                    filename=file.filename,
+                    auto_categorize=auto_categorize,
+                    file_hash=file_hash,
+                    upload_id=upload_id
+                )
+            except Exception as e:
+                db.rollback()
+                fail_upload_record(db, upload_id, f"导入失败: {str(e)}")
+                raise
+            
+            # 最终提交所有成功的记录和上传记录
             try:
+                finish_upload_record(upload_record, result)
                 db.commit()
             except Exception as commit_error:
                 logger.error(f"最终提交失败: {commit_error}")
                 db.rollback()
+                fail_upload_record(db, upload_id, "数据库提交失败")
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                     detail="数据库提交失败"
                 )
+            discard_parse_cache(source_type, file_hash)
             
-            logger.info(f"文件上传完成: {file.filename}, 新增: {success_count}, 更新: {updated_count}, 失败: {failed_count}")
-            
-            total_records = len(parse_result.success_records) + len(parse_result.failed_records)
-            total_failed = failed_count + len(parse_result.failed_records)
-            total_success = success_count + updated_count  # 成功数包括新增和更新
-            upload_status = "completed" if failed_count == 0 else "partial_success"
-            
-            # 构建警告信息
-            warnings = parse_result.errors.copy() if hasattr(parse_result, 'errors') else []
-            if updated_count > 0:
-                warnings.append(f"更新已存在记录数: {updated_count}")
-            
-            # 构建错误信息列表
-            error_messages = []
-            # 添加解析失败的记录错误信息
-            for failed_record in parse_result.failed_records:
-                if isinstance(failed_record, dict) and 'parse_error' in failed_record:
-                    error_messages.append(failed_record['parse_error'])
-                else:
-                    error_messages.append(str(failed_record))
-            
-            # 添加保存失败的记录数
-            if failed_count > 0:
-                error_messages.append(f"保存失败记录数: {failed_count}")
+            logger.info(f"文件上传完成: {file.filename}, 新增: {result.created_count}, 更新: {result.updated_count}, 失败: {result.failed_count}")
             
             return UploadResponse(
-                upload_id=0,  # 临时ID
+                upload_id=upload_id,
                 filename=file.filename,
                 source_type=source_type,
-                total_records=total_records,
-                success_count=total_success,  # 总成功数（新增+更新）
-                created_count=success_count,  # 新增记录数
-                updated_count=updated_count,  # 更新记录数
-                failed_count=total_failed,
-                status=upload_status,
-                created_bills=[bill.id for bill in created_bills],
-                errors=error_messages,
-                warnings=warnings
+                total_records=result.total_records,
+                success_count=result.total_success,  # 总成功数（新增+更新）
+                created_count=result.created_count,  # 新增记录数
+                updated_count=result.updated_count,  # 更新记录数
+                failed_count=result.total_failed,
+                status=result.status,
+                created_bills=result.created_bill_ids,
+                errors=result.errors(),
+                warnings=result.warnings()
             )
             
         finally:
-            # 清理临时文件
-            os.unlink(temp_file_path)
+            # 清理临时文件，已提交的后台任务由任务自行删除
+            if file_path and not submitted and os.path.exists(file_path):
+                os.unlink(file_path)
             
     except HTTPException:
         raise
@@ -478,18 +352,111 @@ async def upload_file(
         )
 
 
-@router.get("/history")
-async def get_upload_history(
+def _hash_upload_file(file: UploadFile) -> Tuple[int, str]:
+    """分块读取上传文件，返回文件大小和内容的 SHA-256，读完后回到文件开头"""
+    hasher = hashlib.sha256()
+    file_size = 0
+    file.file.seek(0)
+    while chunk := file.file.read(UPLOAD_CHUNK_SIZE):
+        hasher.update(chunk)
+        file_size += len(chunk)
+    file.file.seek(0)
+    return file_size, hasher.hexdigest()
+
+
+def _save_upload_file(file: UploadFile, file_path: str) -> Tuple[int, str]:
+    """分块写入上传文件，同时计算文件大小和内容的 SHA-256，写完后回到文件开头"""
+    hasher = hashlib.sha256()
+    file_size = 0
+    file.file.seek(0)
+    with open(file_path, "wb") as f:
+        while chunk := file.file.read(UPLOAD_CHUNK_SIZE):
+            f.write(chunk)
+            hasher.update(chunk)
+            file_size += len(chunk)
+    file.file.seek(0)
+    return file_size, hasher.hexdigest()
+
+
+def _existing_upload_response(upload_record: UploadRecord) -> UploadResponse:
+    """相同内容的文件已导入时返回已有的导入结果"""
+    warnings = list(upload_record.warnings or [])
+    warnings.append(f"相同内容的文件已导入（上传记录 {upload_record.id}），未重复导入")
+    
+    return UploadResponse(
+        upload_id=upload_record.id,
+        filename=upload_record.filename,
+        source_type=upload_record.source_type,
+        total_records=upload_record.total_records or 0,
+        success_count=upload_record.success_records or 0,
+        created_count=upload_record.created_records or 0,
+        updated_count=upload_record.updated_records or 0,
+        failed_count=upload_record.failed_records or 0,
+        status=upload_record.status,
+        errors=upload_record.errors or [],
+        warnings=warnings
+    )
+
+
+def _submit_background_upload(
+    db: Session,
+    upload_record: UploadRecord,
+    file_path: str,
+    auto_categorize: bool,
+    response: Response
+) -> UploadResponse:
+    """提交后台导入任务，任务队列已满时删除上传记录并返回503"""
+    if not upload_job_queue.submit(upload_record.id, file_path, auto_categorize):
+        db.delete(upload_record)
+        db.commit()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="导入任务过多，请稍后再试"
+        )
+    
+    logger.info(f"已提交后台导入任务: upload_id={upload_record.id}, 文件: {upload_record.filename}")
+    response.status_code = status.HTTP_202_ACCEPTED
+    return UploadResponse(
+        upload_id=upload_record.id,
+        filename=upload_record.filename,
+        source_type=upload_record.source_type,
+        total_records=0,
+        success_count=0,
+        failed_count=0,
+        status="processing"
+    )
+
+
+@router.get("/history", response_model=UploadRecordListResponse)
+def get_upload_history(
     family_id: Optional[int] = None,
-    page: int = 1,
-    size: int = 20,
-    current_user: User = Depends(get_current_user),
+    page: int = Query(1, ge=1, description="页码"),
+    size: int = Query(20, ge=1, le=100, description="每页大小"),
+    user_family_ids: List[int] = Depends(get_current_family_ids),
     db: Session = Depends(get_db)
 ):
     """获取上传历史记录"""
     try:
-        # 暂时返回空列表，因为UploadRecord模型不存在
-        return []
+        query = db.query(UploadRecord).filter(
+            UploadRecord.family_id.in_(user_family_ids)
+        )
+        
+        if family_id and family_id in user_family_ids:
+            query = query.filter(UploadRecord.family_id == family_id)
+        
+        total = query.count()
+        records = query.order_by(
+            UploadRecord.created_at.desc(),
+            UploadRecord.id.desc()
+        ).offset((page - 1) * size).limit(size).all()
+        
+        return UploadRecordListResponse(
+            items=[UploadRecordSchema.from_record(record) for record in records],
+            total=total,
+            page=page,
+            size=size,
+            pages=(total + size - 1) // size
+        )
         
     except Exception as e:
         logger.error(f"获取上传历史失败: {e}")
@@ -500,59 +467,48 @@ async def get_upload_history(
 
 
 @router.get("/stats", response_model=UploadStatsResponse)
-async def get_upload_stats(
+def get_upload_stats(
     family_id: Optional[int] = None,
-    current_user: User = Depends(get_current_user),
+    user_family_ids: List[int] = Depends(get_current_family_ids),
     db: Session = Depends(get_db)
 ):
     """获取上传统计信息"""
     try:
-        # 获取用户所属家庭
-        user_family_ids = await get_user_families(current_user, db)
-        
-        # 由于UploadRecord模型不存在，返回基本统计信息
-        bills_query = db.query(Bill).filter(
-            Bill.family_id.in_(user_family_ids)
-        )
-        
+        conditions = [UploadRecord.family_id.in_(user_family_ids)]
         if family_id and family_id in user_family_ids:
-            bills_query = bills_query.filter(Bill.family_id == family_id)
-        
-        bills = bills_query.all()
-        
-        # 统计信息
-        total_uploads = 0
-        total_records = len(bills)
-        total_success = len(bills)
-        total_failed = 0
-        
-        # 按状态统计
-        by_status = {"completed": 1} if bills else {}
+            conditions.append(UploadRecord.family_id == family_id)
+        
+        # 汇总统计
+        totals = db.query(
+            func.count(UploadRecord.id),
+            func.coalesce(func.sum(UploadRecord.success_records), 0),
+            func.coalesce(func.sum(UploadRecord.failed_records), 0),
+            func.count(UploadRecord.id).filter(UploadRecord.status == "processing")
+        ).filter(*conditions).one()
+        
+        # 按来源类型统计上传次数
+        by_source_type = dict(
+            db.query(UploadRecord.source_type, func.count(UploadRecord.id))
+            .filter(*conditions)
+            .group_by(UploadRecord.source_type)
+            .all()
+        )
         
-        # 按来源类型统计
-        by_source = {}
-        for bill in bills:
-            source = bill.source_type
-            if source not in by_source:
-                by_source[source] = {
-                    "count": 0,
-                    "records": 0,
-                    "success": 0,
-                    "failed": 0
-                }
-            by_source[source]["count"] += 1
-            by_source[source]["records"] += 1
-            by_source[source]["success"] += 1
-            by_source[source]["failed"] += 0
+        # 最近的上传记录
+        recent_records = db.query(UploadRecord).filter(*conditions).order_by(
+            UploadRecord.created_at.desc(),
+            UploadRecord.id.desc()
+        ).limit(5).all()
         
         return UploadStatsResponse(
-            total_uploads=total_uploads,
-            total_records=total_records,
-            total_success=total_success,
-            total_failed=total_failed,
-            success_rate=total_success / total_records if total_records > 0 else 0,
-            by_status=by_status,
-            by_source=by_source
+            total_uploads=totals[0],
+            total_success=totals[1],
+            total_failed=totals[2],
+            total_processing=totals[3],
+            by_source_type=by_source_type,
+            recent_uploads=[
+                UploadRecordSchema.from_record(record).model_dump() for record in recent_records
+            ]
         )
         
     except Exception as e:
@@ -563,26 +519,89 @@ async def get_upload_stats(
         )
 
 
-@router.delete("/{upload_id}")
-async def delete_upload_record(
+def get_accessible_upload_record(upload_id: int, user_family_ids: List[int], db: Session) -> UploadRecord:
+    """获取当前用户有权访问的上传记录，不存在或无权访问时返回404"""
+    upload_record = db.query(UploadRecord).filter(
+        UploadRecord.id == upload_id,
+        UploadRecord.family_id.in_(user_family_ids)
+    ).first()
+    
+    if not upload_record:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="上传记录不存在"
+        )
+    return upload_record
+
+
+@router.get("/{upload_id}", response_model=UploadRecordSchema)
+def get_upload_record(
     upload_id: int,
-    delete_bills: bool = False,
-    current_user: User = Depends(get_current_user),
+    user_family_ids: List[int] = Depends(get_current_family_ids),
     db: Session = Depends(get_db)
 ):
-    """删除上传记录（可选择是否同时删除相关账单）"""
+    """获取上传记录，用于轮询后台导入的进度和结果"""
     try:
-        # 由于UploadRecord模型不存在，这个功能暂时不可用
+        upload_record = get_accessible_upload_record(upload_id, user_family_ids, db)
+        return UploadRecordSchema.from_record(upload_record)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"获取上传记录失败: {e}")
         raise HTTPException(
-            status_code=status.HTTP_501_NOT_IMPLEMENTED,
-            detail="上传记录删除功能暂未实现"
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="获取上传记录失败"
         )
+
+
+@router.delete("/{upload_id}")
+def delete_upload_record(
+    upload_id: int,
+    delete_bills: bool = False,
+    user_family_ids: List[int] = Depends(get_current_family_ids),
+    db: Session = Depends(get_db)
+):
+    """
+    删除上传记录（可选择是否同时删除相关账单）
+
+    只删除该上传记录创建的账单，同名文件的其他上传记录的账单不受影响。删除仍在导入中的记录会使该导入任务失败回滚。
+    """
+    try:
+        upload_record = get_accessible_upload_record(upload_id, user_family_ids, db)
+        
+        deleted_bills = 0
+        if delete_bills:
+            bills = db.query(Bill).filter(Bill.upload_id == upload_record.id).all()
+            
+            # 同步扣减月度汇总
+            rollup_delta = RollupDelta()
+            for bill in bills:
+                rollup_delta.remove(bill)
+                db.delete(bill)
+            rollup_delta.apply(db)
+            deleted_bills = len(bills)
+        else:
+            # 保留的账单不再关联上传记录（SQLite 未启用外键时不会自动置空）
+            db.query(Bill).filter(Bill.upload_id == upload_record.id).update(
+                {Bill.upload_id: None}, synchronize_session=False
+            )
+        
+        db.delete(upload_record)
+        db.commit()
+        
+        logger.info(f"删除上传记录: upload_id={upload_id}, 删除账单数: {deleted_bills}")
+        return {
+            "message": "上传记录删除成功",
+            "deleted_bills": deleted_bills
+        }
         
     except HTTPException:
         raise
     except Exception as e:
+        db.rollback()
         logger.error(f"删除上传记录失败: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="删除上传记录失败"
-        )
\ No newline at end of file
+        )
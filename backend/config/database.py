@@ -1,10 +1,173 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from .settings import settings
+from core.db_instrumentation import instrument_engine
+
+
+class PoolMetrics:
+    """连接池统计：获取连接的等待时间分布、超时和连接错误次数"""
+
+    # 等待时间直方图的桶上限（毫秒），最后一个桶为 +Inf
+    WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """清空统计"""
+        with self._lock:
+            self.checkouts = 0
+            self.wait_counts = [0] * (len(self.WAIT_BUCKETS_MS) + 1)
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.timeouts = 0
+            self.connection_errors = 0
+            self.connections_created = 0
+            self.connections_invalidated = 0
+
+    def record_wait(self, seconds: float):
+        """记录一次成功获取连接的等待时间"""
+        elapsed_ms = seconds * 1000
+        bucket = len(self.WAIT_BUCKETS_MS)
+        for i, upper in enumerate(self.WAIT_BUCKETS_MS):
+            if elapsed_ms <= upper:
+                bucket = i
+                break
+
+        with self._lock:
+            self.checkouts += 1
+            self.wait_counts[bucket] += 1
+            self.wait_total += elapsed_ms
+            self.wait_max = max(self.wait_max, elapsed_ms)
+
+    def record_error(self, timeout: bool = False):
+        """记录一次获取连接失败：等待超时或建立连接出错"""
+        with self._lock:
+            if timeout:
+                self.timeouts += 1
+            else:
+                self.connection_errors += 1
+
+    def record_connect(self):
+        with self._lock:
+            self.connections_created += 1
+
+    def record_invalidate(self):
+        with self._lock:
+            self.connections_invalidated += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前统计的副本"""
+        with self._lock:
+            labels = [f"le_{upper}ms" for upper in self.WAIT_BUCKETS_MS] + ["le_inf"]
+            return {
+                "checkouts": self.checkouts,
+                "wait_avg_ms": round(self.wait_total / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max, 3),
+                "wait_histogram": dict(zip(labels, self.wait_counts)),
+                "timeouts": self.timeouts,
+                "connection_errors": self.connection_errors,
+                "connections_created": self.connections_created,
+                "connections_invalidated": self.connections_invalidated,
+            }
+
+
+# 同步引擎的连接池统计
+pool_metrics = PoolMetrics()
+
+
+class TimedQueuePool(QueuePool):
+    """记录获取连接等待时间和失败次数的 QueuePool"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.record_error(timeout=True)
+            raise
+        except Exception:
+            pool_metrics.record_error()
+            raise
+        pool_metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+
+def _is_memory_sqlite(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def get_engine_options(database_url: str, is_async: bool = False) -> Dict[str, Any]:
+    """根据配置生成 create_engine 的连接池和语句超时参数"""
+    url = make_url(database_url)
+    options: Dict[str, Any] = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+
+    # 内存 SQLite 使用单连接池，不支持连接数配置
+    if not _is_memory_sqlite(url):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+        if not is_async:
+            options["poolclass"] = TimedQueuePool
+
+    # 语句超时由 PostgreSQL 服务端执行
+    if settings.DB_STATEMENT_TIMEOUT and url.get_backend_name() == "postgresql":
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT}"}
+
+    return options
+
 
 # 创建数据库引擎
-engine = create_engine(settings.DATABASE_URL)
+engine = create_engine(settings.DATABASE_URL, **get_engine_options(settings.DATABASE_URL))
+
+
+instrument_engine(engine)
+
+
+@event.listens_for(engine, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    pool_metrics.record_connect()
+
+
+@event.listens_for(engine, "invalidate")
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    pool_metrics.record_invalidate()
+
+
+def get_pool_status() -> Dict[str, Any]:
+    """同步引擎连接池的当前状态和累计统计"""
+    pool = engine.pool
+    status: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        capacity = pool.size() + settings.DB_MAX_OVERFLOW
+        checked_out = pool.checkedout()
+        status.update(
+            size=pool.size(),
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            checked_out=checked_out,
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            utilization_percent=round(checked_out / capacity * 100, 2) if capacity else 0.0,
+        )
+    status.update(pool_metrics.snapshot())
+    return status
 
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -18,4 +181,50 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# 同步连接串的数据库类型 -> 异步驱动
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+# 异步引擎和会话工厂，首次使用时创建；未启用异步数据库时不会创建，也不需要安装异步驱动
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
+
+def get_async_database_url() -> str:
+    """异步引擎的连接串：优先使用 ASYNC_DATABASE_URL，否则把 DATABASE_URL 的驱动换成对应的异步驱动"""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    url = make_url(settings.DATABASE_URL)
+    drivername = ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)
+    return url.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+def get_async_session_factory() -> async_sessionmaker:
+    """获取异步会话工厂"""
+    global _async_engine, _async_session_factory
+    if _async_session_factory is None:
+        database_url = get_async_database_url()
+        _async_engine = create_async_engine(database_url, **get_engine_options(database_url, is_async=True))
+        instrument_engine(_async_engine.sync_engine)
+        _async_session_factory = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_session_factory
+
+
+async def dispose_async_engine():
+    """关闭异步引擎的连接池"""
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_session_factory = None
+
+
+# 异步依赖函数
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with get_async_session_factory()() as db:
+        yield db
@@ -1,12 +1,119 @@
+import atexit
 import logging
 import logging.handlers
+import queue
 import sys
+import threading
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Tuple
 import structlog
 from config.settings import settings
 
 
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    写入有界队列的日志处理器
+
+    记录日志的线程只把记录放入队列，由 QueueListener 线程写控制台和文件；
+    队列已满（写入速度跟不上）时丢弃新的记录并计数，不阻塞事件循环和导入线程。
+    """
+    
+    def __init__(self, log_queue: queue.Queue, on_drop: Optional[Callable[[], None]] = None):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self.on_drop = on_drop
+    
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            if self.on_drop is not None:
+                self.on_drop()
+
+
+def parse_log_sampling(value: str) -> Dict[str, int]:
+    """解析日志采样配置 "日志器名=N,..."，返回 {日志器名: N}"""
+    rates = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        name, rate = item.rsplit("=", 1)
+        rates[name.strip()] = int(rate)
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """
+    高频日志采样
+
+    对 rates 中的日志器（包括其子日志器），同一位置（日志器名+行号）的 INFO 及以下级别日志每秒保留前 initial 条，
+    之后每 N 条保留 1 条，例如导入一万条记录时逐条记录的“跳过重复记录”只写入很少的几条。
+    WARNING 及以上级别不采样；少量的日志（如每次导入结束的汇总）不受影响。
+    """
+    
+    def __init__(
+        self,
+        rates: Dict[str, int],
+        initial: int = 10,
+        on_drop: Optional[Callable[[], None]] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        super().__init__()
+        self.rates = rates
+        self.initial = initial
+        self.on_drop = on_drop
+        self.clock = clock
+        self.dropped = 0
+        self._rate_cache: Dict[str, int] = {}
+        # (日志器名, 行号) -> (所在秒, 该秒内的条数)
+        self._counts: Dict[Tuple[str, int], Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+    
+    def _rate(self, name: str) -> int:
+        """日志器的采样间隔，取配置中最长的匹配前缀，未配置时为1（不采样）"""
+        rate = self._rate_cache.get(name)
+        if rate is None:
+            rate = 1
+            prefix = name
+            while prefix:
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+                prefix = prefix.rpartition(".")[0]
+            self._rate_cache[name] = rate
+        return rate
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        if rate <= 1:
+            return True
+        
+        key = (record.name, record.lineno)
+        tick = int(self.clock())
+        with self._lock:
+            last_tick, count = self._counts.get(key, (tick, 0))
+            if last_tick != tick:
+                count = 0
+            count += 1
+            self._counts[key] = (tick, count)
+        
+        if count <= self.initial or (count - self.initial) % rate == 0:
+            return True
+        self.dropped += 1
+        if self.on_drop is not None:
+            self.on_drop()
+        return False
+
+
+# 当前的日志队列监听线程及其写入的处理器
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[DroppingQueueHandler] = None
+
+
 def setup_logging(
     log_level: Optional[str] = None,
     log_file: Optional[str] = None,
@@ -41,14 +148,14 @@ def setup_logging(
     root_logger = logging.getLogger()
     root_logger.setLevel(getattr(logging, log_level.upper()))
     
-    # 清除现有处理器
+    # 停止之前的监听线程，清除现有处理器
+    shutdown_logging()
     root_logger.handlers.clear()
     
     # 控制台处理器
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(formatter)
     console_handler.setLevel(getattr(logging, log_level.upper()))
-    root_logger.addHandler(console_handler)
     
     # 文件处理器（带轮转）
     file_handler = logging.handlers.RotatingFileHandler(
@@ -59,7 +166,9 @@ def setup_logging(
     )
     file_handler.setFormatter(formatter)
     file_handler.setLevel(getattr(logging, log_level.upper()))
-    root_logger.addHandler(file_handler)
+    
+    # 根日志器只把记录放入队列，由监听线程写控制台和文件
+    start_queue_logging(root_logger, [console_handler, file_handler])
     
     # 配置第三方库日志级别
     logging.getLogger("uvicorn").setLevel(logging.INFO)
@@ -92,6 +201,48 @@ def get_logger(name: str) -> structlog.BoundLogger:
     return structlog.get_logger(name)
 
 
+def start_queue_logging(root_logger: logging.Logger, handlers: List[logging.Handler]):
+    """为根日志器安装队列处理器和高频日志采样，启动写入 handlers 的监听线程"""
+    global _listener, _queue_handler
+    from core.metrics import LOG_RECORDS_DROPPED
+    
+    _queue_handler = DroppingQueueHandler(
+        queue.Queue(maxsize=settings.LOG_QUEUE_SIZE),
+        on_drop=lambda: LOG_RECORDS_DROPPED.inc(reason="queue_full")
+    )
+    _queue_handler.addFilter(SamplingFilter(
+        parse_log_sampling(settings.LOG_SAMPLING),
+        initial=settings.LOG_SAMPLE_INITIAL,
+        on_drop=lambda: LOG_RECORDS_DROPPED.inc(reason="sampled")
+    ))
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    root_logger.addHandler(_queue_handler)
+
+
+def shutdown_logging():
+    """
+    停止监听线程，写完队列中剩余的日志
+
+    之后根日志器直接使用原来的处理器（同步写入），关闭过程中的日志不会丢失。
+    """
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    root_logger = logging.getLogger()
+    root_logger.removeHandler(_queue_handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        root_logger.addHandler(handler)
+    if _queue_handler.dropped:
+        root_logger.warning("日志队列已满，共丢弃 %d 条日志", _queue_handler.dropped)
+    _listener = None
+    _queue_handler = None
+
+
+atexit.register(shutdown_logging)
+
+
 # 应用启动时设置日志
 def init_logging():
     """初始化日志配置"""
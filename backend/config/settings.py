@@ -23,14 +23,25 @@ class Settings(BaseSettings):
     # 服务器配置
     HOST: str = Field(default="127.0.0.1", env="HOST")
     PORT: int = Field(default=8000, env="PORT")
+    THREADPOOL_SIZE: int = Field(default=40, env="THREADPOOL_SIZE")  # 执行同步路由和依赖的线程数上限
     
     # 安全配置
     SECRET_KEY: str = Field(..., env="SECRET_KEY")
     ALGORITHM: str = Field(default="HS256", env="ALGORITHM")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(default=30, env="ACCESS_TOKEN_EXPIRE_MINUTES")
+    AUTH_CACHE_SIZE: int = Field(default=1024, env="AUTH_CACHE_SIZE")  # 缓存的用户及家庭成员关系数上限
+    AUTH_CACHE_TTL: int = Field(default=60, env="AUTH_CACHE_TTL")  # 用户及家庭成员关系缓存时间（秒），多进程部署时其他进程最多延迟该时间生效
     
     # 数据库配置
     DATABASE_URL: str = Field(..., env="DATABASE_URL")
+    DB_ASYNC_ENABLED: bool = Field(default=False, env="DB_ASYNC_ENABLED")  # 账单列表、统计和用户认证使用异步数据库会话
+    ASYNC_DATABASE_URL: Optional[str] = Field(default=None, env="ASYNC_DATABASE_URL")  # 未设置时由DATABASE_URL换用异步驱动
+    DB_POOL_SIZE: int = Field(default=10, env="DB_POOL_SIZE")  # 连接池常驻连接数
+    DB_MAX_OVERFLOW: int = Field(default=30, env="DB_MAX_OVERFLOW")  # 超出常驻连接数后可临时创建的连接数，两者之和不小于THREADPOOL_SIZE
+    DB_POOL_TIMEOUT: int = Field(default=30, env="DB_POOL_TIMEOUT")  # 等待空闲连接的超时时间（秒）
+    DB_POOL_RECYCLE: int = Field(default=1800, env="DB_POOL_RECYCLE")  # 连接使用超过该时间（秒）后重建，-1表示不重建
+    DB_POOL_PRE_PING: bool = Field(default=True, env="DB_POOL_PRE_PING")  # 取出连接前检查连接是否可用
+    DB_STATEMENT_TIMEOUT: int = Field(default=0, env="DB_STATEMENT_TIMEOUT")  # 单条SQL的超时时间（毫秒），0表示不限制，仅PostgreSQL
     
     # CORS配置
     CORS_ORIGINS: str = Field(
@@ -43,14 +54,56 @@ class Settings(BaseSettings):
     UPLOAD_DIR: str = Field(default="uploads", env="UPLOAD_DIR")
     MAX_FILE_SIZE: int = Field(default=10 * 1024 * 1024, env="MAX_FILE_SIZE")  # 10MB
     ALLOWED_EXTENSIONS: str = Field(default=".csv,.xlsx,.xls", env="ALLOWED_EXTENSIONS")
+    IMPORT_BATCH_SIZE: int = Field(default=500, env="IMPORT_BATCH_SIZE")  # 批量写入每批记录数
+    CMB_PARSE_WORKERS: int = Field(default=4, env="CMB_PARSE_WORKERS")  # 招商银行PDF并行提取的进程数
+    CMB_PARALLEL_MIN_PAGES: int = Field(default=8, env="CMB_PARALLEL_MIN_PAGES")  # 达到该页数才启用多进程
+    UPLOAD_WORKERS: int = Field(default=2, env="UPLOAD_WORKERS")  # 后台导入的工作线程数
+    UPLOAD_QUEUE_SIZE: int = Field(default=10, env="UPLOAD_QUEUE_SIZE")  # 排队等待的导入任务数上限
+    UPLOAD_STALE_SECONDS: int = Field(default=3600, env="UPLOAD_STALE_SECONDS")  # 启动时将创建超过该时间仍在导入中的上传记录标记为失败
+    PARSE_CACHE_ENABLED: bool = Field(default=True, env="PARSE_CACHE_ENABLED")  # 按文件哈希缓存解析结果
+    PARSE_CACHE_TTL: int = Field(default=86400, env="PARSE_CACHE_TTL")  # 解析缓存保留时间（秒）
+    
+    # 分类缓存配置
+    CATEGORY_CACHE_SIZE: int = Field(default=256, env="CATEGORY_CACHE_SIZE")  # 缓存的家庭数上限
+    CATEGORY_CACHE_TTL: int = Field(default=300, env="CATEGORY_CACHE_TTL")  # 秒
+    
+    # 账单列表与统计配置
+    BILL_COUNT_CACHE_SIZE: int = Field(default=1024, env="BILL_COUNT_CACHE_SIZE")  # 缓存的筛选条件数上限
+    BILL_COUNT_CACHE_TTL: int = Field(default=60, env="BILL_COUNT_CACHE_TTL")  # 游标分页总数缓存时间（秒）
+    STATS_USE_ROLLUP: bool = Field(default=True, env="STATS_USE_ROLLUP")  # 整月统计读取月度汇总表
     
     # 日志配置
     LOG_LEVEL: str = Field(default="INFO", env="LOG_LEVEL")
     LOG_FILE: str = Field(default="logs/app.log", env="LOG_FILE")
+    LOG_QUEUE_SIZE: int = Field(default=10000, env="LOG_QUEUE_SIZE")  # 等待写入的日志条数上限，队列满时丢弃新的日志并计数
+    LOG_SAMPLING: str = Field(
+        default="services.upload_import=100,services.bill_import=100,api.upload=100,parsers=100",
+        description="高频日志采样，逗号分隔的“日志器名=N”，同一位置的 INFO 及以下级别日志超出每秒条数后每 N 条保留 1 条",
+        env="LOG_SAMPLING"
+    )
+    LOG_SAMPLE_INITIAL: int = Field(default=10, env="LOG_SAMPLE_INITIAL")  # 采样的日志器中同一位置每秒保留的前几条日志
+    
+    # 监控指标配置
+    SLOW_QUERY_MS: int = Field(default=500, env="SLOW_QUERY_MS")  # 执行时间超过该值（毫秒）的SQL记录到日志
+    N_PLUS_ONE_THRESHOLD: int = Field(default=10, env="N_PLUS_ONE_THRESHOLD")  # 同一请求中相同结构的查询执行该次数以上时记录疑似N+1
+    METRICS_MULTIPROC_DIR: Optional[str] = Field(default=None, env="METRICS_MULTIPROC_DIR")  # 多个工作进程共享指标的目录，启动前需清空
+    METRICS_FLUSH_INTERVAL: float = Field(default=5.0, env="METRICS_FLUSH_INTERVAL")  # 各进程写入共享目录的间隔（秒）
     
     # Redis配置（可选）
     REDIS_URL: Optional[str] = Field(default=None, env="REDIS_URL")
     
+    # 速率限制配置（生产环境启用）
+    RATE_LIMIT_CALLS: int = Field(default=100, env="RATE_LIMIT_CALLS")  # 每个客户端的令牌桶容量，即允许的突发请求数
+    RATE_LIMIT_PERIOD: int = Field(default=60, env="RATE_LIMIT_PERIOD")  # 令牌从空到满的时间（秒）
+    RATE_LIMIT_BACKEND: str = Field(default="memory", env="RATE_LIMIT_BACKEND")  # memory（每个进程单独计数）、sqlite（同一主机共享）或 redis
+    RATE_LIMIT_SQLITE_PATH: str = Field(default="rate_limit.db", env="RATE_LIMIT_SQLITE_PATH")  # sqlite 后端的文件路径
+    RATE_LIMIT_MAX_CLIENTS: int = Field(default=10000, env="RATE_LIMIT_MAX_CLIENTS")  # memory 后端保留的客户端数上限
+    RATE_LIMIT_ROUTE_COSTS: str = Field(
+        default="POST /api/v1/upload=10,/api/v1/bills/stats=2",
+        description="各路由每次请求消耗的令牌数，逗号分隔的“[方法 ]路径前缀=消耗”，未匹配的路由消耗1个",
+        env="RATE_LIMIT_ROUTE_COSTS"
+    )
+    
     @validator('SECRET_KEY')
     def secret_key_must_be_strong(cls, v):
         if len(v) < 32:
@@ -64,6 +117,13 @@ class Settings(BaseSettings):
             raise ValueError(f'ENVIRONMENT must be one of {valid_envs}')
         return v
     
+    @validator('RATE_LIMIT_BACKEND')
+    def rate_limit_backend_must_be_valid(cls, v):
+        valid_backends = ['memory', 'sqlite', 'redis']
+        if v not in valid_backends:
+            raise ValueError(f'RATE_LIMIT_BACKEND must be one of {valid_backends}')
+        return v
+    
     @validator("CORS_ORIGINS", pre=True)
     def parse_cors_origins(cls, v):
         """解析CORS origins"""
@@ -105,6 +165,11 @@ class Settings(BaseSettings):
         path.mkdir(exist_ok=True)
         return path
     
+    @property
+    def rate_limit_sqlite_path(self) -> Path:
+        """速率限制 sqlite 后端的文件路径"""
+        return BASE_DIR / self.RATE_LIMIT_SQLITE_PATH
+    
     @property
     def log_path(self) -> Path:
         """日志文件路径"""
@@ -0,0 +1,101 @@
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config.logging import get_logger
+from config.settings import settings
+from core.metrics import DB_QUERY_DURATION
+
+logger = get_logger(__name__)
+
+# IN 列表中的绑定参数，参数个数不同的语句视为同一结构，如 IN (?, ?, ?) -> IN (?)
+_BIND_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|\$\d+|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|\$\d+|:\w+))+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """SQL语句的结构：合并空白和 IN 列表中的参数，参数值不同的同一查询得到相同的结构"""
+    return _BIND_LIST.sub("(?)", _WHITESPACE.sub(" ", statement).strip())
+
+
+class RequestQueryStats:
+    """一个请求内执行的SQL语句数、数据库耗时和各 SELECT 结构的执行次数"""
+
+    def __init__(self, request_id: Optional[str] = None):
+        self.request_id = request_id
+        self.count = 0
+        self.total_time = 0.0
+        self.select_shapes: Dict[str, int] = {}
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.total_time += elapsed
+        if statement.lstrip()[:6].upper() == "SELECT":
+            shape = statement_shape(statement)
+            self.select_shapes[shape] = self.select_shapes.get(shape, 0) + 1
+
+    def repeated_selects(self, threshold: int) -> List[Tuple[str, int]]:
+        """执行次数达到 threshold 的 SELECT 结构，通常是在循环中逐条查询（N+1）"""
+        return [(shape, count) for shape, count in self.select_shapes.items() if count >= threshold]
+
+
+# 当前请求的SQL统计；同步路由在线程池中执行时上下文随之复制，统计对象是同一个
+_current_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+
+
+@contextmanager
+def track_queries(request_id: Optional[str] = None) -> Iterator[RequestQueryStats]:
+    """统计上下文内执行的SQL，结束时记录疑似 N+1 的查询"""
+    stats = RequestQueryStats(request_id)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+        for shape, count in stats.repeated_selects(settings.N_PLUS_ONE_THRESHOLD):
+            logger.warning(
+                "疑似N+1查询",
+                request_id=request_id,
+                count=count,
+                statement=shape[:500]
+            )
+
+
+def instrument_engine(engine: Engine):
+    """统计引擎执行的每条SQL语句：耗时直方图、当前请求的语句数和数据库耗时、慢查询日志"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start_times = conn.info.get("query_start_time")
+        if not start_times:
+            return
+        elapsed = time.perf_counter() - start_times.pop()
+        DB_QUERY_DURATION.observe(elapsed)
+
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.record(statement, elapsed)
+
+        if elapsed * 1000 >= settings.SLOW_QUERY_MS:
+            logger.warning(
+                "慢查询",
+                request_id=stats.request_id if stats is not None else None,
+                duration_ms=round(elapsed * 1000, 2),
+                statement=_WHITESPACE.sub(" ", statement)[:1000]
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        connection = exception_context.connection
+        start_times = connection.info.get("query_start_time") if connection is not None else None
+        if start_times:
+            start_times.pop()
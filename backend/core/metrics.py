@@ -0,0 +1,360 @@
+import glob
+import json
+import math
+import os
+import threading
+import weakref
+from bisect import bisect_left
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from config.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Prometheus 文本格式的媒体类型，charset 由响应类添加
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4"
+
+# 请求耗时直方图的桶上限（秒）
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelKey = Tuple[str, ...]
+
+
+class Metric:
+    """带标签的指标，按标签值分别计数，线程安全"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelKey, Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelKey:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self) -> Dict[LabelKey, Any]:
+        """当前各标签值的副本"""
+        with self._lock:
+            return {key: list(value) if isinstance(value, list) else value for key, value in self._values.items()}
+
+    @staticmethod
+    def merge(left: Any, right: Any) -> Any:
+        """合并两个进程的同一组标签值"""
+        return left + right
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    """只增不减的计数"""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """可增可减的当前值，多进程时取各存活进程之和"""
+
+    type = "gauge"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    """
+    分布统计，各标签值保存 [各桶计数..., +Inf 桶计数, 总和]
+
+    桶计数不累加，导出时再转换为 Prometheus 要求的累计计数。
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    @staticmethod
+    def merge(left: List[float], right: List[float]) -> List[float]:
+        return [a + b for a, b in zip(left, right)]
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class MetricsRegistry:
+    """
+    指标注册表，导出 Prometheus 文本格式
+
+    uvicorn 以多个工作进程运行时，调用 enable_multiprocess 后每个进程定期将自己的指标写入共享目录中的
+    <pid>.json，导出时合并所有进程的文件：计数和直方图累加（包括已退出的进程），当前值只累加存活的进程。
+    共享目录应在启动所有工作进程之前由部署脚本清空。
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+        self._directory: Optional[str] = None
+        self._stop_event = threading.Event()
+        self._flush_thread: Optional[threading.Thread] = None
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指标已注册: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def enable_multiprocess(self, directory: str, flush_interval: float = 5.0):
+        """开始定期将本进程的指标写入共享目录"""
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._stop_event.clear()
+        self.flush()
+
+        def flush_loop():
+            while not self._stop_event.wait(flush_interval):
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.error("写入指标文件失败", error=str(e))
+
+        self._flush_thread = threading.Thread(target=flush_loop, name="metrics-flush", daemon=True)
+        self._flush_thread.start()
+
+    def stop(self):
+        """停止定期写入，并写入最后一次"""
+        if self._flush_thread is not None:
+            self._stop_event.set()
+            self._flush_thread.join()
+            self._flush_thread = None
+            self.flush()
+        self._directory = None
+
+    def flush(self):
+        """将本进程的指标写入共享目录"""
+        if self._directory is None:
+            return
+        data = {
+            name: [[list(key), value] for key, value in metric.snapshot().items()]
+            for name, metric in self._metrics.items()
+        }
+        path = os.path.join(self._directory, f"{os.getpid()}.json")
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(temp_path, path)
+
+    def _other_processes(self) -> Iterator[Tuple[int, Dict[str, list]]]:
+        """读取共享目录中其他进程写入的指标"""
+        if self._directory is None:
+            return
+        for path in glob.glob(os.path.join(self._directory, "*.json")):
+            try:
+                pid = int(os.path.basename(path)[:-len(".json")])
+            except ValueError:
+                continue
+            if pid == os.getpid():
+                continue
+            try:
+                with open(path, encoding="utf-8") as f:
+                    yield pid, json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning("读取指标文件失败", path=path, error=str(e))
+
+    def collect(self) -> List[Tuple[Metric, Dict[LabelKey, Any]]]:
+        """所有指标及其（多进程时合并后的）各标签值"""
+        merged = {name: metric.snapshot() for name, metric in self._metrics.items()}
+        for pid, data in self._other_processes():
+            alive = None
+            for name, samples in data.items():
+                metric = self._metrics.get(name)
+                if metric is None:
+                    continue
+                if metric.type == "gauge":
+                    if alive is None:
+                        alive = _pid_alive(pid)
+                    if not alive:
+                        continue
+                values = merged[name]
+                for key, value in samples:
+                    key = tuple(key)
+                    values[key] = metric.merge(values[key], value) if key in values else value
+        return [(metric, merged[name]) for name, metric in self._metrics.items()]
+
+    def render(self) -> str:
+        """Prometheus 文本格式"""
+        lines = []
+        for metric, values in self.collect():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for key, value in sorted(values.items()):
+                if isinstance(metric, Histogram):
+                    cumulative = 0
+                    for upper, count in zip(metric.buckets + (math.inf,), value[:-1]):
+                        cumulative += count
+                        labels = _format_labels(metric.labelnames + ("le",), key + (_format_value(float(upper)),))
+                        lines.append(f"{metric.name}_bucket{labels} {cumulative}")
+                    labels = _format_labels(metric.labelnames, key)
+                    lines.append(f"{metric.name}_sum{labels} {_format_value(float(value[-1]))}")
+                    lines.append(f"{metric.name}_count{labels} {cumulative}")
+                else:
+                    lines.append(f"{metric.name}{_format_labels(metric.labelnames, key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# 应用的指标注册表
+registry = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP请求处理时间（秒），按方法、路由模板和状态码统计",
+    ("method", "route", "status")
+)
+HTTP_REQUESTS_IN_PROGRESS = registry.gauge(
+    "http_requests_in_progress",
+    "正在处理的HTTP请求数",
+    ("method",)
+)
+BILL_IMPORT_ROWS = registry.counter(
+    "bill_import_rows_total",
+    "导入的账单记录数，outcome 为 created、updated 或 failed",
+    ("source_type", "outcome")
+)
+BILL_IMPORT_DURATION = registry.histogram(
+    "bill_import_duration_seconds",
+    "账单文件导入耗时（秒）",
+    ("source_type",),
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+)
+DB_QUERY_DURATION = registry.histogram(
+    "db_query_duration_seconds",
+    "SQL语句执行时间（秒），_count 即执行的语句数",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+LOG_RECORDS_DROPPED = registry.counter(
+    "log_records_dropped_total",
+    "未写入的日志条数，reason 为 queue_full（日志队列已满）或 sampled（高频日志采样）",
+    ("reason",)
+)
+
+
+# 应用 -> {路由函数: 路由模板}
+_route_templates: "weakref.WeakKeyDictionary[Any, Dict[Any, str]]" = weakref.WeakKeyDictionary()
+
+
+def get_route_template(scope: Dict[str, Any]) -> str:
+    """
+    请求匹配到的路由模板（如 /api/v1/bills/{bill_id}），用作指标标签，避免按实际路径产生过多的标签值
+
+    需要在路由处理之后调用；未匹配任何路由时返回 "unmatched"。
+    """
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is None or app is None:
+        return "unmatched"
+
+    templates = _route_templates.get(app)
+    if templates is None:
+        templates = {}
+        for route in getattr(app, "routes", []):
+            templates.setdefault(getattr(route, "endpoint", None), getattr(route, "path", ""))
+        _route_templates[app] = templates
+    return templates.get(endpoint, "unmatched")
+
+
+def http_request_totals() -> Tuple[int, int]:
+    """请求总数和服务端错误（5xx）数，多进程时为所有进程之和"""
+    total = errors = 0
+    for metric, values in registry.collect():
+        if metric is HTTP_REQUEST_DURATION:
+            for key, value in values.items():
+                count = sum(value[:-1])
+                total += count
+                if key[2].startswith("5"):
+                    errors += count
+    return total, errors
+
+
+def record_bill_import(source_type: str, created: int, updated: int, failed: int, seconds: float):
+    """记录一次文件导入，导入速率（条/秒）= rate(bill_import_rows_total) / rate(bill_import_duration_seconds_sum)"""
+    BILL_IMPORT_ROWS.inc(created, source_type=source_type, outcome="created")
+    BILL_IMPORT_ROWS.inc(updated, source_type=source_type, outcome="updated")
+    BILL_IMPORT_ROWS.inc(failed, source_type=source_type, outcome="failed")
+    BILL_IMPORT_DURATION.observe(seconds, source_type=source_type)
+
@@ -1,150 +1,240 @@
+import math
 import time
 import uuid
-from typing import Callable
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from typing import Optional
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from jose import JWTError, jwt
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from config.logging import get_logger
-from api.health import increment_request_count, increment_error_count
+from config.settings import settings
+from core.db_instrumentation import track_queries
+from core.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_PROGRESS, get_route_template
+from core.rate_limit import MemoryRateLimitBackend, RateLimitBackend, parse_route_costs
+from schemas.common import ApiResponse
 
 logger = get_logger(__name__)
 
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    """请求日志中间件"""
+class RequestLoggingMiddleware:
+    """
+    请求日志中间件
+
+    纯 ASGI 实现：在响应开始时添加请求ID、处理时间等响应头，响应体原样转发，流式响应不会被缓冲。
+    "请求完成" 日志和耗时指标在响应体发送完毕后记录。
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        request = Request(scope)
+        
         # 生成请求ID
         request_id = str(uuid.uuid4())
         request.state.request_id = request_id
         
         # 记录请求开始时间
-        start_time = time.time()
+        start_time = time.perf_counter()
         
-        # 增加请求计数
-        increment_request_count()
+        # 正在处理的请求数
+        method = request.method
+        HTTP_REQUESTS_IN_PROGRESS.inc(method=method)
+        status_code = 500
+        query_stats = None
         
         # 记录请求信息
         logger.info(
             "请求开始",
             request_id=request_id,
-            method=request.method,
+            method=method,
             url=str(request.url),
             client_ip=request.client.host if request.client else None,
             user_agent=request.headers.get("user-agent"),
         )
         
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                
+                # 添加响应头，处理时间为开始发送响应的时间
+                headers = MutableHeaders(scope=message)
+                headers["X-Request-ID"] = request_id
+                headers["X-Process-Time"] = str(round((time.perf_counter() - start_time) * 1000, 2))
+                if not settings.is_production:
+                    headers["X-DB-Queries"] = str(query_stats.count)
+                    headers["X-DB-Time"] = str(round(query_stats.total_time * 1000, 2))
+            await send(message)
+        
         try:
-            # 处理请求
-            response = await call_next(request)
-            
-            # 计算处理时间
-            process_time = time.time() - start_time
-            
-            # 记录响应信息
-            logger.info(
-                "请求完成",
-                request_id=request_id,
-                method=request.method,
-                url=str(request.url),
-                status_code=response.status_code,
-                process_time=round(process_time * 1000, 2),  # 毫秒
-            )
-            
-            # 添加响应头
-            response.headers["X-Request-ID"] = request_id
-            response.headers["X-Process-Time"] = str(round(process_time * 1000, 2))
-            
-            return response
+            # 处理请求，统计期间执行的SQL
+            with track_queries(request_id) as query_stats:
+                await self.app(scope, receive, send_wrapper)
             
         except Exception as e:
-            # 增加错误计数
-            increment_error_count()
-            
-            # 计算处理时间
-            process_time = time.time() - start_time
-            
             # 记录错误信息
             logger.error(
                 "请求处理异常",
                 request_id=request_id,
-                method=request.method,
+                method=method,
                 url=str(request.url),
                 error=str(e),
-                process_time=round(process_time * 1000, 2),
+                process_time=round((time.perf_counter() - start_time) * 1000, 2),
             )
             
             # 重新抛出异常，让异常处理器处理
             raise
+        
+        else:
+            # 记录响应信息
+            logger.info(
+                "请求完成",
+                request_id=request_id,
+                method=method,
+                url=str(request.url),
+                status_code=status_code,
+                process_time=round((time.perf_counter() - start_time) * 1000, 2),  # 毫秒
+                db_queries=query_stats.count,
+                db_time=round(query_stats.total_time * 1000, 2),
+            )
+        
+        finally:
+            # 按路由模板统计耗时，未发送响应就抛出的异常计为500
+            HTTP_REQUESTS_IN_PROGRESS.dec(method=method)
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start_time,
+                method=method,
+                route=get_route_template(scope),
+                status=status_code
+            )
 
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """安全头中间件"""
+class SecurityHeadersMiddleware:
+    """安全头中间件，纯 ASGI 实现，只修改响应头"""
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        response = await call_next(request)
-        
-        # 添加安全头
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
         # 在生产环境添加HSTS
-        if hasattr(request.app.state, "settings") and request.app.state.settings.is_production:
-            response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+        app_settings = getattr(getattr(scope.get("app"), "state", None), "settings", None)
+        hsts = app_settings is not None and app_settings.is_production
+        
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                # 添加安全头
+                headers = MutableHeaders(scope=message)
+                headers["X-Content-Type-Options"] = "nosniff"
+                headers["X-Frame-Options"] = "DENY"
+                headers["X-XSS-Protection"] = "1; mode=block"
+                headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+                if hsts:
+                    headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+            await send(message)
         
-        return response
+        await self.app(scope, receive, send_wrapper)
+
 
+class RateLimitMiddleware:
+    """
+    令牌桶速率限制中间件
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """简单的速率限制中间件"""
+    每个客户端的令牌桶容量为 calls，period 秒内从空补满。携带有效访问令牌的请求按用户计数，
+    其他请求按客户端IP计数；route_costs 为各路由每次请求消耗的令牌数，例如上传比列表查询消耗更多。
+    检查只读写当前客户端的桶，耗时与跟踪的客户端数无关；计数存储由 backend 提供，可以在多个工作进程间共享。
+    """
     
-    def __init__(self, app, calls: int = 100, period: int = 60):
-        super().__init__(app)
+    def __init__(
+        self,
+        app: ASGIApp,
+        calls: int = 100,
+        period: int = 60,
+        backend: Optional[RateLimitBackend] = None,
+        route_costs: str = ""
+    ):
+        self.app = app
         self.calls = calls
         self.period = period
-        self.clients = {}
+        self.backend = backend or MemoryRateLimitBackend(calls, calls / period)
+        self.route_costs = parse_route_costs(route_costs)
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        client_ip = request.client.host if request.client else "unknown"
-        current_time = time.time()
-        
-        # 清理过期记录
-        self.clients = {
-            ip: timestamps for ip, timestamps in self.clients.items()
-            if any(t > current_time - self.period for t in timestamps)
-        }
-        
-        # 检查当前客户端的请求频率
-        if client_ip in self.clients:
-            # 过滤最近时间段内的请求
-            recent_requests = [
-                t for t in self.clients[client_ip]
-                if t > current_time - self.period
-            ]
-            
-            if len(recent_requests) >= self.calls:
-                logger.warning(
-                    "速率限制触发",
-                    client_ip=client_ip,
-                    request_count=len(recent_requests),
-                    limit=self.calls
-                )
-                
-                from fastapi.responses import JSONResponse
-                from schemas.common import ApiResponse
-                
-                return JSONResponse(
-                    status_code=429,
-                    content=ApiResponse(
-                        success=False,
-                        message="请求过于频繁，请稍后再试",
-                        error_code="RATE_LIMIT_EXCEEDED"
-                    ).dict()
-                )
+    def get_cost(self, request: Request) -> float:
+        """本次请求消耗的令牌数，不超过桶容量"""
+        path = request.url.path
+        for method, prefix, cost in self.route_costs:
+            if path.startswith(prefix) and (method is None or method == request.method):
+                return min(cost, self.calls)
+        return 1
+    
+    @staticmethod
+    def get_client_key(request: Request) -> str:
+        """限流计数的键：有效访问令牌中的用户名，否则为客户端IP"""
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and token:
+            try:
+                payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+                if payload.get("sub"):
+                    return f"user:{payload['sub']}"
+            except JWTError:
+                pass
+        return f"ip:{request.client.host if request.client else 'unknown'}"
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        request = Request(scope)
+        client_key = self.get_client_key(request)
+        cost = self.get_cost(request)
+        
+        try:
+            result = await self.backend.consume(client_key, cost)
+        except Exception as e:
+            # 计数存储不可用时不限制请求
+            logger.error("速率限制检查失败", client=client_key, error=str(e))
+            await self.app(scope, receive, send)
+            return
+        
+        if not result.allowed:
+            logger.warning(
+                "速率限制触发",
+                client=client_key,
+                cost=cost,
+                limit=self.calls
+            )
             
-            self.clients[client_ip] = recent_requests + [current_time]
-        else:
-            self.clients[client_ip] = [current_time]
+            response = JSONResponse(
+                status_code=429,
+                content=ApiResponse(
+                    success=False,
+                    message="请求过于频繁，请稍后再试",
+                    error_code="RATE_LIMIT_EXCEEDED"
+                ).model_dump(mode='json'),
+                headers={
+                    "Retry-After": str(math.ceil(result.retry_after)),
+                    "X-RateLimit-Limit": str(self.calls),
+                    "X-RateLimit-Remaining": "0",
+                }
+            )
+            await response(scope, receive, send)
+            return
+        
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-RateLimit-Limit"] = str(self.calls)
+                headers["X-RateLimit-Remaining"] = str(int(result.remaining))
+            await send(message)
         
-        return await call_next(request)
\ No newline at end of file
+        await self.app(scope, receive, send_wrapper)
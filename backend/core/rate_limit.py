@@ -0,0 +1,246 @@
+from abc import ABC, abstractmethod
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from anyio import to_thread
+
+from config.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class RateLimitResult(NamedTuple):
+    """一次限流检查的结果"""
+    allowed: bool
+    remaining: float  # 扣减后桶内剩余的令牌数
+    retry_after: float  # 被拒绝时，令牌恢复到足够支付本次消耗所需的秒数
+
+
+def take_tokens(
+    tokens: float,
+    updated_at: float,
+    now: float,
+    cost: float,
+    capacity: float,
+    refill_rate: float
+) -> Tuple[float, RateLimitResult]:
+    """
+    令牌桶计算：按经过的时间补充令牌后尝试扣减 cost 个
+
+    返回扣减后的令牌数和检查结果，各存储后端共用。
+    """
+    tokens = min(capacity, tokens + max(0.0, now - updated_at) * refill_rate)
+    if tokens >= cost:
+        tokens -= cost
+        return tokens, RateLimitResult(True, tokens, 0.0)
+    return tokens, RateLimitResult(False, tokens, (cost - tokens) / refill_rate)
+
+
+class RateLimitBackend(ABC):
+    """
+    令牌桶存储后端
+
+    每个客户端一个桶，容量为 capacity 个令牌，每秒补充 refill_rate 个。
+    每次检查只读写该客户端的一条记录，与客户端总数无关。
+    """
+
+    def __init__(self, capacity: float, refill_rate: float):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+
+    @property
+    def idle_seconds(self) -> float:
+        """空桶补满所需的时间，超过该时间未访问的桶与新桶等价，可以直接丢弃"""
+        return self.capacity / self.refill_rate
+
+    @abstractmethod
+    async def consume(self, key: str, cost: float = 1) -> RateLimitResult:
+        """从 key 对应的桶中扣减 cost 个令牌"""
+        pass
+
+    async def close(self):
+        """释放后端资源"""
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """进程内存储，按最近访问顺序最多保留 max_clients 个桶，每个工作进程单独计数"""
+
+    def __init__(
+        self,
+        capacity: float,
+        refill_rate: float,
+        max_clients: int = 10000,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        super().__init__(capacity, refill_rate)
+        self.max_clients = max_clients
+        self.clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def consume(self, key: str, cost: float = 1) -> RateLimitResult:
+        now = self.clock()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (self.capacity, now))
+            tokens, result = take_tokens(tokens, updated_at, now, cost, self.capacity, self.refill_rate)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            # 淘汰最久未访问的客户端
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return result
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SQLiteRateLimitBackend(RateLimitBackend):
+    """
+    SQLite 文件存储，同一主机上的多个工作进程共享计数
+
+    每次检查在 BEGIN IMMEDIATE 事务中读写一行，进程间串行执行；在线程池中执行，不阻塞事件循环。
+    每 cleanup_interval 次检查删除一次空闲超过 idle_seconds 的桶，文件大小只与近期活跃的客户端数有关。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        capacity: float,
+        refill_rate: float,
+        cleanup_interval: int = 1000,
+        clock: Callable[[], float] = time.time
+    ):
+        super().__init__(capacity, refill_rate)
+        self.path = path
+        self.cleanup_interval = cleanup_interval
+        self.clock = clock
+        self._calls = 0
+        self._lock = threading.Lock()
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    async def consume(self, key: str, cost: float = 1) -> RateLimitResult:
+        return await to_thread.run_sync(self.consume_sync, key, cost)
+
+    def consume_sync(self, key: str, cost: float = 1) -> RateLimitResult:
+        with self._lock:
+            connection = self._connection
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                now = self.clock()
+                row = connection.execute(
+                    "SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?", (key,)
+                ).fetchone()
+                tokens, updated_at = row if row else (self.capacity, now)
+                tokens, result = take_tokens(tokens, updated_at, now, cost, self.capacity, self.refill_rate)
+                connection.execute(
+                    "INSERT OR REPLACE INTO rate_limit_buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                    (key, tokens, now)
+                )
+
+                self._calls += 1
+                if self._calls % self.cleanup_interval == 0:
+                    connection.execute(
+                        "DELETE FROM rate_limit_buckets WHERE updated_at < ?", (now - self.idle_seconds,)
+                    )
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        return result
+
+    async def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+# 在 Redis 中原子地执行令牌桶计算，时间取 Redis 服务器时间，各主机的时钟偏差不影响结果
+REDIS_TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * refill_rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / refill_rate))
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Redis 存储，多台主机共享计数；桶在空闲 idle_seconds 后过期，需要安装 redis 包"""
+
+    def __init__(self, url: str, capacity: float, refill_rate: float, prefix: str = "rate_limit:"):
+        super().__init__(capacity, refill_rate)
+        from redis import asyncio as redis_asyncio
+
+        self.prefix = prefix
+        self._client = redis_asyncio.from_url(url)
+        self._script = self._client.register_script(REDIS_TOKEN_BUCKET_SCRIPT)
+
+    async def consume(self, key: str, cost: float = 1) -> RateLimitResult:
+        allowed, tokens = await self._script(
+            keys=[self.prefix + key],
+            args=[self.capacity, self.refill_rate, cost]
+        )
+        tokens = float(tokens)
+        if allowed:
+            return RateLimitResult(True, tokens, 0.0)
+        return RateLimitResult(False, tokens, (cost - tokens) / self.refill_rate)
+
+    async def close(self):
+        await self._client.close()
+
+
+def create_rate_limit_backend(settings) -> RateLimitBackend:
+    """根据配置创建限流存储后端"""
+    capacity = settings.RATE_LIMIT_CALLS
+    refill_rate = settings.RATE_LIMIT_CALLS / settings.RATE_LIMIT_PERIOD
+    backend = settings.RATE_LIMIT_BACKEND
+
+    if backend == "sqlite":
+        return SQLiteRateLimitBackend(str(settings.rate_limit_sqlite_path), capacity, refill_rate)
+    if backend == "redis":
+        if not settings.REDIS_URL:
+            raise ValueError("RATE_LIMIT_BACKEND=redis 需要配置 REDIS_URL")
+        return RedisRateLimitBackend(settings.REDIS_URL, capacity, refill_rate)
+    return MemoryRateLimitBackend(capacity, refill_rate, max_clients=settings.RATE_LIMIT_MAX_CLIENTS)
+
+
+def parse_route_costs(value: str) -> List[Tuple[Optional[str], str, float]]:
+    """
+    解析路由消耗配置，返回 (请求方法, 路径前缀, 消耗) 列表，路径前缀较长的排在前面
+
+    格式为逗号分隔的 "[方法 ]路径前缀=消耗"，例如 "POST /api/v1/upload=10,/api/v1/bills/stats=2"，
+    未写方法时匹配所有方法。
+    """
+    costs = []
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        route, cost = item.rsplit("=", 1)
+        parts = route.split()
+        method, prefix = (parts[0].upper(), parts[1]) if len(parts) == 2 else (None, parts[0])
+        costs.append((method, prefix, float(cost)))
+    costs.sort(key=lambda item: (len(item[1]), item[0] is not None), reverse=True)
+    return costs
@@ -1,7 +1,8 @@
 from config.database import Base, engine
 from models.user import User
 from models.family import Family, FamilyMember
-from models.bill import Bill, BillCategory
+from models.bill import Bill, BillCategory, BillMonthlyRollup
+from models.upload import UploadRecord
 
 def create_tables():
     Base.metadata.create_all(bind=engine)
@@ -1,11 +1,13 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from anyio import to_thread
 import uvicorn
 from contextlib import asynccontextmanager
 
 # 导入配置和日志
 from config.settings import settings
-from config.logging import init_logging, get_logger
+from config.logging import init_logging, get_logger, shutdown_logging
 
 # 导入路由
 from api import api_router
@@ -17,10 +19,20 @@ from core.middleware import (
     SecurityHeadersMiddleware,
     RateLimitMiddleware
 )
+from core.rate_limit import create_rate_limit_backend
+from core.metrics import CONTENT_TYPE_LATEST, registry as metrics_registry
 
 # 导入响应模型
 from schemas.common import ApiResponse
 
+# 后台导入任务队列
+from services.upload_jobs import upload_job_queue, fail_stale_uploads
+
+# 招商银行PDF解析的共享进程池
+from parsers.cmb_parser import shutdown_executor as shutdown_cmb_executor
+
+from config.database import dispose_async_engine
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -40,10 +52,30 @@ async def lifespan(app: FastAPI):
     settings.upload_path.mkdir(parents=True, exist_ok=True)
     settings.log_path.parent.mkdir(parents=True, exist_ok=True)
     
+    # 访问数据库、解析文件的路由都是同步函数，由 FastAPI 放到线程池中执行，不阻塞事件循环
+    to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    
+    # 多个工作进程时，各进程的指标写入共享目录，由 /metrics 合并导出
+    if settings.METRICS_MULTIPROC_DIR:
+        metrics_registry.enable_multiprocess(settings.METRICS_MULTIPROC_DIR, settings.METRICS_FLUSH_INTERVAL)
+    
+    # 上次运行中断的导入任务不会再执行，对应的上传记录标记为失败
+    try:
+        await to_thread.run_sync(fail_stale_uploads)
+    except Exception as e:
+        logger.error("处理中断的导入记录失败", error=str(e))
+    
     yield
     
-    # 关闭时清理
+    # 关闭时清理：等待正在执行的导入任务完成，取消排队中的任务，再关闭解析进程池
+    upload_job_queue.shutdown()
+    shutdown_cmb_executor()
+    await dispose_async_engine()
+    if rate_limit_backend is not None:
+        await rate_limit_backend.close()
+    metrics_registry.stop()
     logger.info("应用关闭")
+    shutdown_logging()
 
 
 # 创建FastAPI应用
@@ -76,8 +108,15 @@ app.add_middleware(SecurityHeadersMiddleware)
 app.add_middleware(RequestLoggingMiddleware)
 
 # 在生产环境启用速率限制
-if settings.is_production:
-    app.add_middleware(RateLimitMiddleware, calls=100, period=60)
+rate_limit_backend = create_rate_limit_backend(settings) if settings.is_production else None
+if rate_limit_backend is not None:
+    app.add_middleware(
+        RateLimitMiddleware,
+        calls=settings.RATE_LIMIT_CALLS,
+        period=settings.RATE_LIMIT_PERIOD,
+        backend=rate_limit_backend,
+        route_costs=settings.RATE_LIMIT_ROUTE_COSTS
+    )
 
 # 注册路由
 app.include_router(api_router)
@@ -97,6 +136,12 @@ async def root():
     )
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus 格式的监控指标"""
+    return PlainTextResponse(metrics_registry.render(), media_type=CONTENT_TYPE_LATEST)
+
+
 if __name__ == "__main__":
     # 使用settings配置启动服务器
     uvicorn.run(
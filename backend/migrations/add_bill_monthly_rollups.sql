@@ -0,0 +1,44 @@
+-- 添加账单月度汇总表bill_monthly_rollups
+-- 执行时间: 2026-10-17
+
+CREATE TABLE IF NOT EXISTS bill_monthly_rollups (
+    id SERIAL PRIMARY KEY,
+    family_id INTEGER NOT NULL REFERENCES families(id) ON DELETE CASCADE,
+    month DATE NOT NULL,
+    source_type VARCHAR(20) NOT NULL,
+    category_id INTEGER NOT NULL DEFAULT 0,
+    transaction_type VARCHAR(50) NOT NULL,
+    total_amount NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    bill_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_bill_monthly_rollups_key UNIQUE (family_id, month, source_type, category_id, transaction_type)
+);
+
+CREATE INDEX IF NOT EXISTS ix_bill_monthly_rollups_id ON bill_monthly_rollups(id);
+
+-- 之前执行过本迁移的数据库：删除家庭时级联删除汇总数据，字段长度与 init.sql 一致
+ALTER TABLE bill_monthly_rollups DROP CONSTRAINT IF EXISTS bill_monthly_rollups_family_id_fkey;
+ALTER TABLE bill_monthly_rollups
+    ADD CONSTRAINT bill_monthly_rollups_family_id_fkey FOREIGN KEY (family_id) REFERENCES families(id) ON DELETE CASCADE;
+ALTER TABLE bill_monthly_rollups ALTER COLUMN source_type TYPE VARCHAR(20);
+ALTER TABLE bill_monthly_rollups ALTER COLUMN transaction_type TYPE VARCHAR(50);
+
+-- 添加注释
+COMMENT ON TABLE bill_monthly_rollups IS '账单月度汇总，导入、修改、删除账单时在同一事务内增量维护';
+COMMENT ON COLUMN bill_monthly_rollups.month IS '月份（当月第一天）';
+COMMENT ON COLUMN bill_monthly_rollups.category_id IS '分类ID，0表示未分类';
+
+-- 根据现有账单回填汇总数据（也可以执行 python scripts/rebuild_rollups.py）
+INSERT INTO bill_monthly_rollups (family_id, month, source_type, category_id, transaction_type, total_amount, bill_count)
+SELECT
+    family_id,
+    date_trunc('month', transaction_time)::date,
+    source_type,
+    COALESCE(category_id, 0),
+    transaction_type,
+    SUM(amount),
+    COUNT(*)
+FROM bills
+WHERE family_id IS NOT NULL
+GROUP BY family_id, date_trunc('month', transaction_time)::date, source_type, COALESCE(category_id, 0), transaction_type
+ON CONFLICT (family_id, month, source_type, category_id, transaction_type) DO NOTHING;
@@ -0,0 +1,22 @@
+-- 账单记录创建它的上传记录，删除上传记录时按上传记录删除账单，不再按文件名匹配
+-- 执行时间: 2026-10-17
+
+ALTER TABLE bills ADD COLUMN IF NOT EXISTS upload_id INTEGER REFERENCES upload_records(id) ON DELETE SET NULL;
+
+CREATE INDEX IF NOT EXISTS ix_bills_upload_id ON bills(upload_id);
+
+-- 添加注释
+COMMENT ON COLUMN bills.upload_id IS '创建该账单的上传记录';
+
+-- 为现有账单回填：只在 家庭 + 来源类型 + 文件名 唯一对应一条上传记录时回填，同名文件的账单保持为空
+UPDATE bills b
+SET upload_id = u.id
+FROM upload_records u
+WHERE b.upload_id IS NULL
+  AND u.family_id = b.family_id
+  AND u.source_type = b.source_type
+  AND u.filename = b.source_filename
+  AND (
+      SELECT COUNT(*) FROM upload_records o
+      WHERE o.family_id = u.family_id AND o.source_type = u.source_type AND o.filename = u.filename
+  ) = 1;
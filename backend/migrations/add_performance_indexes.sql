@@ -0,0 +1,26 @@
+-- 为账单列表、导入去重和模糊搜索添加索引
+-- 执行时间: 2026-10-17
+-- 注意: CREATE INDEX CONCURRENTLY 不能在事务中执行，请使用 psql 直接执行本文件（不要加 -1 / --single-transaction）
+
+-- 账单列表：按家庭筛选、按交易时间倒序分页（含游标分页的 id 排序键）
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_bills_family_time_id
+    ON bills (family_id, transaction_time DESC, id);
+
+-- 导入去重：按家庭和来源加载时间范围内的账单
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_bills_family_source_time
+    ON bills (family_id, source_type, transaction_time);
+
+-- 导入去重：raw_data->>'order_id' 表达式索引
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_bills_family_source_order_id
+    ON bills (family_id, source_type, (raw_data ->> 'order_id'), transaction_time);
+
+-- 交易描述模糊搜索（ILIKE '%关键词%'）需要 pg_trgm 扩展
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_bills_transaction_desc_trgm
+    ON bills USING gin (transaction_desc gin_trgm_ops);
+
+-- 新的复合索引覆盖了按交易时间的查询
+DROP INDEX CONCURRENTLY IF EXISTS idx_bills_transaction_time;
+
+-- 更新统计信息
+ANALYZE bills;
@@ -0,0 +1,9 @@
+-- 上传记录保存文件内容的 SHA-256，相同内容的文件不再重复导入
+-- 执行时间: 2026-10-17
+
+ALTER TABLE upload_records ADD COLUMN IF NOT EXISTS file_hash VARCHAR(64);
+
+CREATE INDEX IF NOT EXISTS idx_upload_records_family_hash ON upload_records(family_id, file_hash);
+
+-- 添加注释
+COMMENT ON COLUMN upload_records.file_hash IS '文件内容的 SHA-256';
@@ -0,0 +1,17 @@
+-- 上传记录支持后台导入任务：进度、新增/更新数、错误信息和完成时间
+-- 执行时间: 2026-10-17
+
+ALTER TABLE upload_records ADD COLUMN IF NOT EXISTS created_records INTEGER;
+ALTER TABLE upload_records ADD COLUMN IF NOT EXISTS updated_records INTEGER;
+ALTER TABLE upload_records ADD COLUMN IF NOT EXISTS processed_records INTEGER DEFAULT 0;
+ALTER TABLE upload_records ADD COLUMN IF NOT EXISTS errors JSON;
+ALTER TABLE upload_records ADD COLUMN IF NOT EXISTS warnings JSON;
+ALTER TABLE upload_records ADD COLUMN IF NOT EXISTS processed_at TIMESTAMP;
+
+-- 部分记录导入失败时状态为 partial_success
+ALTER TABLE upload_records DROP CONSTRAINT IF EXISTS check_status;
+ALTER TABLE upload_records ADD CONSTRAINT check_status CHECK (status IN ('processing', 'completed', 'partial_success', 'failed'));
+
+-- 添加注释
+COMMENT ON COLUMN upload_records.processed_records IS '后台导入已处理的记录数，用于进度查询';
+COMMENT ON COLUMN upload_records.processed_at IS '导入完成或失败的时间';
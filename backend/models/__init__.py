@@ -1,6 +1,7 @@
 from .user import User
 from .family import Family, FamilyMember
-from .bill import Bill, BillCategory
+from .bill import Bill, BillCategory, BillMonthlyRollup
+from .upload import UploadRecord
 
 __all__ = [
     "User",
@@ -8,4 +9,6 @@ __all__ = [
     "FamilyMember",
     "Bill",
     "BillCategory", 
+    "BillMonthlyRollup",
+    "UploadRecord",
 ] 
\ No newline at end of file
@@ -1,4 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON
+from sqlalchemy import (
+    Column, Integer, String, Float, Date, DateTime, Numeric, ForeignKey, JSON, UniqueConstraint,
+    Index, DDL, event, text
+)
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from config.database import Base
@@ -21,13 +24,41 @@ class BillCategory(Base):
     bills = relationship("Bill", back_populates="category")
 
 
+def _pg_trgm_available(ddl, target, bind, **kw) -> bool:
+    """部分 PostgreSQL 发行版未附带 pg_trgm 扩展，此时跳过三元组索引"""
+    if bind is None:
+        return True
+    return bind.execute(
+        text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    ).first() is not None
+
+
 class Bill(Base):
     __tablename__ = "bills"
+    __table_args__ = (
+        # 账单列表：按家庭筛选、按交易时间倒序分页
+        Index("ix_bills_family_time_id", "family_id", text("transaction_time DESC"), "id"),
+        # 导入去重：按家庭和来源加载时间范围内的账单
+        Index("ix_bills_family_source_time", "family_id", "source_type", "transaction_time"),
+        # 导入去重：按 raw_data->>'order_id' 精确匹配
+        Index(
+            "ix_bills_family_source_order_id",
+            "family_id", "source_type", text("(raw_data ->> 'order_id')"), "transaction_time"
+        ).ddl_if(dialect="postgresql"),
+        # 交易描述模糊搜索（ILIKE '%关键词%'）
+        Index(
+            "ix_bills_transaction_desc_trgm",
+            "transaction_desc",
+            postgresql_using="gin",
+            postgresql_ops={"transaction_desc": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql", callable_=_pg_trgm_available),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     family_id = Column(Integer, ForeignKey("families.id"))
     user_id = Column(Integer, ForeignKey("users.id"))
     category_id = Column(Integer, ForeignKey("bill_categories.id"), nullable=True)
+    upload_id = Column(Integer, ForeignKey("upload_records.id", ondelete="SET NULL"), nullable=True, index=True)  # 创建该账单的上传记录
 
     transaction_time = Column(DateTime(timezone=True), nullable=False)
     amount = Column(Float, nullable=False)
@@ -47,4 +78,34 @@ class Bill(Base):
     # 关系
     family = relationship("Family", back_populates="bills")
     user = relationship("User", back_populates="bills")
-    category = relationship("BillCategory", back_populates="bills")
\ No newline at end of file
+    category = relationship("BillCategory", back_populates="bills")
+
+
+# 三元组索引依赖 pg_trgm 扩展，建表前确保已安装
+event.listen(
+    Bill.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql", callable_=_pg_trgm_available)
+)
+
+
+class BillMonthlyRollup(Base):
+    """账单月度汇总表，按 (家庭, 月份, 来源, 分类, 交易类型) 维护金额合计与笔数"""
+    __tablename__ = "bill_monthly_rollups"
+    __table_args__ = (
+        UniqueConstraint(
+            "family_id", "month", "source_type", "category_id", "transaction_type",
+            name="uq_bill_monthly_rollups_key"
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    family_id = Column(Integer, ForeignKey("families.id", ondelete="CASCADE"), nullable=False)
+    month = Column(Date, nullable=False)  # 当月第一天
+    source_type = Column(String(20), nullable=False)
+    category_id = Column(Integer, nullable=False, default=0)  # 0 表示未分类
+    transaction_type = Column(String(50), nullable=False)
+    total_amount = Column(Numeric(14, 2), nullable=False, default=0)
+    bill_count = Column(Integer, nullable=False, default=0)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,39 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, Index
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from config.database import Base
+
+
+class UploadRecord(Base):
+    """文件上传记录，跟踪后台导入任务的状态和进度"""
+    __tablename__ = "upload_records"
+    __table_args__ = (
+        Index("idx_upload_records_family_user", "family_id", "user_id"),
+        # 按文件内容哈希查找已导入的相同文件
+        Index("idx_upload_records_family_hash", "family_id", "file_hash"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    family_id = Column(Integer, ForeignKey("families.id", ondelete="CASCADE"))
+    user_id = Column(Integer, ForeignKey("users.id"))
+    filename = Column(String(255), nullable=False)
+    file_size = Column(Integer, nullable=True)
+    file_hash = Column(String(64), nullable=True)  # 文件内容的 SHA-256
+    source_type = Column(String(20), nullable=True)
+    total_records = Column(Integer, nullable=True)  # 解析出的记录总数
+    success_records = Column(Integer, nullable=True)  # 成功导入的记录数（新增+更新）
+    failed_records = Column(Integer, nullable=True)  # 失败的记录数
+    created_records = Column(Integer, nullable=True)  # 新增记录数
+    updated_records = Column(Integer, nullable=True)  # 更新记录数
+    processed_records = Column(Integer, nullable=True, default=0)  # 已处理的记录数，用于进度查询
+    status = Column(String(20), default="processing")  # processing, completed, partial_success, failed
+    error_message = Column(Text, nullable=True)
+    errors = Column(JSON, nullable=True)  # 解析/保存失败的错误信息
+    warnings = Column(JSON, nullable=True)
+
+    created_at = Column(DateTime, server_default=func.now())
+    processed_at = Column(DateTime, nullable=True)  # 导入完成或失败的时间
+
+    # 关系
+    family = relationship("Family")
+    user = relationship("User")
@@ -1,4 +1,4 @@
-from .base_parser import BaseParser, ParseResult
+from .base_parser import BaseParser, BillSource, ParseResult
 from .alipay_parser import AlipayParser
 from .jd_parser import JDParser
 from .cmb_parser import CMBParser
@@ -31,6 +31,7 @@ def get_available_parsers() -> Dict[str, str]:
 
 __all__ = [
     "BaseParser",
+    "BillSource",
     "ParseResult",
     "AlipayParser",
     "JDParser", 
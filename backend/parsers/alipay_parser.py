@@ -1,10 +1,16 @@
 import pandas as pd
 import logging
-from typing import Dict, Any
-from .base_parser import BaseParser, ParseResult
+from datetime import datetime
+from decimal import Decimal
+from io import StringIO
+from typing import Dict, Any, List, Optional, TextIO
+from .base_parser import BaseParser, BillSource, ParseResult
 
 logger = logging.getLogger(__name__)
 
+# 支付宝记录时间的常用格式，批量解析时优先使用
+ALIPAY_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
 
 class AlipayParser(BaseParser):
     """支付宝账单解析器"""
@@ -12,6 +18,8 @@ class AlipayParser(BaseParser):
     def __init__(self):
         super().__init__()
         self.source_type = "alipay"
+        # 无法识别编码时使用的默认编码，支付宝文件通常是GBK编码
+        self.encoding = "gbk"
         
         # 支付宝CSV字段映射
         self.field_mapping = {
@@ -25,29 +33,19 @@ class AlipayParser(BaseParser):
             "标签": "tags"
         }
     
-    def parse_file(self, file_path: str) -> ParseResult:
+    def parse_file(self, source: BillSource) -> ParseResult:
         """解析支付宝账单文件"""
         result = ParseResult()
         
         try:
-            # 检测文件编码
-            encoding = self._detect_encoding(file_path)
-            
-            # 读取文件内容，跳过前面的说明文字
-            with open(file_path, 'r', encoding=encoding) as f:
-                lines = f.readlines()
-            
-            # 找到数据开始的行（包含字段名的行）
-            data_start_line = self._find_data_start(lines)
-            if data_start_line == -1:
-                result.add_failed({}, "未找到有效的数据开始行")
-                return result
-            
-            # 从数据开始行读取CSV
-            data_lines = lines[data_start_line:]
-            csv_content = ''.join(data_lines)
-            
-            return self.parse_content(csv_content)
+            with self._open_text(source) as f:
+                # 跳过前面的说明文字，定位到包含字段名的行
+                if not self._seek_data_start(f):
+                    result.add_failed({}, "未找到有效的数据开始行")
+                    return result
+                
+                # 从数据开始行直接读取CSV，不再复制文件内容
+                return self._parse_csv(f)
             
         except Exception as e:
             logger.error(f"解析支付宝文件时出错: {e}")
@@ -56,38 +54,26 @@ class AlipayParser(BaseParser):
     
     def parse_content(self, content: str) -> ParseResult:
         """解析支付宝账单内容"""
+        return self._parse_csv(StringIO(content))
+    
+    def _parse_csv(self, handle: TextIO) -> ParseResult:
+        """从文本流的当前位置读取CSV并解析"""
         result = ParseResult()
         
         try:
             # 使用pandas读取CSV内容
-            from io import StringIO
-            df = pd.read_csv(StringIO(content), encoding='utf-8')
+            df = pd.read_csv(handle)
             
             # 清理数据框，移除空行和无效行
             df = df.dropna(how='all')
             
-            # 遍历每一行数据
-            for index, row in df.iterrows():
-                try:
-                    # 转换为字典
-                    raw_record = row.to_dict()
-                    
-                    # 映射字段名
-                    mapped_record = self._map_fields(raw_record)
-                    
-                    # 额外处理支付宝特有字段
-                    processed_record = self._process_alipay_fields(mapped_record)
-                    
-                    # 标准化记录
-                    standardized = self.standardize_record(processed_record)
-                    if standardized:
-                        result.add_success(standardized)
-                    else:
-                        result.add_failed(raw_record, "记录标准化失败")
-                        
-                except Exception as e:
-                    logger.warning(f"处理第{index}行时出错: {e}")
-                    result.add_failed(row.to_dict() if hasattr(row, 'to_dict') else {}, str(e))
+            # 优先按列批量处理，出错时退回逐行处理
+            try:
+                self._parse_columns(df, result)
+            except Exception as e:
+                logger.warning(f"按列处理支付宝账单失败，改为逐行处理: {e}")
+                result = ParseResult()
+                self._parse_rows(df, result)
             
             return result
             
@@ -96,13 +82,120 @@ class AlipayParser(BaseParser):
             result.add_failed({}, f"内容解析错误: {str(e)}")
             return result
     
-    def _find_data_start(self, lines) -> int:
-        """找到数据开始的行号"""
-        for i, line in enumerate(lines):
+    def _parse_columns(self, df: pd.DataFrame, result: ParseResult):
+        """按列批量处理：字段映射、空值清理、收支类型、金额和时间都在整列上完成"""
+        # 映射字段名：已映射的列按 field_mapping 顺序在前，未映射的列保持原顺序
+        mapped_columns = [column for column in self.field_mapping if column in df.columns]
+        other_columns = [column for column in df.columns if column not in self.field_mapping]
+        df = df[mapped_columns + other_columns].rename(columns=self.field_mapping)
+        
+        # 金额列在读取CSV时已被解析为数值的，直接转换，无需逐条清洗
+        numeric_amount = "amount" in df and pd.api.types.is_numeric_dtype(df["amount"])
+        
+        # NaN 统一转换为 None
+        df = df.astype(object).where(df.notna(), None)
+        
+        transaction_types = self._map_transaction_types(df)
+        transaction_times = self._parse_time_column(df)
+        if numeric_amount:
+            amounts = [Decimal(str(amount)) if amount else None for amount in df["amount"]]
+        else:
+            amounts = [self._parse_amount(amount) for amount in df.get("amount", [None] * len(df))]
+        
+        records = df.to_dict('records')
+        for index, record, transaction_type, transaction_time, amount in zip(
+            df.index, records, transaction_types, transaction_times, amounts
+        ):
+            try:
+                processed_record = self._build_processed_record(record, transaction_type)
+                
+                # 标准化记录，时间和金额已批量解析
+                standardized = self.standardize_record(
+                    processed_record,
+                    parsed_fields={"transaction_time": transaction_time, "amount": amount}
+                )
+                if standardized:
+                    result.add_success(standardized)
+                else:
+                    result.add_failed(record, "记录标准化失败")
+                    
+            except Exception as e:
+                logger.warning(f"处理第{index}行时出错: {e}")
+                result.add_failed(record, str(e))
+    
+    def _parse_rows(self, df: pd.DataFrame, result: ParseResult):
+        """逐行处理，用于按列处理失败时的兜底"""
+        for index, row in df.iterrows():
+            try:
+                # 转换为字典
+                raw_record = row.to_dict()
+                
+                # 映射字段名
+                mapped_record = self._map_fields(raw_record)
+                
+                # 额外处理支付宝特有字段
+                processed_record = self._process_alipay_fields(mapped_record)
+                
+                # 标准化记录
+                standardized = self.standardize_record(processed_record)
+                if standardized:
+                    result.add_success(standardized)
+                else:
+                    result.add_failed(raw_record, "记录标准化失败")
+                    
+            except Exception as e:
+                logger.warning(f"处理第{index}行时出错: {e}")
+                result.add_failed(row.to_dict() if hasattr(row, 'to_dict') else {}, str(e))
+    
+    def _map_transaction_types(self, df: pd.DataFrame) -> pd.Series:
+        """整列映射收支类型：收入/支出/不计收支，都不匹配时使用分类补充"""
+        transaction_types = pd.Series(None, index=df.index, dtype=object)
+        
+        if "income_expense" in df:
+            income_expense = df["income_expense"]
+            # 按优先级从低到高覆盖，与逐行判断的顺序（收入 > 支出 > 不计收支）一致
+            for keyword in ("不计收支", "支出", "收入"):
+                matched = income_expense.str.contains(keyword, regex=False, na=False).astype(bool)
+                transaction_types = transaction_types.mask(matched, keyword)
+        
+        if "category" in df:
+            category = df["category"]
+            use_category = transaction_types.isna() & category.map(bool)
+            transaction_types = transaction_types.mask(use_category, category)
+        
+        return transaction_types.where(transaction_types.notna(), None)
+    
+    def _parse_time_column(self, df: pd.DataFrame) -> List[Optional[datetime]]:
+        """整列解析交易时间，不符合常用格式的值再逐条解析"""
+        if "transaction_time" not in df:
+            return [None] * len(df)
+        
+        times = df["transaction_time"]
+        stripped = times.str.strip()
+        
+        # 用第一个有效值识别本文件的时间格式，识别不出时使用支付宝默认格式
+        first_value = next((value for value in stripped.dropna() if value), None)
+        if first_value is not None:
+            self._parse_datetime(first_value)
+        time_format = self._datetime_formats.get("transaction_time", ALIPAY_TIME_FORMAT)
+        
+        parsed = pd.to_datetime(stripped, format=time_format, errors="coerce")
+        return [
+            value.to_pydatetime() if not pd.isna(value) else self._parse_datetime(original)
+            for original, value in zip(times, parsed)
+        ]
+    
+    def _seek_data_start(self, f: TextIO) -> bool:
+        """将文本流定位到数据开始的行（包含字段名的行），找不到时返回 False"""
+        for line_num, line in enumerate(f):
             # 查找包含字段名的行
             if "记录时间" in line and "分类" in line and "金额" in line:
-                return i
-        return -1
+                # 回到开头重新跳过说明文字，逐行读取时不能使用 tell() 记录位置
+                f.seek(0)
+                for _ in range(line_num):
+                    f.readline()
+                return True
+        return False
     
     def _map_fields(self, raw_record: Dict[str, Any]) -> Dict[str, Any]:
         """映射字段名"""
@@ -138,22 +231,31 @@ class AlipayParser(BaseParser):
         """处理支付宝特有字段"""
         # 首先清理原始记录中的NaN值
         cleaned_record = self._clean_nan_values(record)
-        processed = cleaned_record.copy()
         
         # 处理收支情况
+        transaction_type = None
         income_expense = cleaned_record.get("income_expense", "")
         if income_expense:
             if "收入" in income_expense:
-                processed["transaction_type"] = "收入"
+                transaction_type = "收入"
             elif "支出" in income_expense:
-                processed["transaction_type"] = "支出"
+                transaction_type = "支出"
             elif "不计收支" in income_expense:
-                processed["transaction_type"] = "不计收支"
+                transaction_type = "不计收支"
         
         # 使用分类字段作为交易类型的补充
         category = cleaned_record.get("category", "")
-        if category and not processed.get("transaction_type"):
-            processed["transaction_type"] = category
+        if category and not transaction_type:
+            transaction_type = category
+        
+        return self._build_processed_record(cleaned_record, transaction_type)
+    
+    def _build_processed_record(self, cleaned_record: Dict[str, Any], transaction_type: Any) -> Dict[str, Any]:
+        """根据清理后的记录和收支类型组装处理结果"""
+        processed = cleaned_record.copy()
+        
+        if transaction_type:
+            processed["transaction_type"] = transaction_type
         
         # 处理交易描述，合并多个描述字段
         desc_parts = []
@@ -189,18 +291,3 @@ class AlipayParser(BaseParser):
         processed["raw_data"] = cleaned_record
         
         return processed
-    
-    def _detect_encoding(self, file_path: str) -> str:
-        """检测文件编码，支付宝文件通常是GBK编码"""
-        encodings = ['gbk', 'gb2312', 'gb18030', 'utf-8', 'utf-8-sig']
-        
-        for encoding in encodings:
-            try:
-                with open(file_path, 'r', encoding=encoding) as f:
-                    f.read(1024)  # 读取前1024字符测试
-                return encoding
-            except UnicodeDecodeError:
-                continue
-        
-        logger.warning(f"无法检测文件编码，使用默认编码: gbk")
-        return 'gbk'
\ No newline at end of file
@@ -1,11 +1,38 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from contextlib import contextmanager
+from itertools import islice
+from typing import List, Dict, Any, Iterator, Optional, Union, BinaryIO, TextIO
 from datetime import datetime
 from decimal import Decimal, InvalidOperation
 import logging
 
+from utils.encoding import open_text
+
 logger = logging.getLogger(__name__)
 
+# 常见的日期时间格式，按优先级排列
+DATETIME_FORMATS = [
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y/%m/%d %H:%M:%S",
+    "%Y/%m/%d %H:%M",
+    "%Y年%m月%d日 %H:%M:%S",
+    "%Y年%m月%d日 %H时%M分%S秒",
+    "%Y-%m-%d",
+    "%Y/%m/%d",
+    "%Y年%m月%d日"
+]
+
+# 可以用 datetime.fromisoformat 解析的定长格式：字符串长度 -> 格式
+ISO_DATETIME_LAYOUTS = {
+    19: "%Y-%m-%d %H:%M:%S",
+    16: "%Y-%m-%d %H:%M",
+    10: "%Y-%m-%d",
+}
+
+# 账单来源：文件路径，或已打开的二进制文件对象（如上传文件的临时文件）
+BillSource = Union[str, BinaryIO]
+
 
 class ParseResult:
     """解析结果类"""
@@ -23,6 +50,18 @@ class ParseResult:
         self.success_count += 1
         self.total_count += 1
 
+    def count_success(self):
+        """记录一条成功记录但不保存，流式解析时记录由调用方直接消费"""
+        self.success_count += 1
+        self.total_count += 1
+
+    def merge_failures(self, other: "ParseResult"):
+        """合并另一个解析结果中的失败记录"""
+        self.failed_records.extend(other.failed_records)
+        self.errors.extend(other.errors)
+        self.failed_count += other.failed_count
+        self.total_count += other.failed_count
+
     def add_failed(self, record: Dict[str, Any], error: str):
         """添加失败记录"""
         record['parse_error'] = error
@@ -45,13 +84,18 @@ class ParseResult:
 class BaseParser(ABC):
     """文件解析器基类"""
     
+    # 只能解析磁盘上的文件路径、不接受文件对象的解析器设为 True
+    requires_path: bool = False
+    
     def __init__(self):
         self.source_type: str = ""
         self.encoding: str = "utf-8"
+        # 各字段上次解析成功的日期时间格式
+        self._datetime_formats: Dict[str, str] = {}
         
     @abstractmethod
-    def parse_file(self, file_path: str) -> ParseResult:
-        """解析文件的抽象方法"""
+    def parse_file(self, source: BillSource) -> ParseResult:
+        """解析文件的抽象方法，source 为文件路径或二进制文件对象"""
         pass
     
     @abstractmethod
@@ -59,15 +103,55 @@ class BaseParser(ABC):
         """解析文件内容的抽象方法"""
         pass
     
-    def standardize_record(self, raw_record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """标准化记录格式"""
+    def iter_records(self, source: BillSource, result: ParseResult) -> Iterator[Dict[str, Any]]:
+        """
+        逐条产出标准化记录
+
+        成功记录只计数、不保存在 result 中，失败记录写入 result。
+        默认实现先完整解析文件，支持流式读取的解析器应重写此方法。
+        """
+        parsed = self.parse_file(source)
+        result.merge_failures(parsed)
+        for record in parsed.success_records:
+            result.count_success()
+            yield record
+    
+    def iter_batches(self, source: BillSource, result: ParseResult, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+        """按固定大小分批产出标准化记录"""
+        records = self.iter_records(source, result)
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                return
+            yield batch
+    
+    def standardize_record(
+        self,
+        raw_record: Dict[str, Any],
+        parsed_fields: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        标准化记录格式
+
+        parsed_fields 中已批量解析的交易时间、金额直接使用，不再逐条解析。
+        """
         try:
+            parsed_fields = parsed_fields or {}
+            if "transaction_time" in parsed_fields:
+                transaction_time = parsed_fields["transaction_time"]
+            else:
+                transaction_time = self._parse_datetime(raw_record.get("transaction_time"))
+            if "amount" in parsed_fields:
+                amount = parsed_fields["amount"]
+            else:
+                amount = self._parse_amount(raw_record.get("amount"))
+            
             standardized = {
                 "source_type": self.source_type,
-                "transaction_time": self._parse_datetime(raw_record.get("transaction_time")),
+                "transaction_time": transaction_time,
                 "merchant_name": self._clean_string(raw_record.get("merchant_name")),
                 "transaction_desc": self._clean_string(raw_record.get("transaction_desc")),
-                "amount": self._parse_amount(raw_record.get("amount")),
+                "amount": amount,
                 "currency": raw_record.get("currency", "CNY"),
                 "transaction_type": self._clean_string(raw_record.get("transaction_type")),
                 "payment_method": self._clean_string(raw_record.get("payment_method")),
@@ -86,8 +170,13 @@ class BaseParser(ABC):
             logger.error(f"标准化记录时出错: {e}")
             return None
     
-    def _parse_datetime(self, dt_str: Any) -> Optional[datetime]:
-        """解析日期时间"""
+    def _parse_datetime(self, dt_str: Any, field: str = "transaction_time") -> Optional[datetime]:
+        """
+        解析日期时间
+
+        同一文件中同一列的格式基本一致：优先使用该列上次解析成功的格式，
+        未命中时才按 DATETIME_FORMATS 的顺序逐个尝试，并记住成功的格式。
+        """
         if not dt_str:
             return None
             
@@ -97,28 +186,38 @@ class BaseParser(ABC):
         if not isinstance(dt_str, str):
             dt_str = str(dt_str)
         
-        # 常见的日期时间格式
-        formats = [
-            "%Y-%m-%d %H:%M:%S",
-            "%Y-%m-%d %H:%M",
-            "%Y/%m/%d %H:%M:%S",
-            "%Y/%m/%d %H:%M",
-            "%Y年%m月%d日 %H:%M:%S",
-            "%Y年%m月%d日 %H时%M分%S秒",
-            "%Y-%m-%d",
-            "%Y/%m/%d",
-            "%Y年%m月%d日"
-        ]
+        value = dt_str.strip()
+        cached_format = self._datetime_formats.get(field)
+        if cached_format is not None:
+            parsed = self._parse_datetime_with_format(value, cached_format)
+            if parsed is not None:
+                return parsed
         
-        for fmt in formats:
-            try:
-                return datetime.strptime(dt_str.strip(), fmt)
-            except ValueError:
+        for fmt in DATETIME_FORMATS:
+            if fmt == cached_format:
                 continue
+            parsed = self._parse_datetime_with_format(value, fmt)
+            if parsed is not None:
+                self._datetime_formats[field] = fmt
+                return parsed
         
         logger.warning(f"无法解析日期时间: {dt_str}")
         return None
     
+    def _parse_datetime_with_format(self, value: str, fmt: str) -> Optional[datetime]:
+        """按指定格式解析日期时间，失败返回 None；定长 ISO 格式走 fromisoformat 快速路径"""
+        if ISO_DATETIME_LAYOUTS.get(len(value)) == fmt:
+            # fromisoformat 还接受 T 分隔、周日期等写法，先确认分隔符位置与格式完全一致
+            if value[4] == '-' and value[7] == '-' and (len(value) == 10 or value[10] == ' '):
+                try:
+                    return datetime.fromisoformat(value)
+                except ValueError:
+                    pass
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            return None
+    
     def _parse_amount(self, amount_str: Any) -> Optional[Decimal]:
         """解析金额"""
         if not amount_str:
@@ -159,17 +258,14 @@ class BaseParser(ABC):
         
         return cleaned if cleaned else None
     
-    def _detect_encoding(self, file_path: str) -> str:
-        """检测文件编码"""
-        encodings = ['utf-8', 'gbk', 'gb2312', 'utf-8-sig']
-        
-        for encoding in encodings:
-            try:
-                with open(file_path, 'r', encoding=encoding) as f:
-                    f.read(1024)  # 读取前1024字符测试
-                return encoding
-            except UnicodeDecodeError:
-                continue
-        
-        logger.warning(f"无法检测文件编码，使用默认编码: {self.encoding}")
-        return self.encoding
\ No newline at end of file
+    @contextmanager
+    def _open_text(self, source: BillSource) -> Iterator[TextIO]:
+        """
+        以文本方式打开账单来源
+
+        文件只读取一次：检测编码和后续解码共用同一个缓冲区，无法识别编码时使用 self.encoding。
+        source 为文件对象时从头读取，用完后不关闭，由调用方负责。
+        """
+        with open_text(source, default=self.encoding) as (encoding, text):
+            logger.debug(f"检测到文件编码: {encoding}")
+            yield text
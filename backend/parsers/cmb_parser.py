@@ -1,20 +1,92 @@
 import pdfplumber
 import re
 import logging
-from typing import Dict, Any, List
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 from .base_parser import BaseParser, ParseResult
 
 logger = logging.getLogger(__name__)
 
+# 单页提取结果：(页面中的表格, 没有表格时的页面文本)
+PageContent = Tuple[List[List[List[str]]], Optional[str]]
+
+
+def _extract_pages(pdf, start: int, end: int) -> List[PageContent]:
+    """提取 [start, end) 页的表格，只有没有表格的页面才提取文本"""
+    pages = []
+    for page in pdf.pages[start:end]:
+        tables = page.extract_tables()
+        page_text = None if tables else page.extract_text()
+        pages.append((tables, page_text))
+    return pages
+
+
+def _extract_page_range(file_path: str, start: int, end: int) -> List[PageContent]:
+    """在子进程中提取一段页面，每个进程单独打开 PDF"""
+    with pdfplumber.open(file_path) as pdf:
+        return _extract_pages(pdf, start, end)
+
+
+# 子进程启动需要重新导入解析模块，进程池在首次使用时创建并在多次解析之间复用
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def _get_executor(max_workers: int) -> ProcessPoolExecutor:
+    """获取共享的进程池，进程数变化时重新创建"""
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != max_workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            # 使用 spawn 启动子进程，避免 fork 继承数据库连接等资源
+            _executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+            _executor_workers = max_workers
+        return _executor
+
+
+def _discard_executor(executor: ProcessPoolExecutor):
+    """丢弃已损坏的进程池，下次使用时重新创建"""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+
+def shutdown_executor():
+    """关闭共享的进程池并等待子进程退出，应用关闭时调用"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
 
 class CMBParser(BaseParser):
     """招商银行PDF账单解析器"""
     
-    def __init__(self):
+    # 多进程按页提取时各进程需要自行打开文件，只接受文件路径
+    requires_path = True
+    
+    def __init__(self, max_workers: Optional[int] = None, parallel_min_pages: Optional[int] = None):
         super().__init__()
         self.source_type = "cmb"
         
+        # 多进程按页提取的配置，未指定时读取全局配置
+        if max_workers is None or parallel_min_pages is None:
+            from config.settings import settings
+            max_workers = settings.CMB_PARSE_WORKERS if max_workers is None else max_workers
+            parallel_min_pages = settings.CMB_PARALLEL_MIN_PAGES if parallel_min_pages is None else parallel_min_pages
+        self.max_workers = max_workers
+        self.parallel_min_pages = parallel_min_pages
+        
         # 招商银行字段映射
         self.field_mapping = {
             "记账日期": "transaction_time",
@@ -30,36 +102,58 @@ class CMBParser(BaseParser):
         result = ParseResult()
         
         try:
-            with pdfplumber.open(file_path) as pdf:
-                all_text = ""
-                all_tables = []
-                
-                # 提取所有页面的文本和表格
-                for page in pdf.pages:
-                    # 提取文本
-                    page_text = page.extract_text()
-                    if page_text:
-                        all_text += page_text + "\n"
-                    
-                    # 提取表格
-                    tables = page.extract_tables()
-                    if tables:
-                        all_tables.extend(tables)
-                
-                # 解析表格数据
-                if all_tables:
-                    result = self._parse_tables(all_tables)
-                else:
-                    # 如果没有表格，尝试解析文本
-                    result = self._parse_text(all_text)
-                
-                return result
+            all_text = ""
+            all_tables = []
+            
+            # 按页码顺序合并各页的表格和文本
+            for tables, page_text in self._extract_all_pages(file_path):
+                if tables:
+                    all_tables.extend(tables)
+                elif page_text:
+                    all_text += page_text + "\n"
+            
+            # 解析表格数据
+            if all_tables:
+                result = self._parse_tables(all_tables)
+            else:
+                # 如果没有表格，尝试解析文本
+                result = self._parse_text(all_text)
+            
+            return result
                 
         except Exception as e:
             logger.error(f"解析招商银行PDF文件时出错: {e}")
             result.add_failed({}, f"PDF解析错误: {str(e)}")
             return result
     
+    def _extract_all_pages(self, file_path: str) -> List[PageContent]:
+        """
+        提取所有页面的表格和文本
+
+        页数达到 parallel_min_pages 时按连续页段分给多个进程并行提取，
+        结果按页码顺序返回；页数较少或只配置了一个进程时在当前进程中提取。
+        """
+        with pdfplumber.open(file_path) as pdf:
+            page_count = len(pdf.pages)
+            # 进程数超过CPU核数只会增加开销
+            pool_size = min(self.max_workers, os.cpu_count() or 1)
+            workers = min(pool_size, page_count)
+            if workers <= 1 or page_count < self.parallel_min_pages:
+                return _extract_pages(pdf, 0, page_count)
+        
+        chunk_size = -(-page_count // workers)
+        ranges = [(start, min(start + chunk_size, page_count)) for start in range(0, page_count, chunk_size)]
+        
+        executor = _get_executor(pool_size)
+        try:
+            futures = [executor.submit(_extract_page_range, file_path, start, end) for start, end in ranges]
+            return [page for future in futures for page in future.result()]
+        except (OSError, RuntimeError, BrokenProcessPool) as e:
+            logger.warning(f"多进程提取PDF页面失败，改为单进程提取: {e}")
+            _discard_executor(executor)
+            with pdfplumber.open(file_path) as pdf:
+                return _extract_pages(pdf, 0, page_count)
+    
     def parse_content(self, content: str) -> ParseResult:
         """解析招商银行文本内容"""
         return self._parse_text(content)
@@ -157,6 +157,7 @@ class BillListResponse(BaseModel):
     page: int
     size: int
     pages: int
+    next_cursor: Optional[str] = None  # 游标分页时下一页的游标，没有更多数据时为空
 
 
 class BillStatsResponse(BaseModel):
@@ -55,7 +55,7 @@ class HealthCheckResponse(BaseModel):
     version: str = Field(..., description="版本号")
     environment: str = Field(..., description="运行环境")
     timestamp: datetime = Field(default_factory=datetime.now, description="检查时间")
-    services: Dict[str, Dict[str, Union[str, bool, float]]] = Field(
+    services: Dict[str, Dict[str, Union[str, bool, int, float]]] = Field(
         default_factory=dict, 
         description="依赖服务状态"
     )
@@ -74,6 +74,7 @@ class MetricsResponse(BaseModel):
     request_count: int = Field(..., description="请求总数")
     error_count: int = Field(..., description="错误总数")
     active_connections: int = Field(..., description="活跃连接数")
+    database_pool: Dict[str, Any] = Field(default_factory=dict, description="数据库连接池状态")
     timestamp: datetime = Field(default_factory=datetime.now, description="采集时间")
     
     class Config:
@@ -50,4 +50,46 @@ class UploadRecord(BaseModel):
     status: str
     error_message: Optional[str] = None
     uploaded_at: str
-    processed_at: Optional[str] = None
\ No newline at end of file
+    processed_at: Optional[str] = None
+    # 后台导入的进度和结果
+    total_records: Optional[int] = None
+    processed_records: int = 0
+    success_count: int = 0
+    created_count: int = 0
+    updated_count: int = 0
+    failed_count: int = 0
+    errors: List[str] = []
+    warnings: List[str] = []
+
+    @classmethod
+    def from_record(cls, record):
+        """从UploadRecord模型创建响应"""
+        return cls(
+            id=record.id,
+            family_id=record.family_id,
+            user_id=record.user_id,
+            filename=record.filename,
+            file_size=record.file_size or 0,
+            source_type=record.source_type,
+            records_count=record.success_records or 0,
+            status=record.status,
+            error_message=record.error_message,
+            uploaded_at=record.created_at.isoformat() if record.created_at else "",
+            processed_at=record.processed_at.isoformat() if record.processed_at else None,
+            total_records=record.total_records,
+            processed_records=record.processed_records or 0,
+            success_count=record.success_records or 0,
+            created_count=record.created_records or 0,
+            updated_count=record.updated_records or 0,
+            failed_count=record.failed_records or 0,
+            errors=record.errors or [],
+            warnings=record.warnings or []
+        )
+
+class UploadRecordListResponse(BaseModel):
+    """上传记录列表响应"""
+    items: List[UploadRecord]
+    total: int
+    page: int
+    size: int
+    pages: int
\ No newline at end of file
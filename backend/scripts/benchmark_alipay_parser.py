@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+对比支付宝账单逐行处理（iterrows）与按列批量处理的单行耗时
+
+用法:
+    python scripts/benchmark_alipay_parser.py --rows 50000
+"""
+
+import argparse
+import logging
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from io import StringIO
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import pandas as pd
+
+from parsers.alipay_parser import AlipayParser
+from parsers.base_parser import ParseResult
+
+
+def generate_content(rows: int, seed: int = 1) -> str:
+    """生成支付宝记账导出格式的CSV内容"""
+    rng = random.Random(seed)
+    lines = ["记录时间,分类,收支类型,金额,备注,账户,来源,标签"]
+    current = datetime(2025, 1, 1)
+    for i in range(rows):
+        current += timedelta(minutes=rng.randint(1, 300))
+        lines.append(",".join([
+            current.strftime("%Y-%m-%d %H:%M:%S"),
+            rng.choice(["餐饮", "交通", "购物", "工资"]),
+            rng.choice(["支出", "收入", "不计收支"]),
+            f"{rng.randint(1, 99999) / 100:.2f}",
+            f"商户{i % 50}-备注{i}",
+            rng.choice(["余额宝", "花呗", ""]),
+            rng.choice(["手动", ""]),
+            rng.choice(["", "日常"]),
+        ]))
+    return "\n".join(lines) + "\n"
+
+
+def measure(parse, df: pd.DataFrame, repeat: int) -> float:
+    """返回多次运行中最快一次的耗时（秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        result = ParseResult()
+        start = time.perf_counter()
+        parse(df, result)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="支付宝账单解析性能对比")
+    parser.add_argument("--rows", type=int, default=20000, help="生成的记录数")
+    parser.add_argument("--repeat", type=int, default=3, help="每种实现的运行次数，取最快一次")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    df = pd.read_csv(StringIO(generate_content(args.rows))).dropna(how="all")
+    alipay_parser = AlipayParser()
+
+    row_wise = measure(alipay_parser._parse_rows, df, args.repeat)
+    column_wise = measure(alipay_parser._parse_columns, df, args.repeat)
+
+    print(f"记录数: {len(df)}")
+    print(f"逐行处理(iterrows): 总耗时 {row_wise:.3f}s, 单行 {row_wise / len(df) * 1e6:.1f}us")
+    print(f"按列批量处理:       总耗时 {column_wise:.3f}s, 单行 {column_wise / len(df) * 1e6:.1f}us")
+    print(f"加速比: {row_wise / column_wise:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+对比同步数据库会话（线程池）与异步数据库会话（DB_ASYNC_ENABLED）在并发请求下的吞吐量
+
+分别以两种模式启动一个 uvicorn 工作进程，并发请求账单列表和统计接口，输出每秒请求数和延迟分位数。
+会在目标数据库中创建测试用户和账单，请使用专门的测试数据库。
+
+用法:
+    python scripts/benchmark_db_engines.py --requests 1000 --concurrency 50
+    python scripts/benchmark_db_engines.py --database-url postgresql://postgres@localhost/bench
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+import psutil
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+BENCH_USERNAME = "benchmark_user"
+ENDPOINTS = ["/api/v1/bills/?size=20", "/api/v1/bills/stats?start_date=2025-01-03"]
+
+
+def seed(rows: int) -> str:
+    """创建测试用户、家庭和账单，返回访问令牌"""
+    from config.database import Base, SessionLocal, engine
+    import models  # noqa: F401  注册所有模型
+    from models import Bill, Family, FamilyMember, User
+    from api.auth import create_access_token
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == BENCH_USERNAME).first()
+        if user is None:
+            user = User(username=BENCH_USERNAME, email=f"{BENCH_USERNAME}@example.com", password_hash="x")
+            db.add(user)
+            db.flush()
+            family = Family(family_name="benchmark", created_by=user.id)
+            db.add(family)
+            db.flush()
+            db.add(FamilyMember(family_id=family.id, user_id=user.id, role="admin"))
+
+            rng = random.Random(1)
+            current = datetime(2025, 1, 1)
+            bills = []
+            for i in range(rows):
+                current += timedelta(minutes=rng.randint(1, 120))
+                bills.append({
+                    "family_id": family.id,
+                    "user_id": user.id,
+                    "source_type": rng.choice(["alipay", "jd"]),
+                    "transaction_time": current,
+                    "amount": Decimal(rng.randint(1, 99999)) / 100,
+                    "transaction_type": rng.choice(["收入", "支出", "不计收支"]),
+                    "transaction_desc": f"商户{i % 50}-备注{i}",
+                })
+            db.bulk_insert_mappings(Bill, bills)
+            db.commit()
+    finally:
+        db.close()
+
+    return create_access_token({"sub": BENCH_USERNAME}, expires_delta=timedelta(hours=1))
+
+
+async def run_load(base_url: str, token: str, total: int, concurrency: int) -> dict:
+    """并发发送请求，返回吞吐量和延迟统计"""
+    import httpx
+
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=60) as client:
+        async def request(i: int):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(ENDPOINTS[i % len(ENDPOINTS)])
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        # 预热
+        await asyncio.gather(*(request(i) for i in range(concurrency)))
+        latencies.clear()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(request(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50": latencies[len(latencies) // 2] * 1000,
+        "p95": latencies[int(len(latencies) * 0.95)] * 1000,
+        "errors": errors,
+    }
+
+
+def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float = 30):
+    """等待服务启动"""
+    import httpx
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("服务启动失败")
+        try:
+            if httpx.get(f"{base_url}/api/v1/health/live").status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("等待服务启动超时")
+
+
+def benchmark_mode(async_enabled: bool, args, token: str, env: dict) -> dict:
+    """以指定模式启动一个工作进程并压测"""
+    base_url = f"http://127.0.0.1:{args.port}"
+    process_env = {**env, "DB_ASYNC_ENABLED": "true" if async_enabled else "false"}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning", "--no-access-log"],
+        cwd=project_root,
+        env=process_env
+    )
+    try:
+        wait_until_ready(base_url, process)
+        stats = asyncio.run(run_load(base_url, token, args.requests, args.concurrency))
+        # 线程池中空闲的线程不会立即退出，压测结束时的线程数即为压测期间用到的线程数
+        stats["threads"] = psutil.Process(process.pid).num_threads()
+        return stats
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="同步与异步数据库会话的吞吐量对比")
+    parser.add_argument("--database-url", help="数据库连接串，默认使用临时SQLite文件")
+    parser.add_argument("--rows", type=int, default=5000, help="生成的账单数")
+    parser.add_argument("--requests", type=int, default=1000, help="每种模式的请求数")
+    parser.add_argument("--concurrency", type=int, default=50, help="并发请求数")
+    parser.add_argument("--threadpool", type=int, default=40, help="同步模式的线程池大小（THREADPOOL_SIZE）")
+    parser.add_argument("--port", type=int, default=8765, help="服务端口")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp(prefix="bills-bench-")
+    env = dict(os.environ)
+    env["DATABASE_URL"] = args.database_url or f"sqlite:///{temp_dir}/bench.db"
+    env["THREADPOOL_SIZE"] = str(args.threadpool)
+    env["LOG_LEVEL"] = "WARNING"
+    env["LOG_FILE"] = f"{temp_dir}/app.log"
+    env.setdefault("ENVIRONMENT", "development")
+    os.environ.update(env)
+
+    token = seed(args.rows)
+
+    print(f"数据库: {env['DATABASE_URL']}, 账单数: {args.rows}, 请求数: {args.requests}, 并发: {args.concurrency}")
+    for label, async_enabled in (("同步会话+线程池", False), ("异步会话", True)):
+        stats = benchmark_mode(async_enabled, args, token, env)
+        print(
+            f"{label:<16} {stats['rps']:8.1f} req/s  p50 {stats['p50']:7.1f}ms  "
+            f"p95 {stats['p95']:7.1f}ms  线程数 {stats['threads']}  错误 {stats['errors']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
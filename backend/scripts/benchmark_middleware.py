@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+测量中间件（安全头、请求日志、速率限制）给每个请求增加的耗时
+
+在同一进程内直接调用 ASGI 应用，不经过网络：分别请求不带中间件和带全部中间件的应用，
+两者的中位耗时之差即为中间件的开销。两个应用交替分批请求，减少机器负载波动的影响。
+
+用法:
+    python scripts/benchmark_middleware.py --requests 5000
+    python scripts/benchmark_middleware.py --path /api/v1/health/live
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+BATCH_SIZE = 200
+
+
+def create_apps():
+    """创建不带中间件和带全部中间件的两个应用，路由相同"""
+    from fastapi import FastAPI
+
+    from api import api_router
+    from config.settings import settings
+    from core.middleware import RateLimitMiddleware, RequestLoggingMiddleware, SecurityHeadersMiddleware
+
+    apps = {}
+    for label, with_middleware in (("无中间件", False), ("全部中间件", True)):
+        app = FastAPI()
+        app.state.settings = settings
+        if with_middleware:
+            # 与 main.py 的顺序一致；限流容量足够大，不会拒绝压测请求
+            app.add_middleware(SecurityHeadersMiddleware)
+            app.add_middleware(RequestLoggingMiddleware)
+            app.add_middleware(RateLimitMiddleware, calls=10 ** 9, period=60)
+        app.include_router(api_router)
+        apps[label] = app
+    return apps
+
+
+async def request_once(app, path: str) -> float:
+    """请求一次，返回耗时（秒）"""
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+    status = None
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"benchmark"), (b"user-agent", b"benchmark")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("benchmark", 80),
+    }
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    elapsed = time.perf_counter() - start
+    if status != 200:
+        raise RuntimeError(f"{path} 返回 {status}")
+    return elapsed
+
+
+async def run(apps: dict, path: str, total: int) -> dict:
+    """交替分批请求各应用，返回各应用的耗时列表"""
+    latencies = {label: [] for label in apps}
+
+    # 预热
+    for app in apps.values():
+        for _ in range(50):
+            await request_once(app, path)
+
+    while len(next(iter(latencies.values()))) < total:
+        for label, app in apps.items():
+            for _ in range(min(BATCH_SIZE, total - len(latencies[label]))):
+                latencies[label].append(await request_once(app, path))
+    return latencies
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="中间件的每请求开销")
+    parser.add_argument("--path", action="append", help="请求的路径，可以指定多个，默认 /api/v1/health/")
+    parser.add_argument("--requests", type=int, default=3000, help="每个应用每个路径的请求数")
+    parser.add_argument("--log-level", default="WARNING", help="日志级别，INFO 时包括写请求日志的开销")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp(prefix="bills-bench-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{temp_dir}/bench.db")
+    os.environ["LOG_LEVEL"] = args.log_level
+    os.environ["LOG_FILE"] = f"{temp_dir}/app.log"
+    os.environ.setdefault("ENVIRONMENT", "development")
+
+    from config.database import Base, engine
+    from config.logging import setup_logging
+    import models  # noqa: F401  注册所有模型
+
+    setup_logging()
+    Base.metadata.create_all(engine)
+    apps = create_apps()
+
+    for path in args.path or ["/api/v1/health/"]:
+        latencies = asyncio.run(run(apps, path, args.requests))
+        medians = {label: statistics.median(values) * 1e6 for label, values in latencies.items()}
+        print(f"{path}  请求数: {args.requests}")
+        for label, values in latencies.items():
+            values.sort()
+            print(
+                f"  {label:<8} p50 {medians[label]:8.1f}µs  "
+                f"p95 {values[int(len(values) * 0.95)] * 1e6:8.1f}µs"
+            )
+        bare, stacked = medians.values()
+        print(f"  中间件开销 {stacked - bare:8.1f}µs/请求")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+对比账单关键查询在添加性能索引前后的执行计划（仅支持 PostgreSQL）
+
+整个脚本在一个事务中执行，最后回滚：
+1. 可选地生成 --seed 条测试账单并 ANALYZE
+2. 临时删除性能索引，执行 EXPLAIN ANALYZE（添加前）
+3. 回滚到保存点恢复索引，再次执行 EXPLAIN ANALYZE（添加后）
+
+删除索引会对 bills 表加排他锁，请勿在生产库上运行。
+
+用法:
+    python scripts/explain_bill_queries.py --family 1 --seed 200000
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import text
+
+from config.database import engine
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+logger = logging.getLogger(__name__)
+
+# 需要对比的性能索引
+PERFORMANCE_INDEXES = [
+    "ix_bills_family_time_id",
+    "ix_bills_family_source_time",
+    "ix_bills_family_source_order_id",
+    "ix_bills_transaction_desc_trgm",
+]
+
+# 与接口实际执行的 SQL 形状一致的查询
+QUERIES = {
+    "账单列表首页": """
+        SELECT id FROM bills
+        WHERE family_id IN (:family_id)
+        ORDER BY transaction_time DESC, id DESC
+        LIMIT 20
+    """,
+    "账单列表游标翻页": """
+        SELECT id FROM bills
+        WHERE family_id IN (:family_id)
+          AND (transaction_time, id) < (
+              SELECT transaction_time, id FROM bills
+              WHERE family_id = :family_id
+              ORDER BY transaction_time DESC, id DESC
+              OFFSET 5000 LIMIT 1
+          )
+        ORDER BY transaction_time DESC, id DESC
+        LIMIT 20
+    """,
+    "京东去重候选加载": """
+        SELECT id FROM bills
+        WHERE family_id = :family_id AND source_type = 'jd'
+          AND transaction_time >= now() - interval '7 days'
+          AND transaction_time <= now()
+        ORDER BY id
+    """,
+    "订单号去重": """
+        SELECT id FROM bills
+        WHERE family_id = :family_id AND source_type = 'jd'
+          AND raw_data ->> 'order_id' = :order_id
+        LIMIT 1
+    """,
+    "交易描述模糊搜索": """
+        SELECT id FROM bills
+        WHERE family_id IN (:family_id) AND transaction_desc ILIKE :search
+        ORDER BY transaction_time DESC, id DESC
+        LIMIT 20
+    """,
+}
+
+SEED_SQL = """
+    INSERT INTO bills (family_id, source_type, transaction_time, amount, transaction_type, transaction_desc, raw_data)
+    SELECT
+        :family_id,
+        (ARRAY['alipay', 'jd', 'cmb'])[1 + i % 3],
+        now() - make_interval(mins => i),
+        (i % 1000) + 0.99,
+        CASE WHEN i % 5 = 0 THEN '收入' ELSE '支出' END,
+        '测试商品' || md5(i::text),
+        json_build_object('order_id', 'SEED' || i)
+    FROM generate_series(1, :count) AS i
+"""
+
+
+def explain_all(conn, params: dict) -> dict:
+    """执行所有查询的 EXPLAIN ANALYZE，返回 {查询名称: 执行计划文本}"""
+    plans = {}
+    for name, sql in QUERIES.items():
+        rows = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, COSTS OFF) {sql}"), params).all()
+        plans[name] = "\n".join(row[0] for row in rows)
+    return plans
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="对比性能索引添加前后的查询计划")
+    parser.add_argument("--family", type=int, required=True, help="用于查询的家庭ID（需已存在）")
+    parser.add_argument("--seed", type=int, default=0, help="临时生成的测试账单数量，脚本结束后回滚")
+    parser.add_argument("--order-id", default="SEED4243", help="订单号去重查询使用的订单号")
+    parser.add_argument("--search", default="%abc%", help="模糊搜索查询使用的关键词")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        logger.error("执行计划对比仅支持 PostgreSQL")
+        sys.exit(1)
+
+    params = {"family_id": args.family, "order_id": args.order_id, "search": args.search}
+
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            if args.seed:
+                logger.info(f"生成测试账单: {args.seed} 条")
+                conn.execute(text(SEED_SQL), {"family_id": args.family, "count": args.seed})
+            conn.execute(text("ANALYZE bills"))
+
+            existing = set(conn.execute(
+                text("SELECT indexname FROM pg_indexes WHERE tablename = 'bills'")
+            ).scalars())
+            missing = [name for name in PERFORMANCE_INDEXES if name not in existing]
+            if missing:
+                logger.warning(f"以下索引不存在，请先执行 migrations/add_performance_indexes.sql: {missing}")
+
+            savepoint = conn.begin_nested()
+            for name in PERFORMANCE_INDEXES:
+                conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            before = explain_all(conn, params)
+            savepoint.rollback()
+
+            after = explain_all(conn, params)
+        finally:
+            transaction.rollback()
+
+    for name in QUERIES:
+        print("=" * 80)
+        print(f"{name} - 添加索引前")
+        print("-" * 80)
+        print(before[name])
+        print("-" * 80)
+        print(f"{name} - 添加索引后")
+        print("-" * 80)
+        print(after[name])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+重建账单月度汇总表
+
+用于首次上线后的历史数据回填，或汇总数据与账单明细不一致时的修复。
+
+用法:
+    python scripts/rebuild_rollups.py              # 重建全部家庭
+    python scripts/rebuild_rollups.py --family 1 2 # 只重建指定家庭
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config.database import SessionLocal, engine
+from models.bill import BillMonthlyRollup
+from services.bill_rollup import rebuild_rollups
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="重建账单月度汇总表")
+    parser.add_argument("--family", type=int, nargs="*", help="只重建指定的家庭ID")
+    args = parser.parse_args()
+
+    # 汇总表不存在时先创建
+    BillMonthlyRollup.__table__.create(bind=engine, checkfirst=True)
+
+    db = SessionLocal()
+    try:
+        count = rebuild_rollups(db, args.family or None)
+        db.commit()
+        logger.info(f"重建完成，共 {count} 条汇总记录")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"重建月度汇总失败: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
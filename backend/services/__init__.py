@@ -0,0 +1,19 @@
+from .bill_import import (
+    JDBillIndex,
+    CategoryResolver,
+    bulk_insert_bills,
+    invalidate_category_cache,
+)
+from .bill_rollup import RollupDelta, rebuild_rollups
+from .upload_import import ImportResult, import_bills
+
+__all__ = [
+    "JDBillIndex",
+    "CategoryResolver",
+    "bulk_insert_bills",
+    "invalidate_category_cache",
+    "RollupDelta",
+    "rebuild_rollups",
+    "ImportResult",
+    "import_bills",
+]
@@ -0,0 +1,265 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+from models.bill import Bill, BillCategory
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# 京东模糊匹配的时间容差
+JD_TIME_TOLERANCE = timedelta(minutes=1)
+
+# 批量插入时写入的列，created_at/updated_at 由数据库默认值填充
+BILL_INSERT_COLUMNS = [
+    column.key for column in Bill.__table__.columns
+    if column.key not in ("id", "created_at", "updated_at")
+]
+
+# 家庭分类缓存: family_id -> {分类名称: 分类ID}
+_category_cache = TTLCache(maxsize=settings.CATEGORY_CACHE_SIZE, ttl=settings.CATEGORY_CACHE_TTL)
+
+
+def _normalize_time(value: Optional[datetime]) -> Optional[datetime]:
+    """统一为不带时区的本地时间，避免带时区和不带时区的时间比较出错"""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def _normalize_amount(value: Any) -> Optional[Decimal]:
+    """金额统一保留两位小数，与数据库 DECIMAL(12,2) 的精度一致"""
+    if value is None:
+        return None
+    try:
+        return Decimal(str(value)).quantize(Decimal("0.01"))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def _minute_bucket(value: datetime) -> int:
+    """按分钟划分时间桶"""
+    return int(value.timestamp() // 60)
+
+
+class JDBillIndex:
+    """
+    京东账单的内存去重索引
+
+    一次性加载批次时间范围内该家庭的所有京东账单，替代逐条调用
+    find_existing_jd_bill 的两次查询。匹配策略与 find_existing_jd_bill 保持一致：
+    1. order_id + transaction_time + amount 精确匹配
+    2. transaction_time（±1分钟）+ amount + transaction_desc 模糊匹配
+    """
+
+    def __init__(self):
+        self._exact: Dict[Tuple[str, datetime, Decimal], Bill] = {}
+        self._fuzzy: Dict[Tuple[int, Decimal, str], List[Bill]] = defaultdict(list)
+
+    @classmethod
+    def load(cls, records: Iterable[Dict[str, Any]], family_id: int, db: Session) -> "JDBillIndex":
+        """根据待导入记录的时间范围加载候选账单并建立索引"""
+        index = cls()
+
+        times = [
+            _normalize_time(record.get("transaction_time"))
+            for record in records
+            if isinstance(record.get("transaction_time"), datetime)
+        ]
+        if not times:
+            return index
+
+        time_start = min(times) - JD_TIME_TOLERANCE
+        time_end = max(times) + JD_TIME_TOLERANCE
+
+        candidates = db.query(Bill).filter(
+            Bill.family_id == family_id,
+            Bill.source_type == "jd",
+            Bill.transaction_time >= time_start,
+            Bill.transaction_time <= time_end
+        ).order_by(Bill.id).all()
+
+        for bill in candidates:
+            index.add(bill)
+
+        logger.info(f"京东去重索引加载完成: family_id={family_id}, 候选账单数={len(candidates)}, "
+                    f"时间范围={time_start} ~ {time_end}")
+        return index
+
+    def add(self, bill: Bill) -> None:
+        """将账单加入索引（包括本批次新建的账单）"""
+        transaction_time = _normalize_time(bill.transaction_time)
+        amount = _normalize_amount(bill.amount)
+        if transaction_time is None or amount is None:
+            return
+
+        order_id = (bill.raw_data or {}).get("order_id")
+        if order_id:
+            self._exact.setdefault((str(order_id), transaction_time, amount), bill)
+
+        if bill.transaction_desc:
+            key = (_minute_bucket(transaction_time), amount, bill.transaction_desc)
+            self._fuzzy[key].append(bill)
+
+    def remove(self, bill: Bill) -> None:
+        """从索引中移除账单，账单字段被更新前调用"""
+        transaction_time = _normalize_time(bill.transaction_time)
+        amount = _normalize_amount(bill.amount)
+        if transaction_time is None or amount is None:
+            return
+
+        order_id = (bill.raw_data or {}).get("order_id")
+        exact_key = (str(order_id), transaction_time, amount)
+        if order_id and self._exact.get(exact_key) is bill:
+            del self._exact[exact_key]
+
+        if bill.transaction_desc:
+            key = (_minute_bucket(transaction_time), amount, bill.transaction_desc)
+            bucket = self._fuzzy.get(key)
+            if bucket and bill in bucket:
+                bucket.remove(bill)
+
+    def find(self, record: Dict[str, Any]) -> Optional[Bill]:
+        """查找与记录匹配的已存在账单，未找到返回 None"""
+        raw_data = record.get("raw_data", {}) or {}
+        order_id = raw_data.get("order_id")
+        transaction_time = _normalize_time(record.get("transaction_time"))
+        amount = _normalize_amount(record.get("amount"))
+        transaction_desc = record.get("transaction_desc", "")
+
+        # 策略1: order_id + transaction_time + amount 精确匹配
+        if order_id and transaction_time and amount is not None:
+            existing_bill = self._exact.get((str(order_id), transaction_time, amount))
+            if existing_bill is not None:
+                logger.debug(f"找到已存在的京东账单（订单号+时间+金额匹配）: {order_id}")
+                return existing_bill
+
+        # 策略2: 时间（±1分钟）+ 金额 + 描述匹配
+        if transaction_time and amount is not None and transaction_desc:
+            bucket = _minute_bucket(transaction_time)
+            for offset in (0, -1, 1):
+                for bill in self._fuzzy.get((bucket + offset, amount, transaction_desc), ()):
+                    if abs(_normalize_time(bill.transaction_time) - transaction_time) <= JD_TIME_TOLERANCE:
+                        logger.debug(f"找到已存在的京东账单（时间+金额+描述匹配）: {transaction_desc[:50]}...")
+                        return bill
+
+        return None
+
+
+def _bill_row(bill: Bill) -> Dict[str, Any]:
+    """将未入库的 Bill 对象转换为插入参数"""
+    return {key: getattr(bill, key) for key in BILL_INSERT_COLUMNS}
+
+
+def _insert_bill_chunk(db: Session, bills: List[Bill], failures: List[Tuple[Bill, Exception]]) -> None:
+    """
+    在保存点内插入一批账单
+
+    整批插入失败时二分拆分重试，最终只有真正出错的单条记录被记为失败，
+    其余记录照常写入。
+    """
+    statement = insert(Bill.__table__).returning(Bill.__table__.c.id, sort_by_parameter_order=True)
+
+    try:
+        with db.begin_nested():
+            ids = db.execute(statement, [_bill_row(bill) for bill in bills]).scalars().all()
+    except SQLAlchemyError as e:
+        if len(bills) == 1:
+            failures.append((bills[0], e))
+            return
+        middle = len(bills) // 2
+        logger.warning(f"批量插入{len(bills)}条账单失败，拆分重试: {e}")
+        _insert_bill_chunk(db, bills[:middle], failures)
+        _insert_bill_chunk(db, bills[middle:], failures)
+        return
+
+    for bill, bill_id in zip(bills, ids):
+        bill.id = bill_id
+
+
+def bulk_insert_bills(db: Session, bills: List[Bill], chunk_size: int = 500) -> List[Tuple[Bill, Exception]]:
+    """
+    批量插入账单
+
+    每个分块使用一条多行 INSERT ... RETURNING id 写入，插入成功的 Bill 对象会被
+    回填 id。返回插入失败的 (账单, 异常) 列表，调用方负责最终提交。
+    """
+    failures: List[Tuple[Bill, Exception]] = []
+    chunk_size = max(1, chunk_size)
+
+    for start in range(0, len(bills), chunk_size):
+        _insert_bill_chunk(db, bills[start:start + chunk_size], failures)
+
+    logger.info(f"批量插入账单完成: 总数={len(bills)}, 失败={len(failures)}")
+    return failures
+
+
+def invalidate_category_cache(family_id: int) -> None:
+    """分类数据变化后使该家庭的分类缓存失效"""
+    _category_cache.pop(family_id)
+
+
+class CategoryResolver:
+    """
+    导入过程中的分类解析器
+
+    一次性加载家庭的全部分类（优先使用进程内缓存），缺失的分类用一条批量
+    INSERT 创建。新建分类不单独提交，随导入事务一起提交或回滚。
+    """
+
+    def __init__(self, family_id: int, db: Session):
+        self.family_id = family_id
+        self.db = db
+        self._categories: Optional[Dict[str, int]] = None
+
+    def _load(self, use_cache: bool = True) -> Dict[str, int]:
+        """加载家庭分类名称到ID的映射"""
+        categories = _category_cache.get(self.family_id) if use_cache else None
+        if categories is None:
+            rows = self.db.query(BillCategory.category_name, BillCategory.id).filter(
+                BillCategory.family_id == self.family_id
+            ).all()
+            categories = {row.category_name: row.id for row in rows}
+            _category_cache.set(self.family_id, categories)
+        return dict(categories)
+
+    def resolve(self, names: Iterable[Optional[str]]) -> Dict[str, int]:
+        """确保给定名称的分类都存在，返回完整的名称到ID映射"""
+        if self._categories is None:
+            self._categories = self._load()
+
+        missing = {name for name in names if name and name not in self._categories}
+        if missing:
+            # 缓存可能落后于数据库，创建前重新加载一次
+            self._categories = self._load(use_cache=False)
+            missing = sorted(name for name in missing if name not in self._categories)
+
+        if missing:
+            statement = insert(BillCategory.__table__).returning(
+                BillCategory.__table__.c.id,
+                BillCategory.__table__.c.category_name
+            )
+            rows = self.db.execute(statement, [
+                {
+                    "category_name": name,
+                    "family_id": self.family_id,
+                    "icon": "category",
+                    "color": "#666666"
+                }
+                for name in missing
+            ]).all()
+            self._categories.update({row.category_name: row.id for row in rows})
+            # 新分类尚未提交，不能写入进程缓存
+            invalidate_category_cache(self.family_id)
+            logger.info(f"批量创建分类: family_id={self.family_id}, 分类={missing}")
+
+        return self._categories
@@ -0,0 +1,158 @@
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models.bill import Bill, BillMonthlyRollup
+from services.bill_import import _normalize_amount
+
+logger = logging.getLogger(__name__)
+
+# 汇总表的唯一键列
+ROLLUP_KEY_COLUMNS = ("family_id", "month", "source_type", "category_id", "transaction_type")
+
+RollupKey = Tuple[int, date, str, int, str]
+
+
+def month_of(value: datetime) -> date:
+    """取交易时间所在月份的第一天，与按月统计时的分组口径一致"""
+    return date(value.year, value.month, 1)
+
+
+def rollup_key(bill: Bill) -> Optional[RollupKey]:
+    """账单对应的汇总键，缺少必要字段的账单不计入汇总"""
+    if bill.family_id is None or bill.transaction_time is None or not bill.transaction_type:
+        return None
+    return (
+        bill.family_id,
+        month_of(bill.transaction_time),
+        bill.source_type,
+        bill.category_id or 0,
+        bill.transaction_type
+    )
+
+
+class RollupDelta:
+    """
+    月度汇总的增量
+
+    在同一事务内累积账单的新增、删除和修改，最后用一条 upsert 写入汇总表。
+    修改账单时，应在修改前调用 remove、修改后调用 add。
+    """
+
+    def __init__(self):
+        self._deltas: Dict[RollupKey, List] = defaultdict(lambda: [Decimal("0"), 0])
+
+    def add(self, bill: Bill, sign: int = 1) -> None:
+        """计入一条账单"""
+        key = rollup_key(bill)
+        amount = _normalize_amount(bill.amount)
+        if key is None or amount is None:
+            return
+        delta = self._deltas[key]
+        delta[0] += amount * sign
+        delta[1] += sign
+
+    def remove(self, bill: Bill) -> None:
+        """扣除一条账单"""
+        self.add(bill, sign=-1)
+
+    def rows(self) -> List[Dict]:
+        """非零的增量行"""
+        return [
+            dict(zip(ROLLUP_KEY_COLUMNS, key), total_amount=amount, bill_count=count)
+            for key, (amount, count) in self._deltas.items()
+            if amount != 0 or count != 0
+        ]
+
+    def apply(self, db: Session) -> int:
+        """将增量写入汇总表（不提交），返回写入的行数"""
+        rows = self.rows()
+        if not rows:
+            return 0
+
+        _upsert_rollups(db, rows)
+
+        # 笔数归零的汇总行已没有对应账单，直接删除
+        family_ids = {row["family_id"] for row in rows}
+        db.query(BillMonthlyRollup).filter(
+            BillMonthlyRollup.family_id.in_(family_ids),
+            BillMonthlyRollup.bill_count <= 0
+        ).delete(synchronize_session=False)
+
+        self._deltas.clear()
+        return len(rows)
+
+
+def _upsert_rollups(db: Session, rows: List[Dict]) -> None:
+    """按唯一键累加汇总行，PostgreSQL 和 SQLite 使用 INSERT ... ON CONFLICT DO UPDATE"""
+    table = BillMonthlyRollup.__table__
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        dialect_insert = None
+
+    if dialect_insert is not None:
+        statement = dialect_insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(ROLLUP_KEY_COLUMNS),
+            set_={
+                "total_amount": table.c.total_amount + statement.excluded.total_amount,
+                "bill_count": table.c.bill_count + statement.excluded.bill_count,
+                "updated_at": func.now()
+            }
+        )
+        db.execute(statement, rows)
+        return
+
+    # 其他数据库：逐行查询后更新或插入
+    for row in rows:
+        rollup = db.query(BillMonthlyRollup).filter_by(
+            **{column: row[column] for column in ROLLUP_KEY_COLUMNS}
+        ).with_for_update().first()
+        if rollup:
+            rollup.total_amount += row["total_amount"]
+            rollup.bill_count += row["bill_count"]
+        else:
+            db.add(BillMonthlyRollup(**row))
+    db.flush()
+
+
+def rebuild_rollups(db: Session, family_ids: Optional[Iterable[int]] = None, batch_size: int = 5000) -> int:
+    """
+    根据 bills 表重建月度汇总（不提交）
+
+    family_ids 为空时重建全部家庭，返回重建后的汇总行数。
+    """
+    family_ids = list(family_ids) if family_ids is not None else None
+
+    delete_query = db.query(BillMonthlyRollup)
+    bill_query = db.query(
+        Bill.family_id,
+        Bill.transaction_time,
+        Bill.source_type,
+        Bill.category_id,
+        Bill.transaction_type,
+        Bill.amount
+    )
+    if family_ids is not None:
+        delete_query = delete_query.filter(BillMonthlyRollup.family_id.in_(family_ids))
+        bill_query = bill_query.filter(Bill.family_id.in_(family_ids))
+
+    delete_query.delete(synchronize_session=False)
+
+    delta = RollupDelta()
+    for row in bill_query.yield_per(batch_size):
+        delta.add(row)
+
+    count = delta.apply(db)
+    logger.info(f"月度汇总重建完成: 家庭={family_ids or '全部'}, 汇总行数={count}")
+    return count
@@ -0,0 +1,156 @@
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+import logging
+import os
+import pickle
+import threading
+import time
+
+from config.settings import settings
+from parsers import BaseParser, BillSource, ParseResult
+
+logger = logging.getLogger(__name__)
+
+# 缓存格式版本，解析器输出结构变化时递增，使旧缓存失效
+PARSE_CACHE_VERSION = 1
+
+
+class _TeeBatches:
+    """
+    逐批产出解析结果，同时保留已产出的批次
+
+    导入失败时由 ParseCache.save 写入已产出的批次，并继续读完同一个解析过程的剩余批次，不重新解析文件。
+    """
+
+    def __init__(self, batches: Iterator[List[Dict[str, Any]]]):
+        self._batches = batches
+        self.consumed: List[List[Dict[str, Any]]] = []
+        self.parse_failed = False  # 解析本身出错时结果不完整，不能缓存
+
+    def __iter__(self) -> "_TeeBatches":
+        return self
+
+    def __next__(self) -> List[Dict[str, Any]]:
+        try:
+            batch = next(self._batches)
+        except StopIteration:
+            raise
+        except Exception:
+            self.parse_failed = True
+            raise
+        self.consumed.append(batch)
+        return batch
+
+    def remaining(self) -> Iterator[List[Dict[str, Any]]]:
+        """尚未产出的批次"""
+        return self._batches
+
+
+class ParseCache:
+    """
+    按文件内容哈希缓存解析后的记录批次
+
+    首次导入直接流式解析，已产出的批次保留在内存中（文件大小受 MAX_FILE_SIZE 限制）；
+    导入失败时写入这些批次和剩余批次，重试同一文件时直接读取缓存，跳过解析；导入成功后由调用方删除缓存。
+    缓存文件只由服务端写入上传目录，使用 pickle 保存。
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None, ttl: int = 86400):
+        self._cache_dir = cache_dir
+        self.ttl = ttl
+
+    @property
+    def cache_dir(self) -> Path:
+        path = self._cache_dir or settings.upload_path / "parse_cache"
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"v{PARSE_CACHE_VERSION}-{key}.pkl"
+
+    def iter_batches(
+        self,
+        parser: BaseParser,
+        source: BillSource,
+        result: ParseResult,
+        batch_size: int,
+        key: str
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """产出解析后的记录批次，有缓存时读取缓存，否则直接解析文件"""
+        path = self._path(key)
+        if path.exists():
+            logger.info(f"命中解析缓存: {key}")
+            return self._read(path, result)
+        return _TeeBatches(parser.iter_batches(source, result, batch_size))
+
+    def save(self, batches: Iterator[List[Dict[str, Any]]], result: ParseResult, key: str):
+        """
+        导入失败后缓存 iter_batches 产出的批次
+
+        读取缓存或解析出错时跳过；写入失败只记录日志。result 为传给 iter_batches 的解析结果。
+        """
+        if not isinstance(batches, _TeeBatches) or batches.parse_failed:
+            return
+        path = self._path(key)
+        if path.exists():
+            return
+        try:
+            self._write(batches, result, path)
+        except Exception as e:
+            logger.warning(f"写入解析缓存失败: {key}, 错误: {e}")
+
+    def discard(self, key: str):
+        """删除缓存"""
+        path = self._path(key)
+        if path.exists():
+            path.unlink()
+
+    def _write(self, batches: _TeeBatches, result: ParseResult, path: Path):
+        """逐批写入缓存，写完后再原子替换，避免读到不完整的缓存"""
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(temp_path, "wb") as f:
+                for batch in batches.consumed:
+                    pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+                for batch in batches.remaining():
+                    pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+                # 批次结束标记，之后是解析失败的记录
+                pickle.dump(None, f)
+                pickle.dump((result.failed_records, result.errors), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+        self._sweep()
+
+    def _read(self, path: Path, result: ParseResult) -> Iterator[List[Dict[str, Any]]]:
+        """读取缓存的批次，成功记录逐条计数，解析失败的记录在最后合并"""
+        with open(path, "rb") as f:
+            while True:
+                batch = pickle.load(f)
+                if batch is None:
+                    break
+                for _ in batch:
+                    result.count_success()
+                yield batch
+            failed_records, errors = pickle.load(f)
+
+        failures = ParseResult()
+        failures.failed_records = failed_records
+        failures.errors = errors
+        failures.failed_count = len(failed_records)
+        result.merge_failures(failures)
+
+    def _sweep(self):
+        """清理过期的缓存文件"""
+        expire_before = time.time() - self.ttl
+        for path in self.cache_dir.glob("*.pkl"):
+            try:
+                if path.stat().st_mtime < expire_before:
+                    path.unlink()
+            except OSError:
+                continue
+
+
+# 全局解析缓存
+parse_cache = ParseCache(ttl=settings.PARSE_CACHE_TTL)
@@ -0,0 +1,406 @@
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import logging
+import time
+
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+from core.metrics import record_bill_import
+from models.bill import Bill
+from models.upload import UploadRecord
+from parsers import BaseParser, BillSource, ParseResult
+from services.bill_import import JDBillIndex, CategoryResolver, bulk_insert_bills
+from services.bill_rollup import RollupDelta
+from services.parse_cache import parse_cache
+
+logger = logging.getLogger(__name__)
+
+# 上传记录中最多保存的错误/警告条数，避免大文件的失败信息撑大记录
+MAX_STORED_MESSAGES = 100
+
+
+class ImportResult:
+    """一次文件导入的统计结果"""
+
+    def __init__(self, parse_result: ParseResult):
+        self.parse_result = parse_result
+        self.created_count = 0  # 新增记录数
+        self.updated_count = 0  # 更新记录数
+        self.failed_count = 0  # 保存失败的记录数
+        self._bill_ids: Dict[int, None] = {}  # 按首次出现顺序去重的账单ID
+
+    @property
+    def created_bill_ids(self) -> List[int]:
+        """新增和更新的账单ID，同一账单只出现一次"""
+        return list(self._bill_ids)
+
+    def add_bill_ids(self, bill_ids: Iterable[int]):
+        """记录本块写入的账单ID；本块新建后又被后续记录更新的京东账单只记录一次"""
+        for bill_id in bill_ids:
+            self._bill_ids.setdefault(bill_id)
+
+    @property
+    def total_records(self) -> int:
+        return self.parse_result.total_count
+
+    @property
+    def total_success(self) -> int:
+        """总成功数（新增+更新）"""
+        return self.created_count + self.updated_count
+
+    @property
+    def total_failed(self) -> int:
+        return self.failed_count + len(self.parse_result.failed_records)
+
+    @property
+    def status(self) -> str:
+        return "completed" if self.failed_count == 0 else "partial_success"
+
+    def warnings(self) -> List[str]:
+        """构建警告信息"""
+        warnings = self.parse_result.errors.copy()
+        if self.updated_count > 0:
+            warnings.append(f"更新已存在记录数: {self.updated_count}")
+        return warnings
+
+    def errors(self) -> List[str]:
+        """构建错误信息列表"""
+        error_messages = []
+        # 添加解析失败的记录错误信息
+        for failed_record in self.parse_result.failed_records:
+            if isinstance(failed_record, dict) and 'parse_error' in failed_record:
+                error_messages.append(failed_record['parse_error'])
+            else:
+                error_messages.append(str(failed_record))
+
+        # 添加保存失败的记录数
+        if self.failed_count > 0:
+            error_messages.append(f"保存失败记录数: {self.failed_count}")
+        return error_messages
+
+
+def check_duplicate_bill_other_sources(record: Dict[str, Any], family_id: int, source_type: str, db: Session) -> bool:
+    """
+    检查非京东账单记录是否重复
+    """
+    try:
+        # 支付宝账单不进行记录级别的去重，因为相同记录可能是两笔独立交易
+        if source_type == "alipay":
+            return False
+
+        # 提取订单号（如果有的话）
+        order_id = None
+        raw_data = record.get("raw_data", {})
+
+        if raw_data:
+            order_id = raw_data.get("order_id") or raw_data.get("merchant_order_id")
+
+        if not order_id:
+            order_id = record.get("order_id") or record.get("merchant_order_id")
+
+        # 如果有订单号，优先使用订单号匹配
+        if order_id and order_id.strip():
+            logger.debug(f"使用订单号进行去重检查: {order_id}")
+
+            existing_bill = db.query(Bill).filter(
+                Bill.family_id == family_id,
+                Bill.source_type == source_type,
+                Bill.raw_data.op('->>')('order_id') == order_id.strip()
+            ).first()
+
+            if existing_bill:
+                logger.info(f"发现重复记录（订单号匹配）: {order_id}")
+                return True
+
+        # 使用组合字段进行匹配（交易时间 + 金额 + 商户名称）
+        transaction_time = record.get("transaction_time")
+        amount = record.get("amount")
+        merchant_name = record.get("merchant_name") or record.get("transaction_desc", "")
+
+        logger.debug(f"组合字段检查: time={transaction_time}, amount={amount}, merchant={merchant_name}")
+
+        if transaction_time and amount is not None:
+            # 时间容差：允许1分钟内的时间差异
+            time_start = transaction_time - timedelta(minutes=1)
+            time_end = transaction_time + timedelta(minutes=1)
+
+            existing_bill = db.query(Bill).filter(
+                Bill.family_id == family_id,
+                Bill.source_type == source_type,
+                Bill.transaction_time >= time_start,
+                Bill.transaction_time <= time_end,
+                Bill.amount == amount
+            ).first()
+
+            if existing_bill:
+                # 进一步检查商户名称或交易描述是否相似
+                existing_desc = existing_bill.transaction_desc or ""
+                if merchant_name and (
+                    merchant_name in existing_desc or
+                    existing_desc in merchant_name or
+                    merchant_name == existing_desc
+                ):
+                    logger.info(f"发现重复记录（组合字段匹配）: 时间={transaction_time}, 金额={amount}, 商户={merchant_name}")
+                    return True
+
+        logger.debug("未发现重复记录")
+        return False
+
+    except Exception as e:
+        logger.error(f"检查重复记录时出错: {e}")
+        # 出错时不阻止导入，但记录错误
+        return False
+
+
+def import_bills(
+    db: Session,
+    parser: BaseParser,
+    source: BillSource,
+    family_id: int,
+    user_id: int,
+    source_type: str,
+    filename: str,
+    auto_categorize: bool = True,
+    on_progress: Optional[Callable[[int], None]] = None,
+    file_hash: Optional[str] = None,
+    upload_id: Optional[int] = None
+) -> ImportResult:
+    """
+    解析账单文件并写入数据库：去重、更新京东已有账单、自动分类、批量插入、维护月度汇总
+
+    source 为文件路径或二进制文件对象，解析器 requires_path 为 True 时必须是文件路径。
+
+    新建的账单记录 upload_id，删除上传记录时据此删除账单；更新的已有账单仍属于创建它的上传记录。
+    只 flush 不提交，由调用方决定提交或回滚。on_progress 在每块处理完后以已处理的记录数调用。
+    提供 file_hash 时已有的解析缓存直接读取，否则直接解析文件，导入失败时缓存已解析的批次供重试使用；
+    导入成功后调用方应调用 discard_parse_cache。
+    """
+    start_time = time.perf_counter()
+
+    # 流式解析文件，按固定大小分块处理，内存占用不随文件大小增长
+    parse_result = ParseResult()
+    result = ImportResult(parse_result)
+    record_index = 0
+
+    # 用于批次内去重的集合
+    batch_records = set()
+
+    # 自动分类：复用同一个解析器，家庭分类只加载一次
+    category_resolver = CategoryResolver(family_id, db)
+
+    cache_key = _parse_cache_key(source_type, file_hash) if file_hash and settings.PARSE_CACHE_ENABLED else None
+    if cache_key:
+        batches = parse_cache.iter_batches(parser, source, parse_result, settings.IMPORT_BATCH_SIZE, cache_key)
+    else:
+        batches = parser.iter_batches(source, parse_result, settings.IMPORT_BATCH_SIZE)
+
+    try:
+        for records in batches:
+            created_bills = []
+            pending_bills = []  # 待批量插入的新账单
+
+            # 京东账单：一次性加载本块候选账单并建立内存索引，避免逐条查询
+            jd_index = None
+            if source_type == "jd":
+                jd_index = JDBillIndex.load(records, family_id, db)
+
+            # 需要自动分类的账单，本块处理完后统一解析分类
+            categorized_bills = []
+
+            # 月度汇总增量：已入库账单被更新时先扣除旧值，本块写入前统一计入最终值
+            rollup_delta = RollupDelta()
+            subtracted_bills = set()
+
+            # 处理成功解析的记录
+            for i, record in enumerate(records, start=record_index):
+                try:
+                    # 检查必需字段
+                    required_fields = ["amount", "transaction_time", "transaction_type"]
+                    missing_fields = [field for field in required_fields if field not in record or record[field] is None]
+
+                    if missing_fields:
+                        logger.warning(f"记录 {i+1} 缺少必需字段: {missing_fields}, 记录内容: {record}")
+                        result.failed_count += 1
+                        continue
+
+                    # 批次内去重检查（支付宝账单不进行批次内去重）
+                    if source_type != "alipay":
+                        record_key = (
+                            record["transaction_time"].isoformat() if hasattr(record["transaction_time"], 'isoformat') else str(record["transaction_time"]),
+                            str(record["amount"]),
+                            record.get("transaction_desc", "")
+                        )
+
+                        if record_key in batch_records:
+                            logger.info(f"跳过批次内重复记录 (记录 {i+1}): {record_key}")
+                            continue
+
+                        batch_records.add(record_key)
+
+                    # 京东账单：查找已存在的记录并更新
+                    if source_type == "jd":
+                        existing_bill = jd_index.find(record)
+
+                        if existing_bill:
+                            # 更新已存在的记录（更新前移出索引，更新后按新值重新加入）
+                            jd_index.remove(existing_bill)
+                            if existing_bill.id is not None and id(existing_bill) not in subtracted_bills:
+                                rollup_delta.remove(existing_bill)
+                                subtracted_bills.add(id(existing_bill))
+                            existing_bill.amount = record["amount"]
+                            existing_bill.transaction_time = record["transaction_time"]
+                            existing_bill.transaction_type = record["transaction_type"]
+                            existing_bill.transaction_desc = record.get("transaction_desc")
+                            existing_bill.raw_data = record.get("raw_data", {})
+                            existing_bill.source_filename = filename  # 更新文件名
+                            existing_bill.order_id = record.get("order_id")  # 更新订单号
+                            existing_bill.counter_party = record.get("counter_party")  # 更新对手方
+                            existing_bill.remark = record.get("remark")  # 更新备注
+                            existing_bill.balance = record.get("balance")  # 更新余额
+                            existing_bill.updated_at = datetime.now()
+                            jd_index.add(existing_bill)
+
+                            # 自动分类
+                            if auto_categorize and record.get("category"):
+                                categorized_bills.append((existing_bill, record["category"]))
+
+                            created_bills.append(existing_bill)
+                            result.updated_count += 1  # 统计更新记录数
+                            logger.info(f"更新京东账单记录: {record.get('raw_data', {}).get('order_id')}")
+                            continue
+
+                    # 其他来源：检查重复
+                    else:
+                        if check_duplicate_bill_other_sources(record, family_id, source_type, db):
+                            logger.info(f"跳过重复记录 (记录 {i+1})")
+                            continue
+
+                    # 创建新的账单记录
+                    bill = Bill(
+                        user_id=user_id,
+                        family_id=family_id,
+                        amount=record["amount"],
+                        transaction_time=record["transaction_time"],
+                        transaction_type=record["transaction_type"],
+                        transaction_desc=record.get("transaction_desc"),
+                        source_type=source_type,
+                        category_id=None,
+                        upload_id=upload_id,
+                        raw_data=record.get("raw_data", {}),
+                        source_filename=filename,  # 记录所有账单的文件名
+                        order_id=record.get("order_id"),  # 添加订单号字段
+                        counter_party=record.get("counter_party"),  # 添加对手方字段
+                        remark=record.get("remark"),  # 添加备注字段
+                        balance=record.get("balance")  # 添加余额字段
+                    )
+
+                    # 自动分类
+                    if auto_categorize and record.get("category"):
+                        categorized_bills.append((bill, record["category"]))
+
+                    # 新账单先暂存，本块处理完后批量写入
+                    pending_bills.append(bill)
+                    created_bills.append(bill)
+                    if jd_index is not None:
+                        jd_index.add(bill)
+
+                except Exception as e:
+                    logger.error(f"创建账单记录失败 (记录 {i+1}): {e}")
+                    logger.error(f"问题记录内容: {record}")
+                    result.failed_count += 1
+
+            record_index += len(records)
+
+            # 自动分类：缺失的分类批量创建
+            if categorized_bills:
+                category_ids = category_resolver.resolve(
+                    category_name for _, category_name in categorized_bills
+                )
+                for bill, category_name in categorized_bills:
+                    bill.category_id = category_ids.get(category_name)
+
+            # 批量写入新账单，失败的分块会拆分重试，只有出错的记录被跳过
+            insert_failures = bulk_insert_bills(db, pending_bills, settings.IMPORT_BATCH_SIZE)
+            for failed_bill, db_error in insert_failures:
+                logger.error(f"数据库插入失败: {db_error}")
+                logger.error(f"问题记录内容: {failed_bill.raw_data}")
+            if insert_failures:
+                failed_bill_ids = {id(failed_bill) for failed_bill, _ in insert_failures}
+                created_bills = [bill for bill in created_bills if id(bill) not in failed_bill_ids]
+            result.created_count += len(pending_bills) - len(insert_failures)
+            result.failed_count += len(insert_failures)
+
+            # 更新月度汇总（同一账单可能被多次更新，只计入一次）
+            added_bills = set()
+            for bill in created_bills:
+                if id(bill) not in added_bills:
+                    rollup_delta.add(bill)
+                    added_bills.add(id(bill))
+            rollup_delta.apply(db)
+
+            # 写入本块的更新，只保留账单ID，释放账单对象
+            db.flush()
+            result.add_bill_ids(bill.id for bill in created_bills)
+
+            if on_progress is not None:
+                on_progress(parse_result.total_count)
+    except Exception:
+        # 导入失败时缓存已解析的批次，重试同一文件时跳过解析
+        if cache_key:
+            parse_cache.save(batches, parse_result, cache_key)
+        raise
+
+    logger.info(f"文件导入完成: {filename}, 新增: {result.created_count}, 更新: {result.updated_count}, 失败: {result.failed_count}")
+    record_bill_import(
+        source_type,
+        created=result.created_count,
+        updated=result.updated_count,
+        failed=result.total_failed,
+        seconds=time.perf_counter() - start_time
+    )
+    return result
+
+
+def _parse_cache_key(source_type: str, file_hash: str) -> str:
+    return f"{source_type}-{file_hash}"
+
+
+def discard_parse_cache(source_type: str, file_hash: Optional[str]):
+    """导入成功后删除解析缓存"""
+    if file_hash and settings.PARSE_CACHE_ENABLED:
+        parse_cache.discard(_parse_cache_key(source_type, file_hash))
+
+
+def find_upload_by_hash(db: Session, family_id: int, file_hash: str) -> Optional[UploadRecord]:
+    """查找同一家庭中内容相同、已导入成功的上传记录"""
+    return db.query(UploadRecord).filter(
+        UploadRecord.family_id == family_id,
+        UploadRecord.file_hash == file_hash,
+        UploadRecord.status.in_(["completed", "partial_success"])
+    ).order_by(UploadRecord.id.desc()).first()
+
+
+def finish_upload_record(record: UploadRecord, result: ImportResult):
+    """将导入结果写入上传记录"""
+    record.total_records = result.total_records
+    record.processed_records = result.total_records
+    record.success_records = result.total_success
+    record.created_records = result.created_count
+    record.updated_records = result.updated_count
+    record.failed_records = result.total_failed
+    record.status = result.status
+    record.errors = result.errors()[:MAX_STORED_MESSAGES]
+    record.warnings = result.warnings()[:MAX_STORED_MESSAGES]
+    record.processed_at = datetime.now()
+
+
+def fail_upload_record(db: Session, upload_id: int, message: str):
+    """将上传记录标记为失败并提交，记录已被删除时忽略"""
+    record = db.get(UploadRecord, upload_id)
+    if record is None:
+        return
+    record.status = "failed"
+    record.error_message = message
+    record.processed_at = datetime.now()
+    db.commit()
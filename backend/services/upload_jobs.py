@@ -0,0 +1,210 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Tuple
+import logging
+import os
+import threading
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from config.database import SessionLocal
+from config.settings import settings
+from models.upload import UploadRecord
+from parsers import get_parser
+from services.upload_import import import_bills, finish_upload_record, fail_upload_record, discard_parse_cache
+
+logger = logging.getLogger(__name__)
+
+
+def run_upload_job(
+    upload_id: int,
+    file_path: str,
+    auto_categorize: bool = True,
+    session_factory: Callable[[], Session] = SessionLocal
+):
+    """
+    执行一个后台导入任务
+
+    导入在单个事务中完成，账单和上传记录的最终状态一起提交；失败时回滚账单并将记录标记为失败。
+    """
+    db = session_factory()
+    try:
+        record = db.get(UploadRecord, upload_id)
+        if record is None:
+            logger.warning(f"上传记录不存在，跳过导入任务: {upload_id}")
+            return
+
+        parser = get_parser(record.source_type)
+        if parser is None:
+            fail_upload_record(db, upload_id, f"不支持的文件类型: {record.source_type}")
+            return
+
+        # 导入事务提交前另开会话写入进度；SQLite 同一时间只允许一个写事务，不记录进度
+        on_progress = None
+        if db.get_bind().dialect.name != "sqlite":
+            on_progress = lambda processed: _update_progress(session_factory, upload_id, processed)
+
+        result = import_bills(
+            db,
+            parser,
+            file_path,
+            family_id=record.family_id,
+            user_id=record.user_id,
+            source_type=record.source_type,
+            filename=record.filename,
+            auto_categorize=auto_categorize,
+            on_progress=on_progress,
+            file_hash=record.file_hash,
+            upload_id=upload_id
+        )
+        finish_upload_record(record, result)
+        db.commit()
+        discard_parse_cache(record.source_type, record.file_hash)
+        logger.info(f"后台导入完成: upload_id={upload_id}, 状态: {result.status}")
+
+    except Exception as e:
+        logger.error(f"后台导入失败: upload_id={upload_id}, 错误: {e}")
+        db.rollback()
+        try:
+            fail_upload_record(db, upload_id, f"导入失败: {str(e)}")
+        except Exception as mark_error:
+            logger.error(f"更新上传记录状态失败: {mark_error}")
+            db.rollback()
+    finally:
+        db.close()
+        if os.path.exists(file_path):
+            os.unlink(file_path)
+
+
+def fail_stale_uploads(session_factory: Callable[[], Session] = SessionLocal) -> int:
+    """
+    将中断的导入标记为失败，应用启动时调用
+
+    工作进程崩溃或重启时正在执行和排队的任务随之丢失，对应的上传记录会一直停留在导入中。
+    多个工作进程时其他进程可能仍在导入，只处理创建时间超过 UPLOAD_STALE_SECONDS 的记录。
+    返回标记为失败的记录数。
+    """
+    now = datetime.now()
+    db = session_factory()
+    try:
+        count = db.query(UploadRecord).filter(
+            UploadRecord.status == "processing",
+            UploadRecord.created_at < now - timedelta(seconds=settings.UPLOAD_STALE_SECONDS)
+        ).update(
+            {
+                UploadRecord.status: "failed",
+                UploadRecord.error_message: "导入中断: 服务在导入完成前停止",
+                UploadRecord.processed_at: now
+            },
+            synchronize_session=False
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    if count:
+        logger.warning(f"已将 {count} 条中断的导入记录标记为失败")
+    return count
+
+
+def _update_progress(session_factory: Callable[[], Session], upload_id: int, processed: int):
+    """记录导入进度，失败不影响导入本身"""
+    db = session_factory()
+    try:
+        db.execute(
+            update(UploadRecord)
+            .where(UploadRecord.id == upload_id)
+            .values(processed_records=processed)
+        )
+        db.commit()
+    except Exception as e:
+        logger.warning(f"更新导入进度失败: upload_id={upload_id}, 错误: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+class UploadJobQueue:
+    """
+    进程内的有界导入任务队列
+
+    固定数量的工作线程执行导入，正在执行和排队的任务总数达到上限时拒绝新任务，
+    不依赖外部消息队列。
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_pending: int,
+        session_factory: Callable[[], Session] = SessionLocal
+    ):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.session_factory = session_factory
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upload-job")
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._jobs: Dict[int, Tuple[Future, str]] = {}  # upload_id -> (任务, 待导入文件)
+        self._lock = threading.Lock()
+
+    def submit(self, upload_id: int, file_path: str, auto_categorize: bool = True) -> bool:
+        """提交导入任务，队列已满时返回 False"""
+        if not self._slots.acquire(blocking=False):
+            return False
+
+        try:
+            future = self._executor.submit(
+                run_upload_job, upload_id, file_path, auto_categorize, self.session_factory
+            )
+        except RuntimeError:
+            # 队列已关闭
+            self._slots.release()
+            return False
+
+        with self._lock:
+            self._jobs[upload_id] = (future, file_path)
+        future.add_done_callback(lambda _: self._on_done(upload_id))
+        return True
+
+    def _on_done(self, upload_id: int):
+        with self._lock:
+            self._jobs.pop(upload_id, None)
+        self._slots.release()
+
+    @property
+    def active_count(self) -> int:
+        """正在执行和排队的任务数"""
+        with self._lock:
+            return len(self._jobs)
+
+    def shutdown(self, wait: bool = True):
+        """
+        关闭队列：等待正在执行的任务完成，取消排队中的任务
+
+        被取消的任务对应的上传记录标记为失败，并删除待导入的文件。
+        """
+        with self._lock:
+            jobs = list(self._jobs.items())
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+        for upload_id, (future, file_path) in jobs:
+            if not future.cancelled():
+                continue
+            if os.path.exists(file_path):
+                os.unlink(file_path)
+            db = self.session_factory()
+            try:
+                fail_upload_record(db, upload_id, "服务关闭，导入任务已取消")
+            except Exception as e:
+                logger.error(f"更新上传记录状态失败: {e}")
+            finally:
+                db.close()
+
+
+# 全局导入任务队列
+upload_job_queue = UploadJobQueue(
+    max_workers=settings.UPLOAD_WORKERS,
+    max_pending=settings.UPLOAD_QUEUE_SIZE
+)
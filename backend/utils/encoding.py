@@ -0,0 +1,87 @@
+import codecs
+import io
+import logging
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional, Sequence, TextIO, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# 检测编码时读取的文件开头字节数，大多数账单文件整个都在样本之内
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+# 账单文件的候选编码，按优先级排列。UTF-8 的字节规则很严格，其他编码的中文文本几乎不可能通过 UTF-8 解码，
+# 所以先试 UTF-8；GB18030 兼容 GBK 和 GB2312，GBK 文件中偶尔出现的扩展字符也能解码
+DEFAULT_ENCODINGS = ("utf-8", "gb18030")
+
+# 字节序标记及对应的编码，UTF-32 LE 的标记以 UTF-16 LE 的标记开头，需要先检查
+BOM_ENCODINGS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def detect_encoding(
+    sample: bytes,
+    encodings: Sequence[str] = DEFAULT_ENCODINGS,
+    complete: bool = True
+) -> Optional[str]:
+    """
+    根据文件开头的字节检测编码，无法识别时返回 None
+
+    先检查字节序标记，再按顺序对样本做严格解码。complete 为 False 表示样本只是文件的开头，
+    末尾被截断的多字节字符不算解码失败。
+    """
+    for bom, encoding in BOM_ENCODINGS:
+        if sample.startswith(bom):
+            return encoding
+
+    for encoding in encodings:
+        try:
+            codecs.getincrementaldecoder(encoding)(errors="strict").decode(sample, final=complete)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+@contextmanager
+def open_text(
+    source: Union[str, BinaryIO],
+    encodings: Sequence[str] = DEFAULT_ENCODINGS,
+    default: str = "utf-8",
+    sample_size: int = ENCODING_SAMPLE_SIZE
+) -> Iterator[Tuple[str, TextIO]]:
+    """
+    检测编码并以文本方式打开文件，产出 (编码, 文本流)
+
+    文件路径以样本大小作为缓冲区打开，检测编码时只查看缓冲区中的字节（peek），
+    文本流随后从同一个缓冲区继续读取，文件内容只读取一次。
+    source 为二进制文件对象时从头读取，用完后不关闭，由调用方负责。
+    """
+    if isinstance(source, str):
+        binary = open(source, "rb", buffering=sample_size)
+        sample = binary.peek(sample_size)[:sample_size]
+    else:
+        binary = source
+        binary.seek(0)
+        sample = binary.read(sample_size)
+        binary.seek(0)
+
+    try:
+        encoding = detect_encoding(sample, encodings, complete=len(sample) < sample_size)
+        if encoding is None:
+            logger.warning(f"无法检测文件编码，使用默认编码: {default}")
+            encoding = default
+
+        text = io.TextIOWrapper(binary, encoding=encoding)
+        try:
+            yield encoding, text
+        finally:
+            # 解除包装，避免关闭调用方的文件对象
+            text.detach()
+    finally:
+        if binary is not source:
+            binary.close()
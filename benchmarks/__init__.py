@@ -0,0 +1,15 @@
+"""
+解析器性能基准
+
+generators 生成指定行数的支付宝、京东、招商银行模拟账单文件，run 测量各解析器 parse_file 的吞吐量、
+峰值内存和各阶段耗时，结果写入 JSON 文件，便于比较不同提交的性能。
+
+用法（在项目根目录）:
+    python -m benchmarks.run --rows 10000
+"""
+
+import os
+import sys
+
+# 与 tests 相同，直接导入 backend 下的模块
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
@@ -0,0 +1,203 @@
+"""
+模拟账单生成器
+
+生成与真实导出文件格式一致的账单：支付宝为带说明文字的 GBK 编码 CSV，京东为交易时间后跟制表符、
+其余字段逗号分隔的混合格式（金额带退款标注），招商银行为每页一个带边框表格的 PDF。
+相同的行数和随机种子生成相同的文件。
+"""
+
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator, List, Sequence, Tuple, Union
+
+PathLike = Union[str, Path]
+
+ALIPAY_HEADER = ["记录时间", "分类", "收支类型", "金额", "备注", "账户", "来源", "标签"]
+ALIPAY_CATEGORIES = [
+    ("餐饮", "支出"), ("交通", "支出"), ("购物", "支出"), ("日用", "支出"),
+    ("转账", "不计收支"), ("工资", "收入"), ("理财收益", "收入"),
+]
+
+JD_HEADER = ["交易时间", "商户名称", "交易说明", "金额", "收/付款方式", "交易状态", "收/支", "交易分类", "交易订单号", "商家订单号", "备注"]
+JD_MERCHANTS = [
+    ("京东商城", "日用百货"), ("京东超市", "食品酒饮"), ("京东到家", "生鲜"),
+    ("京东电器", "数码电器"), ("京东小金库", "小金库"), ("京东健康", "医疗保健"),
+]
+
+CMB_HEADER = ["Date", "Currency", "Amount", "Balance", "Transaction Type", "Counter Party"]
+CMB_TRANSACTION_TYPES = ["Payment", "Quick Pay", "Transfer In", "Transfer Out", "Repayment", "Interest"]
+# 每页的数据行数，加上表头正好排满一页
+CMB_ROWS_PER_PAGE = 35
+
+
+def _timestamps(rng: random.Random, rows: int, start: datetime = datetime(2025, 1, 1)) -> Iterator[datetime]:
+    """按时间顺序的交易时间，间隔 1 分钟到 5 小时"""
+    current = start
+    for _ in range(rows):
+        current += timedelta(minutes=rng.randint(1, 300), seconds=rng.randint(0, 59))
+        yield current
+
+
+def write_alipay_statement(path: PathLike, rows: int, seed: int = 1) -> str:
+    """生成支付宝记账明细（GBK 编码 CSV），返回文件路径"""
+    rng = random.Random(seed)
+    lines = [
+        "-" * 60,
+        "支付宝记账明细",
+        "账户：benchmark@example.com",
+        "起始时间：[2025-01-01 00:00:00]    终止时间：[2025-12-31 23:59:59]",
+        f"共{rows}笔记录",
+        "-" * 60,
+        ",".join(ALIPAY_HEADER),
+    ]
+    for i, transaction_time in enumerate(_timestamps(rng, rows)):
+        category, income_expense = rng.choice(ALIPAY_CATEGORIES)
+        amount = rng.randint(100, 9999900) / 100 if income_expense == "收入" else rng.randint(1, 99999) / 100
+        # 备注中偶尔包含逗号，需要加引号
+        remark = f"商户{i % 200}-备注{i}" if i % 10 else f"\"商户{i % 200},第{i}笔\""
+        lines.append(",".join([
+            transaction_time.strftime("%Y-%m-%d %H:%M:%S"),
+            category,
+            income_expense,
+            f"{amount:.2f}",
+            remark,
+            rng.choice(["余额宝", "花呗", "招商银行储蓄卡", ""]),
+            rng.choice(["手动", "自动", ""]),
+            rng.choice(["", "日常", "出行"]),
+        ]))
+    Path(path).write_bytes(("\n".join(lines) + "\n").encode("gbk"))
+    return str(path)
+
+
+def _jd_amount(rng: random.Random) -> Tuple[str, str]:
+    """京东金额和收支类型；部分订单带退款标注，如 577.61(已退款273.48)"""
+    amount = rng.randint(100, 500000) / 100
+    roll = rng.random()
+    if roll < 0.08:
+        refund = rng.randint(1, int(amount * 100)) / 100
+        return f"{amount:.2f}(已退款{refund:.2f})", "支出"
+    if roll < 0.11:
+        return f"{amount:.2f}(已全额退款)", "不计收支"
+    return f"{amount:.2f}", "支出"
+
+
+def write_jd_statement(path: PathLike, rows: int, seed: int = 1) -> str:
+    """生成京东交易流水（UTF-8，交易时间和订单号后带制表符），返回文件路径"""
+    rng = random.Random(seed)
+    lines = [
+        "导出信息：",
+        "京东账号名：benchmark_user",
+        "日期区间：2025-01-01 至 2025-12-31",
+        f"共{rows}条交易记录",
+        "特别提示：本明细仅展示京东支付的交易记录",
+        "",
+        JD_HEADER[0] + "\t," + ",".join(JD_HEADER[1:]),
+    ]
+    for i, transaction_time in enumerate(_timestamps(rng, rows)):
+        merchant, category = rng.choice(JD_MERCHANTS)
+        if merchant == "京东小金库":
+            description, amount, income_expense = "京东小金库收益", f"{rng.randint(1, 99) / 100:.2f}", "收入"
+        else:
+            description = f"商品{i % 500}等{rng.randint(1, 5)}件"
+            amount, income_expense = _jd_amount(rng)
+        order_id = f"{transaction_time:%Y%m%d}{i:012d}"
+        lines.append(
+            f"{transaction_time:%Y-%m-%d %H:%M:%S}\t,{merchant},{description},{amount},"
+            f"{rng.choice(['白条', '京东支付', '招商银行储蓄卡'])},交易成功,{income_expense},{category},"
+            f"{order_id}\t,{order_id if i % 3 else ''}\t,{rng.choice([' ', '', '自营'])},"
+        )
+    Path(path).write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def _table_stream(rows: Sequence[Sequence[str]]) -> str:
+    """绘制带边框的表格，pdfplumber 根据线条识别表格"""
+    col_width, row_height, left, top = 90, 20, 20, 800
+    right = left + col_width * len(rows[0])
+    bottom = top - row_height * len(rows)
+    ops = []
+    for i in range(len(rows) + 1):
+        y = top - i * row_height
+        ops.append(f"{left} {y} m {right} {y} l S")
+    for j in range(len(rows[0]) + 1):
+        x = left + j * col_width
+        ops.append(f"{x} {top} m {x} {bottom} l S")
+    for i, row in enumerate(rows):
+        for j, cell in enumerate(row):
+            ops.append(f"BT /F1 8 Tf {left + j * col_width + 3} {top - (i + 1) * row_height + 6} Td ({cell}) Tj ET")
+    return "\n".join(ops)
+
+
+def _text_stream(lines: Sequence[str]) -> str:
+    return "\n".join(
+        f"BT /F1 10 Tf 20 {800 - i * 14} Td ({line}) Tj ET" for i, line in enumerate(lines)
+    )
+
+
+def write_pdf(path: PathLike, pages: Sequence[Tuple[str, Sequence]]) -> str:
+    """生成最小的 PDF 文件，pages 为 ("table", 行列表) 或 ("text", 文本行列表)，内容只能是 ASCII"""
+    objects: List[str] = ["<< /Type /Catalog /Pages 2 0 R >>", "", "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for kind, content in pages:
+        stream = _table_stream(content) if kind == "table" else _text_stream(content)
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    chunks = [b"%PDF-1.4\n"]
+    size = len(chunks[0])
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(size)
+        chunk = f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+        chunks.append(chunk)
+        size += len(chunk)
+    chunks.append(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1"))
+    chunks.append("".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1"))
+    chunks.append(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{size}\n%%EOF\n".encode("latin-1"))
+    Path(path).write_bytes(b"".join(chunks))
+    return str(path)
+
+
+def write_cmb_statement(path: PathLike, rows: int, seed: int = 1, rows_per_page: int = CMB_ROWS_PER_PAGE) -> str:
+    """生成招商银行交易流水 PDF：首页为账户说明，之后每页一个带表头的表格，返回文件路径"""
+    rng = random.Random(seed)
+    balance = 50000.0
+    records = []
+    for transaction_time in _timestamps(rng, rows):
+        transaction_type = rng.choice(CMB_TRANSACTION_TYPES)
+        if transaction_type in ("Transfer In", "Interest"):
+            amount = rng.randint(1, 1000000) / 100
+        else:
+            amount = -rng.randint(1, 200000) / 100
+        balance += amount
+        records.append([
+            f"{transaction_time:%Y-%m-%d}",
+            "CNY",
+            f"{amount:.2f}",
+            f"{balance:.2f}",
+            transaction_type,
+            f"Counterparty{rng.randint(1, 300)}",
+        ])
+
+    pages = [("text", [
+        "China Merchants Bank Transaction Statement",
+        "Account: 6214 **** **** 1234",
+        f"Records: {rows}",
+    ])]
+    for start in range(0, len(records), rows_per_page):
+        pages.append(("table", [CMB_HEADER] + records[start:start + rows_per_page]))
+    return write_pdf(path, pages)
+
+
+# 来源类型 -> (生成函数, 文件扩展名)
+GENERATORS = {
+    "alipay": (write_alipay_statement, ".csv"),
+    "jd": (write_jd_statement, ".csv"),
+    "cmb": (write_cmb_statement, ".pdf"),
+}
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+解析器性能基准
+
+对每种来源生成指定行数的模拟账单，测量：
+- parse_file 的耗时（多次运行取最快和中位数）、每秒记录数和每秒 MB 数
+- 峰值内存：tracemalloc 统计的 Python 内存分配峰值（单独运行一次，tracemalloc 会拖慢解析）
+- 各阶段耗时：用计时包装替换解析器的主要方法后单独运行一次，阶段之间有嵌套，耗时包括内层阶段
+
+结果写入 JSON 文件，--compare 与之前的结果文件对比。
+
+用法（在项目根目录）:
+    python -m benchmarks.run --rows 10000
+    python -m benchmarks.run --sources jd alipay --output /tmp/after.json --compare /tmp/before.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from benchmarks.generators import GENERATORS
+from config.settings import settings
+from parsers import PARSER_MAP, BaseParser
+from parsers.cmb_parser import CMBParser
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# 各解析器计时的方法，按调用层次从外到内排列
+STAGES = {
+    "alipay": ["_open_text", "_seek_data_start", "_parse_csv", "_parse_columns", "_parse_time_column", "standardize_record"],
+    "jd": ["_open_text", "_parse_line", "_process_jd_fields", "standardize_record"],
+    "cmb": ["_extract_all_pages", "_parse_tables", "_process_cmb_fields", "standardize_record"],
+}
+
+
+class StageTimer:
+    """替换解析器实例上的方法，累计每个方法的调用次数和耗时"""
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    def wrap(self, parser: BaseParser, name: str):
+        method = getattr(parser, name)
+        stats = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0})
+
+        if name == "_open_text":
+            # 上下文管理器：计时包括检测编码和创建文本流，不包括之后的逐行读取
+            @wraps(method)
+            def timed_context(*args, **kwargs):
+                start = time.perf_counter()
+                context = method(*args, **kwargs)
+                text = context.__enter__()
+                stats["calls"] += 1
+                stats["seconds"] += time.perf_counter() - start
+                return _EnteredContext(context, text)
+
+            setattr(parser, name, timed_context)
+            return
+
+        @wraps(method)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                stats["calls"] += 1
+                stats["seconds"] += time.perf_counter() - start
+
+        setattr(parser, name, timed)
+
+
+class _EnteredContext:
+    """已进入的上下文管理器，with 语句只负责退出"""
+
+    def __init__(self, context, value):
+        self.context = context
+        self.value = value
+
+    def __enter__(self):
+        return self.value
+
+    def __exit__(self, *exc_info):
+        return self.context.__exit__(*exc_info)
+
+
+def create_parser(source_type: str, cmb_workers: Optional[int]) -> BaseParser:
+    if source_type == "cmb":
+        return CMBParser(max_workers=cmb_workers)
+    return PARSER_MAP[source_type]()
+
+
+def benchmark_source(source_type: str, path: str, repeat: int, cmb_workers: Optional[int]) -> Dict[str, Any]:
+    """测量一种来源的解析性能"""
+    file_size = os.path.getsize(path)
+
+    # 吞吐量：每次使用新的解析器实例，与处理上传文件时一致
+    durations = []
+    result = None
+    for _ in range(repeat):
+        parser = create_parser(source_type, cmb_workers)
+        start = time.perf_counter()
+        result = parser.parse_file(path)
+        durations.append(time.perf_counter() - start)
+    best = min(durations)
+
+    # 峰值内存
+    tracemalloc.start()
+    try:
+        create_parser(source_type, cmb_workers).parse_file(path)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # 各阶段耗时
+    timer = StageTimer()
+    parser = create_parser(source_type, cmb_workers)
+    for name in STAGES[source_type]:
+        timer.wrap(parser, name)
+    start = time.perf_counter()
+    parser.parse_file(path)
+    instrumented_seconds = time.perf_counter() - start
+
+    return {
+        "file_bytes": file_size,
+        "records": result.success_count,
+        "failed": result.failed_count,
+        "seconds_best": best,
+        "seconds_median": statistics.median(durations),
+        "records_per_second": result.success_count / best,
+        "mb_per_second": file_size / 1024 / 1024 / best,
+        "peak_memory_bytes": peak_memory,
+        "instrumented_seconds": instrumented_seconds,
+        "stages": timer.stages,
+    }
+
+
+def git_commit() -> Optional[str]:
+    """当前提交，工作区有未提交的修改时加上 -dirty"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+
+def print_results(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    print(f"提交: {report['commit']}  行数: {report['rows']}  运行次数: {report['repeat']}")
+    for source_type, stats in report["results"].items():
+        line = (
+            f"{source_type:<7} {stats['records']:>7} 条  最快 {stats['seconds_best']:7.3f}s  "
+            f"{stats['records_per_second']:>10.0f} 条/s  {stats['mb_per_second']:6.2f} MB/s  "
+            f"峰值内存 {stats['peak_memory_bytes'] / 1024 / 1024:7.1f} MB"
+        )
+        previous = (baseline or {}).get("results", {}).get(source_type)
+        if previous:
+            speedup = stats["records_per_second"] / previous["records_per_second"]
+            memory = stats["peak_memory_bytes"] / previous["peak_memory_bytes"]
+            line += f"  对比 {baseline.get('commit')}: 吞吐量 {speedup:.2f}x, 内存 {memory:.2f}x"
+        print(line)
+        print(f"        各阶段（计时运行共 {stats['instrumented_seconds']:.3f}s）:")
+        for name, stage in stats["stages"].items():
+            print(f"          {name:<22} {stage['calls']:>7} 次  {stage['seconds']:8.3f}s")
+
+
+def run(
+    sources: Sequence[str],
+    rows: int,
+    cmb_rows: int,
+    repeat: int,
+    cmb_workers: Optional[int] = None,
+    seed: int = 1,
+    log: Callable[[str], None] = print
+) -> Dict[str, Any]:
+    """生成各来源的模拟账单并测量，返回结果报告"""
+    if cmb_workers is None:
+        cmb_workers = settings.CMB_PARSE_WORKERS
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "rows": rows,
+        "cmb_rows": cmb_rows,
+        "repeat": repeat,
+        "cmb_workers": cmb_workers,
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="parser-bench-") as temp_dir:
+        for source_type in sources:
+            generate, extension = GENERATORS[source_type]
+            path = generate(os.path.join(temp_dir, source_type + extension), cmb_rows if source_type == "cmb" else rows, seed)
+            log(f"测量 {source_type} ...")
+            report["results"][source_type] = benchmark_source(source_type, path, repeat, cmb_workers)
+    return report
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="解析器性能基准")
+    parser.add_argument("--sources", nargs="+", choices=list(GENERATORS), default=list(GENERATORS), help="测量的来源")
+    parser.add_argument("--rows", type=int, default=10000, help="支付宝、京东账单的行数")
+    parser.add_argument("--cmb-rows", type=int, default=2000, help="招商银行账单的行数，PDF 解析较慢")
+    parser.add_argument("--repeat", type=int, default=3, help="测量吞吐量的运行次数")
+    parser.add_argument("--cmb-workers", type=int, help="招商银行PDF提取的进程数，默认读取 CMB_PARSE_WORKERS")
+    parser.add_argument("--seed", type=int, default=1, help="生成账单的随机种子")
+    parser.add_argument("--output", help="结果文件，默认 benchmarks/results/<提交>.json")
+    parser.add_argument("--compare", help="与之前的结果文件对比")
+    args = parser.parse_args()
+
+    # 解析过程中的逐行日志不计入耗时
+    logging.disable(logging.WARNING)
+
+    report = run(args.sources, args.rows, args.cmb_rows, args.repeat, args.cmb_workers, args.seed)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{report['commit'] or 'unknown'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    baseline = json.loads(Path(args.compare).read_text(encoding="utf-8")) if args.compare else None
+    print_results(report, baseline)
+    print(f"结果已写入 {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -63,6 +63,7 @@ CREATE TABLE bills (
     transaction_type VARCHAR(50), -- '收入', '支出', '不计收支'
     payment_method VARCHAR(100),
     category_id INTEGER REFERENCES bill_categories(id),
+    upload_id INTEGER, -- 创建该账单的上传记录
     
     -- 源数据字段（JSON格式存储原始数据）
     raw_data JSONB,
@@ -84,23 +85,52 @@ CREATE TABLE upload_records (
     user_id INTEGER REFERENCES users(id),
     filename VARCHAR(255) NOT NULL,
     file_size INTEGER,
+    file_hash VARCHAR(64), -- 文件内容的 SHA-256
     source_type VARCHAR(20),
     total_records INTEGER, -- 解析出的记录总数
     success_records INTEGER, -- 成功导入的记录数
     failed_records INTEGER, -- 失败的记录数
-    status VARCHAR(20) DEFAULT 'processing', -- 'processing', 'completed', 'failed'
+    created_records INTEGER, -- 新增的记录数
+    updated_records INTEGER, -- 更新的记录数
+    processed_records INTEGER DEFAULT 0, -- 已处理的记录数，用于进度查询
+    status VARCHAR(20) DEFAULT 'processing', -- 'processing', 'completed', 'partial_success', 'failed'
     error_message TEXT,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    errors JSON,
+    warnings JSON,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    processed_at TIMESTAMP -- 导入完成或失败的时间
 );
 
+-- 账单月度汇总表（导入、修改、删除账单时增量维护）
+CREATE TABLE bill_monthly_rollups (
+    id SERIAL PRIMARY KEY,
+    family_id INTEGER NOT NULL REFERENCES families(id) ON DELETE CASCADE,
+    month DATE NOT NULL, -- 当月第一天
+    source_type VARCHAR(20) NOT NULL,
+    category_id INTEGER NOT NULL DEFAULT 0, -- 0表示未分类
+    transaction_type VARCHAR(50) NOT NULL,
+    total_amount DECIMAL(14,2) NOT NULL DEFAULT 0,
+    bill_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(family_id, month, source_type, category_id, transaction_type)
+);
+
+-- 模糊搜索索引依赖 pg_trgm 扩展
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- 创建索引优化查询性能
 CREATE INDEX idx_bills_family_user ON bills(family_id, user_id);
-CREATE INDEX idx_bills_transaction_time ON bills(transaction_time);
+CREATE INDEX ix_bills_family_time_id ON bills(family_id, transaction_time DESC, id);
+CREATE INDEX ix_bills_family_source_time ON bills(family_id, source_type, transaction_time);
+CREATE INDEX ix_bills_family_source_order_id ON bills(family_id, source_type, (raw_data ->> 'order_id'), transaction_time);
+CREATE INDEX ix_bills_transaction_desc_trgm ON bills USING gin (transaction_desc gin_trgm_ops);
 CREATE INDEX idx_bills_source_type ON bills(source_type);
 CREATE INDEX idx_bills_amount ON bills(amount);
 CREATE INDEX idx_bills_category ON bills(category_id);
+CREATE INDEX ix_bills_upload_id ON bills(upload_id);
 CREATE INDEX idx_family_members_family_user ON family_members(family_id, user_id);
 CREATE INDEX idx_upload_records_family_user ON upload_records(family_id, user_id);
+CREATE INDEX idx_upload_records_family_hash ON upload_records(family_id, file_hash);
 
 -- 插入默认的账单分类
 INSERT INTO bill_categories (family_id, category_name, color, icon) VALUES 
@@ -139,8 +169,9 @@ CREATE TRIGGER update_bills_updated_at BEFORE UPDATE ON bills
 -- 添加一些约束检查
 ALTER TABLE bills ADD CONSTRAINT check_amount_not_zero CHECK (amount != 0);
 ALTER TABLE bills ADD CONSTRAINT check_source_type CHECK (source_type IN ('alipay', 'jd', 'cmb'));
+ALTER TABLE bills ADD CONSTRAINT bills_upload_id_fkey FOREIGN KEY (upload_id) REFERENCES upload_records(id) ON DELETE SET NULL;
 ALTER TABLE family_members ADD CONSTRAINT check_role CHECK (role IN ('admin', 'member', 'viewer'));
-ALTER TABLE upload_records ADD CONSTRAINT check_status CHECK (status IN ('processing', 'completed', 'failed'));
+ALTER TABLE upload_records ADD CONSTRAINT check_status CHECK (status IN ('processing', 'completed', 'partial_success', 'failed'));
 
 -- 添加注释
 COMMENT ON TABLE users IS '用户表，存储系统用户信息';
@@ -143,11 +143,13 @@ export const BillService = {
 
 // 文件上传服务
 export const UploadService = {
-  uploadFile: async (file: File, familyId: number): Promise<ApiResponse<UploadResponse>> => {
+  uploadFile: async (file: File, familyId: number, background = false): Promise<ApiResponse<UploadResponse>> => {
     const formData = new FormData();
     formData.append('file', file);
     formData.append('family_id', familyId.toString());
     formData.append('auto_categorize', 'true');
+    // 后台导入：立即返回 upload_id，通过 getUploadRecord 轮询进度
+    formData.append('background', background ? 'true' : 'false');
     
     const response = await ApiClient.post<UploadResponse>('/upload/', formData, {
       headers: {
@@ -162,6 +164,11 @@ export const UploadService = {
     return response;
   },
 
+  async getUploadRecord(id: number): Promise<ApiResponse<UploadRecord>> {
+    const response = await ApiClient.get<UploadRecord>(`${API_ENDPOINTS.UPLOAD.BASE}/${id}`);
+    return response;
+  },
+
   async deleteUploadRecord(id: number): Promise<void> {
     await ApiClient.delete(`${API_ENDPOINTS.UPLOAD.BASE}/${id}`);
   },
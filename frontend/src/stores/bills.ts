@@ -22,6 +22,10 @@ interface BillsState {
     pages: number;
   };
   queryParams: BillQueryParams;
+  // 游标分页: 页码 -> 获取该页使用的游标
+  pageCursors: Record<number, string>;
+  // 生成游标时的筛选条件，条件变化后游标失效
+  cursorKey: string;
   isLoading: boolean;
   error: string | null;
 }
@@ -52,6 +56,12 @@ interface BillsActions {
   resetState: () => void;
 }
 
+// 除页码外的查询条件，用于判断游标是否仍然有效
+const getCursorKey = (params: BillQueryParams): string => {
+  const { page: _page, cursor: _cursor, use_cursor: _useCursor, ...rest } = params;
+  return JSON.stringify(rest);
+};
+
 const initialQueryParams: BillQueryParams = {
   page: 1,
   size: 20,
@@ -73,6 +83,8 @@ export const useBillsStore = create<BillsState & BillsActions>((set, get) => ({
     pages: 0,
   },
   queryParams: initialQueryParams,
+  pageCursors: {},
+  cursorKey: '',
   isLoading: false,
   error: null,
 
@@ -82,7 +94,20 @@ export const useBillsStore = create<BillsState & BillsActions>((set, get) => ({
       set({ isLoading: true, error: null });
       
       const queryParams = params || get().queryParams;
-      const response = await BillService.getBills(queryParams);
+      const page = queryParams.page || 1;
+      const cursorKey = getCursorKey(queryParams);
+      const pageCursors = cursorKey === get().cursorKey ? get().pageCursors : {};
+
+      // 首页和顺序翻页使用游标分页，直接跳页时退回页码分页
+      let requestParams: BillQueryParams = queryParams;
+      if (page === 1) {
+        requestParams = { ...queryParams, use_cursor: true };
+      } else if (pageCursors[page]) {
+        requestParams = { ...queryParams, cursor: pageCursors[page] };
+      }
+
+      const response = await BillService.getBills(requestParams);
+      const nextCursor = response.data.next_cursor;
       
       set({
         bills: response.data.items,
@@ -93,6 +118,8 @@ export const useBillsStore = create<BillsState & BillsActions>((set, get) => ({
           pages: response.data.pages,
         },
         queryParams,
+        pageCursors: nextCursor ? { ...pageCursors, [page + 1]: nextCursor } : pageCursors,
+        cursorKey,
         isLoading: false,
       });
     } catch (error: any) {
@@ -296,6 +323,8 @@ export const useBillsStore = create<BillsState & BillsActions>((set, get) => ({
         pages: 0,
       },
       queryParams: initialQueryParams,
+      pageCursors: {},
+      cursorKey: '',
       error: null,
     });
   },
@@ -86,10 +86,18 @@ export interface UploadRecord {
   file_size: number;
   source_type: 'alipay' | 'jd' | 'cmb';
   records_count: number;
-  status: 'pending' | 'processing' | 'completed' | 'failed';
+  status: 'pending' | 'processing' | 'completed' | 'partial_success' | 'failed';
   error_message?: string;
   uploaded_at: string;
   processed_at?: string;
+  total_records?: number | null;
+  processed_records?: number;
+  success_count?: number;
+  created_count?: number;
+  updated_count?: number;
+  failed_count?: number;
+  errors?: string[];
+  warnings?: string[];
 }
 
 // API响应类型
@@ -105,6 +113,7 @@ export interface PaginatedResponse<T> {
   page: number;
   size: number;
   pages: number;
+  next_cursor?: string | null;
 }
 
 // 查询参数类型
@@ -121,6 +130,8 @@ export interface BillQueryParams {
   search?: string;
   sort_by?: string;
   sort_order?: 'asc' | 'desc';
+  use_cursor?: boolean;
+  cursor?: string;
 }
 
 // 统计数据类型
@@ -0,0 +1,29 @@
+"""测试辅助：限制一段代码执行的SQL语句数"""
+
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from sqlalchemy import event
+
+
+@contextmanager
+def assert_query_budget(engine, max_queries: int) -> Iterator[List[str]]:
+    """
+    断言上下文内通过 engine 执行的SQL语句不超过 max_queries 条
+
+    返回执行的语句列表，超出预算时在断言信息中列出所有语句，便于找出循环中的逐条查询。
+    """
+    statements: List[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    assert len(statements) <= max_queries, (
+        f"执行了 {len(statements)} 条SQL，超过预算 {max_queries} 条:\n" + "\n".join(statements)
+    )
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""测试支付宝账单解析器的按列批量处理"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from datetime import datetime
+from decimal import Decimal
+from io import BytesIO, StringIO
+
+import pandas as pd
+
+from parsers.alipay_parser import AlipayParser
+from parsers.base_parser import ParseResult
+
+CONTENT = """记录时间,分类,收支类型,金额,备注,账户,来源,标签
+2025-01-01 10:00:00,餐饮,支出,12.50,商户-午饭,花呗,手动,
+2025/01/02 11:00,交通,,3.00,地铁：刷卡,,,
+2025-01-03 12:00:00,工资,收入,0,工资,,,月度
+2025年01月04日,购物,不计收支,7,,余额宝,,
+2025-01-05 10:00:00,,,8,,,,
+"""
+
+
+def parse(method):
+    df = pd.read_csv(StringIO(CONTENT)).dropna(how="all")
+    result = ParseResult()
+    method(df, result)
+    return result
+
+
+def test_columns_match_rows():
+    """按列处理与逐行处理的结果完全一致"""
+    parser = AlipayParser()
+    by_columns = parse(parser._parse_columns)
+    by_rows = parse(parser._parse_rows)
+
+    assert by_columns.success_records == by_rows.success_records
+    assert by_columns.failed_count == by_rows.failed_count == 0
+
+
+def test_column_values():
+    records = parse(AlipayParser()._parse_columns).success_records
+
+    assert [record.get("transaction_type") for record in records] == ["支出", "交通", "收入", "不计收支", None]
+    assert records[0]["amount"] == Decimal("12.5")
+    assert records[0]["merchant_name"] == "商户"
+    assert records[0]["transaction_desc"] == "商户-午饭 | 来源: 手动"
+    # 非常用格式的时间逐条解析
+    assert records[1]["transaction_time"] == datetime(2025, 1, 2, 11, 0)
+    assert records[3]["transaction_time"] == datetime(2025, 1, 4)
+    # 金额为0与原逐行处理一致，视为缺失
+    assert "amount" not in records[2]
+
+
+def test_parse_file_object():
+    """直接解析GBK编码的二进制文件对象，跳过说明文字，且不关闭调用方的文件对象"""
+    source = BytesIO(("支付宝记账导出\n导出时间: 2025-01-06\n" + CONTENT).encode("gbk"))
+
+    from_file = AlipayParser().parse_file(source)
+
+    assert not source.closed
+    assert from_file.success_records == AlipayParser().parse_content(CONTENT).success_records
+    assert from_file.success_count == 5
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""测试用户和家庭成员关系缓存"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from typing import List
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import models  # noqa: F401  注册所有模型
+from api import auth, deps, families
+from api.auth import create_access_token, get_current_user
+from api.deps import get_current_family_ids
+from config.database import Base, get_db
+from models.family import Family, FamilyMember
+from models.user import User
+
+
+@pytest.fixture
+def client(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'auth.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+
+    db = session_factory()
+    user = User(username="cache_user", email="cache@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    family = Family(family_name="f", created_by=user.id)
+    db.add(family)
+    db.flush()
+    db.add(FamilyMember(family_id=family.id, user_id=user.id, role="admin"))
+    db.commit()
+    db.close()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app = FastAPI()
+    app.include_router(families.router)
+
+    @app.get("/me")
+    def me(
+        current_user: User = Depends(get_current_user),
+        user_family_ids: List[int] = Depends(get_current_family_ids)
+    ):
+        # 缓存的用户快照合并到请求会话后，关系属性仍可以延迟加载
+        return {
+            "username": current_user.username,
+            "family_ids": user_family_ids,
+            "memberships": len(current_user.family_memberships),
+        }
+
+    app.dependency_overrides[get_db] = override_get_db
+    auth._user_cache.clear()
+    deps._family_ids_cache.clear()
+
+    with TestClient(app, headers={"Authorization": f"Bearer {create_access_token({'sub': 'cache_user'})}"}) as test_client:
+        yield test_client, statements
+
+    auth._user_cache.clear()
+    deps._family_ids_cache.clear()
+    engine.dispose()
+
+
+def _lookups(statements):
+    """认证相关的查询：按用户名查用户、按用户查所属家庭"""
+    return [
+        s for s in statements
+        if "WHERE users.username" in s or "WHERE family_members.user_id" in s
+    ]
+
+
+def test_user_and_families_cached(client):
+    test_client, statements = client
+
+    first = test_client.get("/me")
+    assert first.status_code == 200
+    assert len(_lookups(statements)) == 2
+
+    statements.clear()
+    second = test_client.get("/me")
+    assert second.json() == first.json() == {"username": "cache_user", "family_ids": [1], "memberships": 1}
+    assert _lookups(statements) == []
+
+
+def test_family_changes_invalidate_membership(client):
+    test_client, _ = client
+    assert test_client.get("/me").json()["family_ids"] == [1]
+
+    created = test_client.post("/families/", json={"family_name": "new"})
+    assert created.status_code == 200
+    new_family_id = created.json()["id"]
+    assert test_client.get("/me").json()["family_ids"] == [1, new_family_id]
+
+    assert test_client.delete(f"/families/{new_family_id}").status_code == 200
+    assert test_client.get("/me").json()["family_ids"] == [1]
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""测试基准用的模拟账单生成器和测量脚本"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from benchmarks import run
+from benchmarks.generators import write_alipay_statement, write_cmb_statement, write_jd_statement
+from parsers import AlipayParser, CMBParser, JDParser
+from utils.encoding import detect_encoding
+
+
+def test_generated_statements_parse_completely(tmp_path):
+    alipay = write_alipay_statement(tmp_path / "alipay.csv", 120)
+    jd = write_jd_statement(tmp_path / "jd.csv", 120)
+    cmb = write_cmb_statement(tmp_path / "cmb.pdf", 40, rows_per_page=30)
+
+    with open(alipay, "rb") as f:
+        assert detect_encoding(f.read()) == "gb18030"
+
+    for parser, path, rows in [(AlipayParser(), alipay, 120), (JDParser(), jd, 120), (CMBParser(max_workers=1), cmb, 40)]:
+        result = parser.parse_file(path)
+        assert result.success_count == rows and result.failed_count == 0, (path, result.errors)
+
+    # 京东账单包含退款标注的金额
+    with open(jd, encoding="utf-8") as f:
+        content = f.read()
+    assert "(已退款" in content and "(已全额退款)" in content
+
+
+def test_same_seed_generates_same_file(tmp_path):
+    first = write_jd_statement(tmp_path / "a.csv", 50, seed=3)
+    second = write_jd_statement(tmp_path / "b.csv", 50, seed=3)
+    with open(first, "rb") as a, open(second, "rb") as b:
+        assert a.read() == b.read()
+
+
+def test_run_reports_throughput_memory_and_stages():
+    report = run.run(["jd", "cmb"], rows=200, cmb_rows=40, repeat=1, cmb_workers=1, log=lambda message: None)
+
+    jd = report["results"]["jd"]
+    assert jd["records"] == 200 and jd["failed"] == 0
+    assert jd["records_per_second"] > 0 and jd["peak_memory_bytes"] > 0
+    assert jd["stages"]["_parse_line"]["calls"] == 200
+    assert report["results"]["cmb"]["stages"]["_extract_all_pages"]["calls"] == 1
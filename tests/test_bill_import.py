@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""测试账单导入服务：京东去重索引、批量写入和分类解析"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from config.database import Base
+import models  # noqa: F401  注册所有模型
+from models.bill import Bill, BillCategory
+from services.bill_import import JDBillIndex, CategoryResolver, bulk_insert_bills, invalidate_category_cache
+
+
+def make_bill(order_id, transaction_time, amount, desc, family_id=1):
+    return Bill(
+        family_id=family_id,
+        source_type="jd",
+        transaction_time=transaction_time,
+        amount=amount,
+        transaction_type="支出",
+        transaction_desc=desc,
+        raw_data={"order_id": order_id} if order_id else {},
+    )
+
+
+def make_record(order_id, transaction_time, amount, desc):
+    return {
+        "transaction_time": transaction_time,
+        "amount": Decimal(amount),
+        "transaction_desc": desc,
+        "raw_data": {"order_id": order_id} if order_id else {},
+    }
+
+
+def test_exact_match_by_order_id():
+    """订单号+时间+金额精确匹配，金额按分比较"""
+    t = datetime(2025, 7, 5, 3, 31, 20)
+    bill = make_bill("A1", t, 12.5, "京东 - 商品")
+    index = JDBillIndex()
+    index.add(bill)
+
+    assert index.find(make_record("A1", t, "12.50", "其他描述")) is bill
+    assert index.find(make_record("A1", t, "12.51", "其他描述")) is None
+    assert index.find(make_record("A2", t + timedelta(seconds=1), "12.50", "其他描述")) is None
+
+
+def test_fuzzy_match_within_one_minute():
+    """无订单号时按时间±1分钟+金额+描述匹配"""
+    t = datetime(2025, 7, 5, 3, 31, 59)
+    bill = make_bill(None, t, 8.0, "京东小金库 - 收益")
+    index = JDBillIndex()
+    index.add(bill)
+
+    assert index.find(make_record(None, t + timedelta(seconds=60), "8.00", "京东小金库 - 收益")) is bill
+    assert index.find(make_record(None, t - timedelta(seconds=45), "8.00", "京东小金库 - 收益")) is bill
+    assert index.find(make_record(None, t + timedelta(seconds=61), "8.00", "京东小金库 - 收益")) is None
+    assert index.find(make_record(None, t, "8.00", "其他描述")) is None
+
+
+def test_remove_and_readd_after_update():
+    """账单更新后应按新值重新索引"""
+    t = datetime(2025, 7, 5, 12, 0, 0)
+    bill = make_bill("B1", t, 20.0, "desc")
+    index = JDBillIndex()
+    index.add(bill)
+
+    index.remove(bill)
+    bill.amount = 18.0
+    index.add(bill)
+
+    assert index.find(make_record("B1", t, "20.00", "other")) is None
+    assert index.find(make_record("B1", t, "18.00", "other")) is bill
+
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
+
+
+def test_load_only_queries_family_and_time_range():
+    """load 只加载同一家庭、京东来源、批次时间范围内的账单"""
+    db = make_session()
+
+    t = datetime(2025, 7, 5, 12, 0, 0)
+    in_range = make_bill("C1", t, 10.0, "desc")
+    other_family = make_bill("C1", t, 10.0, "desc", family_id=2)
+    out_of_range = make_bill("C2", t + timedelta(days=3), 10.0, "desc")
+    db.add_all([in_range, other_family, out_of_range])
+    db.commit()
+
+    records = [make_record("C1", t, "10.00", "desc"), make_record("C3", t + timedelta(hours=1), "1.00", "x")]
+    index = JDBillIndex.load(records, family_id=1, db=db)
+
+    assert index.find(records[0]).id == in_range.id
+    assert index.find(make_record("C2", t + timedelta(days=3), "10.00", "desc")) is None
+    db.close()
+
+
+def test_bulk_insert_assigns_ids_and_isolates_failures():
+    """批量插入回填id，出错的记录被二分隔离，其余记录正常写入"""
+    db = make_session()
+    t = datetime(2025, 7, 5, 12, 0, 0)
+    bills = [make_bill(f"D{i}", t + timedelta(minutes=i), 1.0 + i, f"desc{i}") for i in range(7)]
+    bills[4].transaction_type = None  # 违反非空约束
+
+    failures = bulk_insert_bills(db, bills, chunk_size=3)
+    db.commit()
+
+    assert [failed for failed, _ in failures] == [bills[4]]
+    assert all(bill.id is not None for i, bill in enumerate(bills) if i != 4)
+    assert db.query(Bill).count() == 6
+    assert db.get(Bill, bills[6].id).transaction_desc == "desc6"
+    db.close()
+
+
+def test_category_resolver_creates_missing_in_one_batch():
+    """分类解析器复用已有分类，缺失分类批量创建且不提交事务"""
+    db = make_session()
+    invalidate_category_cache(1)
+    db.add(BillCategory(category_name="食品酒饮", family_id=1))
+    db.add(BillCategory(category_name="日用百货", family_id=2))
+    db.commit()
+
+    category_ids = CategoryResolver(1, db).resolve(["食品酒饮", "日用百货", "数码电器", "数码电器", None])
+
+    assert set(category_ids) == {"食品酒饮", "日用百货", "数码电器"}
+    assert db.query(BillCategory).filter(BillCategory.family_id == 1).count() == 3
+
+    # 回滚后新建分类消失，缓存不应残留未提交的分类ID
+    db.rollback()
+    assert set(CategoryResolver(1, db).resolve([])) == {"食品酒饮"}
+    db.close()
+
+
+def test_import_records_bill_created_and_updated_in_one_chunk_once(tmp_path):
+    """同一块内先新建、再被相同订单号的记录更新的京东账单，账单ID和月度汇总只计一次"""
+    from models.bill import BillMonthlyRollup
+    from parsers.jd_parser import JDParser
+    from services.upload_import import import_bills
+
+    path = tmp_path / "jd.csv"
+    path.write_text(
+        "交易时间\t,商户名称,交易说明,金额,收/付款方式,交易状态,收/支,交易分类,交易订单号,商家订单号,备注\n"
+        "2025-07-05 10:00:00\t,京东商城,商品A,20.00,白条,交易成功,支出,日用百货,ORDER1\t,M1\t, ,\n"
+        "2025-07-05 10:00:00\t,京东商城,商品A(已发货),20.00,白条,交易成功,支出,日用百货,ORDER1\t,M1\t, ,\n"
+        "2025-07-05 11:00:00\t,京东商城,商品B,8.00,白条,交易成功,支出,日用百货,ORDER2\t,M2\t, ,\n",
+        encoding="utf-8"
+    )
+    db = make_session()
+    result = import_bills(db, JDParser(), str(path), 1, 1, "jd", "jd.csv", auto_categorize=False)
+    db.commit()
+
+    bill_ids = [bill_id for (bill_id,) in db.query(Bill.id).order_by(Bill.id)]
+    assert len(bill_ids) == 2
+    assert result.created_bill_ids == bill_ids
+    assert (result.created_count, result.updated_count) == (2, 1)
+    rollup = db.query(BillMonthlyRollup).one()
+    assert (rollup.bill_count, float(rollup.total_amount)) == (2, 28.0)
+    db.close()
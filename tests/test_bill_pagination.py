@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""测试账单列表的游标分页"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import models  # noqa: F401  注册所有模型
+from api import auth, bills, deps
+from api.auth import create_access_token
+from api.bills import _encode_cursor, _decode_cursor
+from config.database import Base, get_db
+from models.bill import Bill
+from models.family import Family, FamilyMember
+from models.user import User
+
+
+def test_cursor_round_trip():
+    bill = Bill(id=42, transaction_time=datetime(2024, 1, 31, 23, 59, 30), amount=Decimal("12.50"))
+
+    cursor = _encode_cursor("transaction_time", "desc", bill)
+    assert _decode_cursor(cursor, "transaction_time", "desc") == (datetime(2024, 1, 31, 23, 59, 30), 42)
+
+    cursor = _encode_cursor("amount", "asc", bill)
+    assert _decode_cursor(cursor, "amount", "asc") == (12.5, 42)
+
+    # 与 Float 列比较的是浮点数本身，不是其二进制展开的 Decimal
+    bill.amount = 12.3
+    cursor = _encode_cursor("amount", "desc", bill)
+    value, _ = _decode_cursor(cursor, "amount", "desc")
+    assert type(value) is float and value == 12.3
+
+
+def test_cursor_rejects_mismatched_sort():
+    bill = Bill(id=1, transaction_time=datetime(2024, 1, 1), amount=Decimal("1.00"))
+    cursor = _encode_cursor("transaction_time", "desc", bill)
+
+    with pytest.raises(ValueError):
+        _decode_cursor(cursor, "transaction_time", "asc")
+    with pytest.raises(ValueError):
+        _decode_cursor(cursor, "amount", "desc")
+
+
+def test_cursor_rejects_garbage():
+    with pytest.raises(ValueError):
+        _decode_cursor("not-a-cursor", "transaction_time", "desc")
+
+
+@pytest.fixture
+def client(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bills.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+
+    db = session_factory()
+    user = User(username="page_user", email="page@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    family = Family(family_name="f", created_by=user.id)
+    db.add(family)
+    db.flush()
+    db.add(FamilyMember(family_id=family.id, user_id=user.id, role="admin"))
+    # 金额有并列值，且 12.3、0.1 等无法用二进制精确表示
+    for amount in [12.3, 12.3, 12.3, 0.1, 0.1, 7.77, 12.3, 0.3, 100.0, 0.1, 7.77]:
+        db.add(Bill(
+            family_id=family.id,
+            user_id=user.id,
+            transaction_time=datetime(2024, 1, 1),
+            amount=amount,
+            transaction_type="支出",
+            source_type="alipay",
+        ))
+    db.commit()
+    db.close()
+
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app = FastAPI()
+    app.include_router(bills.router)
+    app.dependency_overrides[get_db] = override_get_db
+    auth._user_cache.clear()
+    deps._family_ids_cache.clear()
+    yield TestClient(app, headers={"Authorization": f"Bearer {create_access_token({'sub': 'page_user'})}"})
+    auth._user_cache.clear()
+    deps._family_ids_cache.clear()
+    engine.dispose()
+
+
+@pytest.mark.parametrize("sort_order", ["asc", "desc"])
+def test_cursor_pages_through_amount_sort(client, sort_order):
+    params = {"sort_by": "amount", "sort_order": sort_order, "size": 2, "use_cursor": "true"}
+    expected = client.get("/bills/", params={**params, "size": 100}).json()["data"]["items"]
+
+    seen = []
+    for _ in range(len(expected)):
+        data = client.get("/bills/", params=params).json()["data"]
+        seen.extend(data["items"])
+        if not data["next_cursor"]:
+            break
+        params = {"sort_by": "amount", "sort_order": sort_order, "size": 2, "cursor": data["next_cursor"]}
+
+    assert len(expected) == 11
+    assert [item["id"] for item in seen] == [item["id"] for item in expected]
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""测试账单月度汇总的增量维护与重建"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from datetime import date, datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from config.database import Base
+import models  # noqa: F401  注册所有模型
+from models.bill import Bill, BillMonthlyRollup
+from services.bill_rollup import RollupDelta, rebuild_rollups
+
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
+
+
+def make_bill(transaction_time, amount, category_id=None, transaction_type="支出"):
+    return Bill(
+        family_id=1,
+        source_type="alipay",
+        transaction_time=transaction_time,
+        amount=amount,
+        transaction_type=transaction_type,
+        category_id=category_id,
+    )
+
+
+def rollup_rows(db):
+    return sorted(
+        (row.month, row.category_id, row.transaction_type, float(row.total_amount), row.bill_count)
+        for row in db.query(BillMonthlyRollup).all()
+    )
+
+
+def test_delta_upsert_accumulates():
+    """多次写入同一汇总键时累加金额和笔数"""
+    db = make_session()
+
+    delta = RollupDelta()
+    delta.add(make_bill(datetime(2025, 1, 5), 10.5))
+    delta.add(make_bill(datetime(2025, 1, 20), 4.5))
+    delta.add(make_bill(datetime(2025, 2, 1), 3.0, category_id=7))
+    delta.apply(db)
+
+    delta.add(make_bill(datetime(2025, 1, 31, 23, 59), 1.0))
+    delta.apply(db)
+
+    assert rollup_rows(db) == [
+        (date(2025, 1, 1), 0, "支出", 16.0, 3),
+        (date(2025, 2, 1), 7, "支出", 3.0, 1),
+    ]
+
+
+def test_delta_moves_bill_between_keys_and_drops_empty_rows():
+    """修改账单时先扣旧值再加新值，笔数归零的汇总行被删除"""
+    db = make_session()
+    bill = make_bill(datetime(2025, 1, 5), 10.0)
+
+    delta = RollupDelta()
+    delta.add(bill)
+    delta.apply(db)
+
+    delta.remove(bill)
+    bill.transaction_time = datetime(2025, 3, 5)
+    bill.category_id = 2
+    delta.add(bill)
+    delta.apply(db)
+
+    assert rollup_rows(db) == [(date(2025, 3, 1), 2, "支出", 10.0, 1)]
+
+
+def test_unchanged_update_writes_nothing():
+    """金额和维度都未变化的更新不产生写入"""
+    bill = make_bill(datetime(2025, 1, 5), 10.0)
+
+    delta = RollupDelta()
+    delta.remove(bill)
+    delta.add(bill)
+
+    assert delta.rows() == []
+
+
+def test_rebuild_matches_bills():
+    """重建结果与账单明细一致，并覆盖已有的错误汇总"""
+    db = make_session()
+    db.add_all([
+        make_bill(datetime(2025, 1, 5), 10.0),
+        make_bill(datetime(2025, 1, 6), 5.0),
+        make_bill(datetime(2025, 1, 7), 100.0, transaction_type="收入"),
+    ])
+    db.add(BillMonthlyRollup(
+        family_id=1, month=date(2024, 12, 1), source_type="alipay",
+        category_id=0, transaction_type="支出", total_amount=1, bill_count=1
+    ))
+    db.flush()
+
+    rebuild_rollups(db)
+
+    assert rollup_rows(db) == [
+        (date(2025, 1, 1), 0, "支出", 15.0, 2),
+        (date(2025, 1, 1), 0, "收入", 100.0, 1),
+    ]
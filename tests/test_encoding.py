@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""测试账单文件的编码检测"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import codecs
+from io import BytesIO
+
+from utils.encoding import detect_encoding, open_text
+
+TEXT = "交易时间,商户名称,金额\n2025-07-05 10:00:00,京东商城,1.50\n"
+
+
+def test_detect_encoding_by_bom():
+    assert detect_encoding(codecs.BOM_UTF8 + TEXT.encode("utf-8")) == "utf-8-sig"
+    assert detect_encoding(TEXT.encode("utf-16")) == "utf-16"
+
+
+def test_detect_encoding_by_strict_decode():
+    assert detect_encoding(TEXT.encode("utf-8")) == "utf-8"
+    assert detect_encoding(TEXT.encode("gbk")) == "gb18030"
+    assert detect_encoding(b"\xff\xff\xff") is None
+
+
+def test_detect_encoding_ignores_truncated_sample():
+    """样本末尾截断了多字节字符时，只有在样本不是完整文件的情况下才视为可解码"""
+    sample = TEXT.encode("utf-8")[:-len("0\n") - 1] + "京".encode("utf-8")[:2]
+
+    assert detect_encoding(sample, complete=False) == "utf-8"
+    assert detect_encoding(sample, encodings=("utf-8",), complete=True) is None
+
+
+def test_open_text_detects_non_ascii_after_long_ascii_prefix(tmp_path):
+    """开头数KB都是ASCII的GBK文件，按样本检测为GB18030，之后的中文可以正常解码"""
+    content = "# export\n" * 500 + TEXT
+    path = tmp_path / "bill.csv"
+    path.write_bytes(content.encode("gbk"))
+
+    with open_text(str(path)) as (encoding, text):
+        assert encoding == "gb18030"
+        assert text.read() == content
+
+
+def test_open_text_file_object_not_closed():
+    source = BytesIO(codecs.BOM_UTF8 + TEXT.encode("utf-8"))
+    source.seek(5)
+
+    with open_text(source) as (encoding, text):
+        assert encoding == "utf-8-sig"
+        assert text.read() == TEXT
+
+    assert not source.closed
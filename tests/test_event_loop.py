@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""测试同步导入期间事件循环不被阻塞"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import threading
+import time
+
+from fastapi import Depends
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import main
+from api import upload as upload_api
+from api.auth import get_current_user
+from config.database import Base, get_db
+from config.settings import settings
+from models.family import Family, FamilyMember
+from models.user import User
+from parsers.jd_parser import JDParser
+from services.upload_jobs import UploadJobQueue
+
+# 模拟的解析耗时（秒）
+PARSE_SECONDS = 1.0
+
+JD_CONTENT = (
+    "交易时间\t,商户名称,交易说明,金额,收/付款方式,交易状态,收/支,交易分类,交易订单号,商家订单号,备注\n"
+    "2025-07-05 10:00:00\t,京东商城,商品,1.50,白条,交易成功,支出,日用百货,ORDER1\t,M1\t, ,\n"
+)
+
+
+def test_health_responsive_during_upload(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+
+    db = session_factory()
+    user = User(username="u", email="u@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    family = Family(family_name="f", created_by=user.id)
+    db.add(family)
+    db.flush()
+    db.add(FamilyMember(family_id=family.id, user_id=user.id, role="admin"))
+    db.commit()
+    user_id, family_id = user.id, family.id
+    db.close()
+
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    def override_get_current_user(session=Depends(get_db)):
+        return session.get(User, user_id)
+
+    parsing = threading.Event()
+
+    class SlowParser(JDParser):
+        """解析前阻塞线程，模拟耗时的解析"""
+
+        def iter_records(self, source, result):
+            parsing.set()
+            time.sleep(PARSE_SECONDS)
+            yield from super().iter_records(source, result)
+
+    monkeypatch.setattr(upload_api, "get_parser", lambda source_type: SlowParser())
+    monkeypatch.setattr(settings, "PARSE_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "LOG_FILE", str(tmp_path / "app.log"))
+    monkeypatch.setattr(main, "upload_job_queue", UploadJobQueue(max_workers=1, max_pending=1))
+    main.app.dependency_overrides[get_db] = override_get_db
+    main.app.dependency_overrides[get_current_user] = override_get_current_user
+
+    responses = {}
+    try:
+        with TestClient(main.app) as client:
+            def upload():
+                responses["upload"] = client.post(
+                    "/api/v1/upload/",
+                    files={"file": ("京东交易流水.csv", JD_CONTENT.encode("utf-8"), "text/csv")},
+                    data={"family_id": str(family_id)}
+                )
+
+            upload_thread = threading.Thread(target=upload)
+            upload_thread.start()
+            assert parsing.wait(5)
+
+            latencies = []
+            while upload_thread.is_alive() and len(latencies) < 5:
+                start = time.perf_counter()
+                response = client.get("/api/v1/health/")
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200
+            upload_thread.join()
+    finally:
+        main.app.dependency_overrides.clear()
+
+    assert responses["upload"].status_code == 200
+    assert responses["upload"].json()["created_count"] == 1
+    # 导入仍在进行时健康检查已经返回
+    assert latencies and max(latencies) < PARSE_SECONDS / 2
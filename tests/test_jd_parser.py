@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""测试京东账单解析器的流式解析"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from decimal import Decimal
+from io import BytesIO
+
+from parsers.base_parser import ParseResult
+from parsers.jd_parser import JDParser
+
+JD_HEADER = "交易时间\t,商户名称,交易说明,金额,收/付款方式,交易状态,收/支,交易分类,交易订单号,商家订单号,备注\n"
+
+
+def write_jd_file(tmp_path, rows, preamble=("京东账单明细", "导出时间: 2025-07-06")):
+    lines = [f"{line}\n" for line in preamble] + [JD_HEADER]
+    for i in range(rows):
+        lines.append(
+            f"2025-07-05 10:{i % 60:02d}:00\t,京东商城,商品{i},{i + 1}.50,白条,交易成功,支出,日用百货,"
+            f"ORDER{i}\t,M{i}\t, ,\n"
+        )
+    path = tmp_path / "jd.csv"
+    path.write_text("".join(lines), encoding="utf-8")
+    return str(path)
+
+
+def test_iter_batches_yields_fixed_size_chunks(tmp_path):
+    path = write_jd_file(tmp_path, 25)
+    result = ParseResult()
+
+    batches = list(JDParser().iter_batches(path, result, 10))
+
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    assert result.success_count == 25
+    assert result.success_records == []  # 流式解析不保存成功记录
+    assert batches[0][0]["amount"] == Decimal("1.50")
+    assert batches[2][-1]["order_id"] == "ORDER24"
+
+
+def test_parse_file_matches_parse_content(tmp_path):
+    path = write_jd_file(tmp_path, 5)
+    with open(path, encoding="utf-8") as f:
+        content = f.read()
+
+    from_file = JDParser().parse_file(path)
+    from_content = JDParser().parse_content(content)
+
+    assert from_file.success_records == from_content.success_records
+    assert from_file.success_count == from_content.success_count == 5
+
+
+def test_malformed_lines(tmp_path):
+    """缺少制表符的行被跳过，金额无法解析的记录不包含 amount 字段"""
+    path = write_jd_file(tmp_path, 2)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("没有制表符的行,1,2\n")
+        f.write("2025-07-05 11:00:00\t,京东商城,坏金额,abc,白条,交易成功,支出,日用百货,X1\t,X1\t, ,\n")
+
+    result = ParseResult()
+    records = list(JDParser().iter_records(path, result))
+
+    assert len(records) == 3
+    assert "amount" not in records[-1]
+    assert result.total_count == 3
+
+
+def test_missing_header(tmp_path):
+    path = tmp_path / "empty.csv"
+    path.write_text("京东账单明细\n没有数据\n", encoding="utf-8")
+
+    result = ParseResult()
+    assert list(JDParser().iter_records(str(path), result)) == []
+    assert result.errors == ["未找到有效的数据开始行"]
+
+
+def test_iter_records_from_file_object(tmp_path):
+    path = write_jd_file(tmp_path, 5)
+    with open(path, "rb") as f:
+        source = BytesIO(f.read())
+
+    result = ParseResult()
+    records = list(JDParser().iter_records(source, result))
+
+    assert not source.closed
+    assert records == JDParser().parse_file(path).success_records
+    assert result.success_count == 5
+
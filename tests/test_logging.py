@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""测试队列日志和高频日志采样"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import logging
+import queue
+
+from config import logging as app_logging
+from config.logging import DroppingQueueHandler, SamplingFilter, parse_log_sampling
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_record(name: str, lineno: int, level: int = logging.INFO) -> logging.LogRecord:
+    return logging.LogRecord(name, level, "upload_import.py", lineno, "跳过重复记录", None, None)
+
+
+def test_parse_log_sampling():
+    assert parse_log_sampling("services.upload_import=100, parsers=10,") == {
+        "services.upload_import": 100,
+        "parsers": 10,
+    }
+
+
+def test_sampling_keeps_initial_then_every_nth():
+    clock = FakeClock()
+    sampling = SamplingFilter({"services": 100}, initial=10, clock=clock)
+
+    kept = sum(sampling.filter(make_record("services.upload_import", 263)) for _ in range(10000))
+    # 前10条，之后每100条保留1条
+    assert kept == 10 + 99
+    assert sampling.dropped == 10000 - kept
+
+    # 其他位置、WARNING 级别、未配置的日志器不受影响
+    assert sampling.filter(make_record("services.upload_import", 335))
+    assert sampling.filter(make_record("services.upload_import", 263, logging.WARNING))
+    assert sampling.filter(make_record("api.bills", 263))
+
+    # 下一秒重新计数
+    clock.now += 1
+    assert sampling.filter(make_record("services.upload_import", 263))
+
+
+def test_full_queue_drops_records():
+    drops = []
+    handler = DroppingQueueHandler(queue.Queue(maxsize=2), on_drop=lambda: drops.append(1))
+
+    for i in range(5):
+        handler.handle(make_record("api.upload", i))
+
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3 and len(drops) == 3
+
+
+def test_listener_writes_log_file(tmp_path):
+    log_file = tmp_path / "app.log"
+    app_logging.setup_logging(log_level="INFO", log_file=str(log_file))
+    try:
+        root_logger = logging.getLogger()
+        assert [type(handler) for handler in root_logger.handlers] == [DroppingQueueHandler]
+
+        logging.getLogger("api.bills").info("通过队列写入")
+    finally:
+        # 停止监听线程时写完队列中的日志，之后根日志器直接写入文件
+        app_logging.shutdown_logging()
+
+    root_logger = logging.getLogger()
+    assert DroppingQueueHandler not in [type(handler) for handler in root_logger.handlers]
+    assert "通过队列写入" in log_file.read_text(encoding="utf-8")
+
+    for handler in root_logger.handlers:
+        handler.close()
+    root_logger.handlers.clear()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""测试监控指标注册表和 Prometheus 导出"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import json
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from core.metrics import HTTP_REQUEST_DURATION, MetricsRegistry
+from core.middleware import RequestLoggingMiddleware
+
+
+def test_render_histogram_and_counter():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "耗时", ("route",), buckets=(0.1, 1))
+    rows = registry.counter("rows_total", "记录数", ("source_type",))
+
+    latency.observe(0.05, route="/a")
+    latency.observe(0.5, route="/a")
+    latency.observe(3, route="/a")
+    rows.inc(5, source_type='jd"x')
+
+    text = registry.render()
+    assert '# TYPE latency_seconds histogram' in text
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'latency_seconds_sum{route="/a"} 3.55' in text
+    assert 'latency_seconds_count{route="/a"} 3' in text
+    assert 'rows_total{source_type="jd\\"x"} 5' in text
+
+
+def test_multiprocess_aggregation(tmp_path):
+    directory = str(tmp_path)
+
+    # 另外两个工作进程写入的指标文件：一个仍在运行（父进程），一个已退出
+    for pid, requests, in_progress in [(os.getppid(), 2, 1), (2 ** 22 + 1, 5, 3)]:
+        with open(os.path.join(directory, f"{pid}.json"), "w") as f:
+            json.dump({"requests_total": [[[], requests]], "in_progress": [[[], in_progress]]}, f)
+
+    # 当前进程，各进程注册相同的指标
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "请求数").inc(1)
+    registry.gauge("in_progress", "处理中").inc(1)
+    registry.enable_multiprocess(directory, flush_interval=60)
+    try:
+        text = registry.render()
+    finally:
+        registry.stop()
+
+    # 计数包括已退出的进程，当前值只计存活的进程
+    assert "requests_total 8" in text
+    assert "in_progress 2" in text
+    assert os.path.exists(os.path.join(directory, f"{os.getpid()}.json"))
+
+
+def test_request_metrics_use_route_template():
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: int):
+        if item_id == 0:
+            raise HTTPException(status_code=404, detail="不存在")
+        return {"id": item_id}
+
+    app.add_middleware(RequestLoggingMiddleware)
+    HTTP_REQUEST_DURATION.clear()
+
+    client = TestClient(app)
+    for item_id in (1, 2, 0):
+        client.get(f"/items/{item_id}")
+    client.get("/missing")
+
+    values = HTTP_REQUEST_DURATION.snapshot()
+    counts = {key: sum(value[:-1]) for key, value in values.items()}
+    assert counts == {
+        ("GET", "/items/{item_id}", "200"): 2,
+        ("GET", "/items/{item_id}", "404"): 1,
+        ("GET", "unmatched", "404"): 1,
+    }
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""测试纯 ASGI 中间件：响应头、流式响应透传"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from core.middleware import RateLimitMiddleware, RequestLoggingMiddleware, SecurityHeadersMiddleware
+
+
+def create_app(first_chunk_sent: asyncio.Event = None) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    def ping():
+        return {"ok": True}
+
+    @app.get("/export")
+    async def export():
+        async def rows():
+            yield b"a\n"
+            # 第一块数据到达客户端之后才生成后续数据，缓冲响应体的中间件会在这里卡住
+            if first_chunk_sent is not None:
+                await first_chunk_sent.wait()
+            yield b"b\n"
+
+        return StreamingResponse(rows(), media_type="text/csv")
+
+    app.add_middleware(SecurityHeadersMiddleware)
+    app.add_middleware(RequestLoggingMiddleware)
+    app.add_middleware(RateLimitMiddleware, calls=10, period=60)
+    return app
+
+
+def test_headers_added_by_each_middleware():
+    response = TestClient(create_app()).get("/ping")
+
+    assert response.status_code == 200
+    assert response.json() == {"ok": True}
+    assert len(response.headers["X-Request-ID"]) == 36
+    assert float(response.headers["X-Process-Time"]) >= 0
+    assert response.headers["X-Content-Type-Options"] == "nosniff"
+    assert response.headers["X-Frame-Options"] == "DENY"
+    assert response.headers["X-RateLimit-Remaining"] == "9"
+    assert "Strict-Transport-Security" not in response.headers
+
+
+def test_streaming_response_not_buffered():
+    async def run():
+        first_chunk_sent = asyncio.Event()
+        app = create_app(first_chunk_sent)
+        messages = []
+
+        requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            # 客户端保持连接直到响应结束
+            await asyncio.Event().wait()
+
+        async def send(message):
+            messages.append(message)
+            if message["type"] == "http.response.body" and message.get("body") == b"a\n":
+                first_chunk_sent.set()
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": "/export",
+            "raw_path": b"/export",
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"host", b"testserver")],
+            "client": ("127.0.0.1", 12345),
+            "server": ("testserver", 80),
+        }
+        await asyncio.wait_for(app(scope, receive, send), timeout=5)
+        return messages
+
+    messages = asyncio.run(run())
+    start = messages[0]
+    headers = {key.decode(): value.decode() for key, value in start["headers"]}
+    assert start["status"] == 200
+    assert "x-request-id" in headers and "x-ratelimit-limit" in headers
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    assert body == b"a\nb\n"
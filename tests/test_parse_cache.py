@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""测试按文件哈希缓存解析结果"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import pytest
+
+from parsers.base_parser import ParseResult
+from parsers.jd_parser import JDParser
+from services.parse_cache import ParseCache
+
+JD_HEADER = "交易时间\t,商户名称,交易说明,金额,收/付款方式,交易状态,收/支,交易分类,交易订单号,商家订单号,备注\n"
+
+
+def write_jd_file(tmp_path, rows):
+    lines = [JD_HEADER]
+    for i in range(rows):
+        lines.append(f"2025-07-05 10:{i % 60:02d}:00\t,京东商城,商品{i},{i + 1}.50,白条,交易成功,支出,日用百货,ORDER{i}\t,M{i}\t, ,\n")
+    lines.append("格式错误的行\n")
+    path = tmp_path / "jd.csv"
+    path.write_text("".join(lines), encoding="utf-8")
+    return str(path)
+
+
+class ExplodingParser(JDParser):
+    """缓存命中时不应再解析文件"""
+
+    def iter_batches(self, *args, **kwargs):
+        raise AssertionError("缓存命中时不应重新解析")
+
+
+class CountingParser(JDParser):
+    """统计解析文件的次数"""
+
+    calls = 0
+
+    def iter_batches(self, *args, **kwargs):
+        CountingParser.calls += 1
+        return super().iter_batches(*args, **kwargs)
+
+
+class BrokenParser(JDParser):
+    """产出第一批后解析出错"""
+
+    def iter_batches(self, *args, **kwargs):
+        batches = super().iter_batches(*args, **kwargs)
+        yield next(batches)
+        raise ValueError("解析出错")
+
+
+def collect(batches):
+    return [record for batch in batches for record in batch]
+
+
+def fail_after(cache, parser, path, batch_size, consumed):
+    """模拟导入读取 consumed 批后失败：缓存已解析的批次"""
+    result = ParseResult()
+    batches = cache.iter_batches(parser, path, result, batch_size, "jd-abc")
+    for _ in range(consumed):
+        next(batches)
+    cache.save(batches, result, "jd-abc")
+
+
+def test_cache_miss_parses_without_writing(tmp_path):
+    path = write_jd_file(tmp_path, 5)
+    cache = ParseCache(tmp_path / "cache")
+
+    result = ParseResult()
+    records = collect(cache.iter_batches(JDParser(), path, result, 2, "jd-abc"))
+
+    assert len(records) == 5
+    assert result.success_count == 5
+    assert list((tmp_path / "cache").iterdir()) == []
+
+
+def test_cached_batches_match_direct_parse(tmp_path):
+    path = write_jd_file(tmp_path, 25)
+    cache = ParseCache(tmp_path / "cache")
+
+    direct = ParseResult()
+    expected = collect(JDParser().iter_batches(path, direct, 10))
+
+    CountingParser.calls = 0
+    fail_after(cache, CountingParser(), path, 10, consumed=1)
+    # 失败后继续读完同一个解析过程，不重新解析文件
+    assert CountingParser.calls == 1
+
+    cached = ParseResult()
+    records = collect(cache.iter_batches(ExplodingParser(), path, cached, 10, "jd-abc"))
+
+    assert records == expected
+    assert (cached.total_count, cached.success_count, cached.failed_count) == (direct.total_count, direct.success_count, direct.failed_count)
+    assert cached.errors == direct.errors
+
+
+def test_cache_hit_skips_parsing(tmp_path):
+    path = write_jd_file(tmp_path, 5)
+    cache = ParseCache(tmp_path / "cache")
+    first = collect(JDParser().iter_batches(path, ParseResult(), 2))
+    fail_after(cache, JDParser(), path, 2, consumed=3)
+
+    result = ParseResult()
+    batches = cache.iter_batches(ExplodingParser(), path, result, 2, "jd-abc")
+    second = collect(batches)
+
+    assert second == first
+    assert result.success_count == 5
+    # 读取缓存时失败不再重复写入
+    cache.save(batches, result, "jd-abc")
+
+    cache.discard("jd-abc")
+    assert list((tmp_path / "cache").iterdir()) == []
+
+
+def test_parse_error_is_not_cached(tmp_path):
+    path = write_jd_file(tmp_path, 5)
+    cache = ParseCache(tmp_path / "cache")
+
+    result = ParseResult()
+    batches = cache.iter_batches(BrokenParser(), path, result, 2, "jd-abc")
+    with pytest.raises(ValueError):
+        collect(batches)
+    cache.save(batches, result, "jd-abc")
+
+    assert list((tmp_path / "cache").iterdir()) == []
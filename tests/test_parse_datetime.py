@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""测试解析器的日期时间格式识别与缓存"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from datetime import datetime
+
+from parsers.jd_parser import JDParser
+
+
+def test_parses_all_supported_formats():
+    parser = JDParser()
+    assert parser._parse_datetime("2025-07-05 03:31:20") == datetime(2025, 7, 5, 3, 31, 20)
+    assert parser._parse_datetime("2025/07/05 03:31") == datetime(2025, 7, 5, 3, 31)
+    assert parser._parse_datetime("2025年07月05日 03时31分20秒") == datetime(2025, 7, 5, 3, 31, 20)
+    assert parser._parse_datetime("2025-07-05") == datetime(2025, 7, 5)
+    assert parser._parse_datetime(" 2025-7-5 3:04:05 ") == datetime(2025, 7, 5, 3, 4, 5)
+
+
+def test_remembers_format_per_field():
+    parser = JDParser()
+    parser._parse_datetime("2025年07月05日", field="transaction_time")
+    parser._parse_datetime("2025/07/05 03:31", field="record_time")
+    assert parser._datetime_formats == {
+        "transaction_time": "%Y年%m月%d日",
+        "record_time": "%Y/%m/%d %H:%M",
+    }
+
+    # 格式变化时回退到完整格式列表，并更新缓存
+    assert parser._parse_datetime("2025-07-06 08:00:00") == datetime(2025, 7, 6, 8, 0, 0)
+    assert parser._datetime_formats["transaction_time"] == "%Y-%m-%d %H:%M:%S"
+
+
+def test_iso_fast_path_rejects_layouts_outside_format_list():
+    parser = JDParser()
+    # fromisoformat 能解析但不在支持格式中的写法，保持无法解析
+    assert parser._parse_datetime("2025-07-05T03:31:20") is None
+    assert parser._parse_datetime("2025-W27-6") is None
+    assert parser._parse_datetime("2025-02-30") is None
+    assert parser._parse_datetime("") is None
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""测试请求级SQL统计、N+1检测和查询预算"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from datetime import datetime
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+import models  # noqa: F401  注册所有模型
+from api import auth, bills, deps
+from api.auth import create_access_token
+from config.database import Base, get_db
+from config.settings import settings
+from core import db_instrumentation
+from core.db_instrumentation import instrument_engine, statement_shape, track_queries
+from core.middleware import RequestLoggingMiddleware
+from models.bill import Bill, BillCategory
+from models.family import Family, FamilyMember
+from models.user import User
+from query_budget import assert_query_budget
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'queries.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    instrument_engine(engine)
+    yield engine
+    engine.dispose()
+
+
+def _seed_categories(engine, count: int):
+    db = sessionmaker(bind=engine)()
+    user = User(username="query_user", email="query@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    family = Family(family_name="f", created_by=user.id)
+    db.add(family)
+    db.flush()
+    db.add(FamilyMember(family_id=family.id, user_id=user.id, role="admin"))
+    for i in range(count):
+        category = BillCategory(category_name=f"分类{i}", family_id=family.id)
+        db.add(category)
+        db.flush()
+        for _ in range(i % 3):
+            db.add(Bill(
+                family_id=family.id,
+                user_id=user.id,
+                category_id=category.id,
+                transaction_time=datetime(2024, 1, 1),
+                amount=1,
+                transaction_type="expense",
+                source_type="alipay",
+            ))
+    db.commit()
+    db.close()
+
+
+def test_statement_shape_collapses_in_lists():
+    assert statement_shape("SELECT *\n  FROM t WHERE id IN (?, ?, ?)") == "SELECT * FROM t WHERE id IN (?)"
+    assert statement_shape("SELECT * FROM t WHERE id IN (%(id_1_1)s, %(id_1_2)s)") == "SELECT * FROM t WHERE id IN (?)"
+    assert statement_shape("SELECT * FROM t WHERE id = $1") == "SELECT * FROM t WHERE id = $1"
+
+
+def test_categories_query_budget(engine):
+    _seed_categories(engine, 12)
+    session_factory = sessionmaker(bind=engine)
+
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app = FastAPI()
+    app.include_router(bills.router)
+    app.dependency_overrides[get_db] = override_get_db
+    auth._user_cache.clear()
+    deps._family_ids_cache.clear()
+
+    client = TestClient(app, headers={"Authorization": f"Bearer {create_access_token({'sub': 'query_user'})}"})
+    # 用户、所属家庭、分类、分组计数；账单数量不再按分类逐条查询
+    with assert_query_budget(engine, 4):
+        response = client.get("/bills/categories")
+
+    assert response.status_code == 200
+    counts = sorted(category["bills_count"] for category in response.json()["data"])
+    assert counts == sorted(i % 3 for i in range(12))
+
+    auth._user_cache.clear()
+    deps._family_ids_cache.clear()
+
+
+def test_assert_query_budget_lists_statements(engine):
+    with pytest.raises(AssertionError, match="超过预算 1 条"):
+        with assert_query_budget(engine, 1):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 2"))
+
+
+def test_request_headers_report_queries(engine):
+    app = FastAPI()
+
+    def get_connection():
+        with engine.connect() as conn:
+            yield conn
+
+    @app.get("/ping")
+    def ping(conn=Depends(get_connection)):
+        for i in range(3):
+            conn.execute(text("SELECT :i"), {"i": i})
+        return {"ok": True}
+
+    app.add_middleware(RequestLoggingMiddleware)
+    response = TestClient(app).get("/ping")
+
+    assert response.headers["X-DB-Queries"] == "3"
+    assert float(response.headers["X-DB-Time"]) >= 0
+
+
+def test_repeated_and_slow_queries_logged(engine, monkeypatch):
+    warnings = []
+    monkeypatch.setattr(
+        db_instrumentation.logger, "warning", lambda event, **kwargs: warnings.append((event, kwargs))
+    )
+    monkeypatch.setattr(settings, "N_PLUS_ONE_THRESHOLD", 5)
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 0)
+
+    with track_queries("req-1") as stats:
+        with engine.connect() as conn:
+            for i in range(5):
+                conn.execute(text("SELECT * FROM bills WHERE id = :id"), {"id": i})
+            conn.execute(text("SELECT * FROM bills WHERE id IN (1, 2)"))
+
+    assert stats.count == 6
+    slow = [kwargs for event, kwargs in warnings if event == "慢查询"]
+    assert len(slow) == 6 and all(kwargs["request_id"] == "req-1" for kwargs in slow)
+    repeated = [kwargs for event, kwargs in warnings if event == "疑似N+1查询"]
+    assert repeated == [{"request_id": "req-1", "count": 5, "statement": "SELECT * FROM bills WHERE id = ?"}]
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""测试令牌桶速率限制"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.auth import create_access_token
+from core.middleware import RateLimitMiddleware
+from core.rate_limit import MemoryRateLimitBackend, RateLimitBackend, SQLiteRateLimitBackend, parse_route_costs
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def consume(backend, key, cost=1):
+    return asyncio.run(backend.consume(key, cost))
+
+
+def test_token_bucket_refills_over_time():
+    clock = FakeClock()
+    backend = MemoryRateLimitBackend(capacity=3, refill_rate=1, clock=clock)
+
+    assert [consume(backend, "a").allowed for _ in range(4)] == [True, True, True, False]
+    assert consume(backend, "a").retry_after == 1
+
+    clock.now += 1.5
+    assert consume(backend, "a").allowed
+    assert not consume(backend, "a").allowed
+    # 其他客户端不受影响
+    assert consume(backend, "b", cost=3).allowed
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryRateLimitBackend(capacity=1, refill_rate=0.001, max_clients=2, clock=FakeClock())
+
+    consume(backend, "a")
+    consume(backend, "b")
+    consume(backend, "a")
+    consume(backend, "c")
+
+    assert len(backend) == 2
+    # a 仍在限制中；b 被淘汰，重新获得满桶
+    assert not consume(backend, "a").allowed
+    assert consume(backend, "b").allowed
+
+
+def test_sqlite_backend_shared_between_workers(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "rate_limit.db")
+    workers = [SQLiteRateLimitBackend(path, capacity=4, refill_rate=1, cleanup_interval=3, clock=clock) for _ in range(2)]
+
+    results = [consume(workers[i % 2], "a").allowed for i in range(5)]
+    assert results == [True, True, True, True, False]
+
+    # 空闲超过补满时间的桶在每个进程第 cleanup_interval 次检查时被清理
+    clock.now += 10
+    for _ in range(3):
+        consume(workers[0], "b")
+    rows = workers[0]._connection.execute("SELECT key FROM rate_limit_buckets").fetchall()
+    assert rows == [("b",)]
+
+    for worker in workers:
+        asyncio.run(worker.close())
+
+
+def test_backend_without_consume_cannot_be_created():
+    class IncompleteBackend(RateLimitBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        IncompleteBackend(capacity=1, refill_rate=1)
+
+
+def test_parse_route_costs():
+    costs = parse_route_costs("/api/v1=3, POST /api/v1/upload=10,/api/v1/upload=2")
+    assert costs == [("POST", "/api/v1/upload", 10), (None, "/api/v1/upload", 2), (None, "/api/v1", 3)]
+
+
+def test_middleware_route_costs_and_user_keys():
+    app = FastAPI()
+
+    @app.get("/api/v1/bills/")
+    def list_bills():
+        return {"ok": True}
+
+    @app.post("/api/v1/upload/")
+    def upload():
+        return {"ok": True}
+
+    app.add_middleware(
+        RateLimitMiddleware,
+        calls=10,
+        period=3600,
+        backend=MemoryRateLimitBackend(10, 10 / 3600),
+        route_costs="POST /api/v1/upload=6"
+    )
+    client = TestClient(app)
+    alice = {"Authorization": f"Bearer {create_access_token({'sub': 'alice'})}"}
+    bob = {"Authorization": f"Bearer {create_access_token({'sub': 'bob'})}"}
+
+    response = client.post("/api/v1/upload/", headers=alice)
+    assert response.status_code == 200
+    assert response.headers["X-RateLimit-Remaining"] == "4"
+
+    response = client.post("/api/v1/upload/", headers=alice)
+    assert response.status_code == 429
+    assert response.json()["error_code"] == "RATE_LIMIT_EXCEEDED"
+    assert int(response.headers["Retry-After"]) > 0
+
+    # 剩余的令牌仍可用于普通请求
+    assert client.get("/api/v1/bills/", headers=alice).status_code == 200
+    # 不同用户、未登录请求分别计数
+    assert client.post("/api/v1/upload/", headers=bob).status_code == 200
+    assert client.post("/api/v1/upload/").status_code == 200
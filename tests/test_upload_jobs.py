@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""测试后台导入任务与任务队列"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import threading
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from config.database import Base
+import models  # noqa: F401  注册所有模型
+from models.bill import Bill, BillMonthlyRollup
+from models.upload import UploadRecord
+from services import upload_jobs
+from services.upload_jobs import UploadJobQueue, run_upload_job
+
+JD_HEADER = "交易时间\t,商户名称,交易说明,金额,收/付款方式,交易状态,收/支,交易分类,交易订单号,商家订单号,备注\n"
+
+
+def make_session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+def create_upload(session_factory, source_type="jd"):
+    db = session_factory()
+    record = UploadRecord(family_id=1, user_id=1, filename="京东交易流水.csv", source_type=source_type, status="processing")
+    db.add(record)
+    db.commit()
+    upload_id = record.id
+    db.close()
+    return upload_id
+
+
+def write_jd_file(tmp_path, rows):
+    lines = [JD_HEADER]
+    for i in range(rows):
+        lines.append(f"2025-07-05 10:{i % 60:02d}:00\t,京东商城,商品{i},{i + 1}.50,白条,交易成功,支出,日用百货,ORDER{i}\t,M{i}\t, ,\n")
+    path = tmp_path / "upload.csv"
+    path.write_text("".join(lines), encoding="utf-8")
+    return str(path)
+
+
+def wait_until_idle(queue):
+    for _ in range(500):
+        if queue.active_count == 0:
+            return
+        threading.Event().wait(0.01)
+
+
+def test_job_imports_bills_and_completes_record(tmp_path):
+    session_factory = make_session_factory(tmp_path)
+    upload_id = create_upload(session_factory)
+    path = write_jd_file(tmp_path, 12)
+
+    run_upload_job(upload_id, path, session_factory=session_factory)
+
+    db = session_factory()
+    record = db.get(UploadRecord, upload_id)
+    assert record.status == "completed"
+    assert (record.total_records, record.success_records, record.created_records, record.failed_records) == (12, 12, 12, 0)
+    assert record.processed_at is not None
+    assert db.query(Bill).count() == 12
+    assert db.query(Bill).filter(Bill.upload_id == upload_id).count() == 12
+    assert sum(row.bill_count for row in db.query(BillMonthlyRollup)) == 12
+    assert not os.path.exists(path)
+
+
+def test_failed_job_rolls_back_bills(tmp_path, monkeypatch):
+    session_factory = make_session_factory(tmp_path)
+    upload_id = create_upload(session_factory)
+    path = write_jd_file(tmp_path, 3)
+
+    def broken_import(db, *args, **kwargs):
+        db.add(Bill(family_id=1, source_type="jd", transaction_time=datetime(2025, 1, 1), amount=1, transaction_type="支出"))
+        db.flush()
+        raise ValueError("磁盘已满")
+
+    monkeypatch.setattr(upload_jobs, "import_bills", broken_import)
+    run_upload_job(upload_id, path, session_factory=session_factory)
+
+    db = session_factory()
+    record = db.get(UploadRecord, upload_id)
+    assert record.status == "failed"
+    assert "磁盘已满" in record.error_message
+    assert db.query(Bill).count() == 0
+    assert not os.path.exists(path)
+
+
+def test_queue_rejects_jobs_beyond_capacity(tmp_path, monkeypatch):
+    release = threading.Event()
+    finished = []
+
+    def slow_job(upload_id, *args):
+        release.wait(5)
+        finished.append(upload_id)
+
+    monkeypatch.setattr(upload_jobs, "run_upload_job", slow_job)
+    queue = UploadJobQueue(max_workers=1, max_pending=1, session_factory=make_session_factory(tmp_path))
+
+    assert [queue.submit(upload_id, "unused.csv") for upload_id in (1, 2, 3)] == [True, True, False]
+    assert queue.active_count == 2
+
+    # 任务完成后释放名额
+    release.set()
+    wait_until_idle(queue)
+    assert sorted(finished) == [1, 2]
+    assert queue.submit(4, "unused.csv")
+    wait_until_idle(queue)
+    assert sorted(finished) == [1, 2, 4]
+    queue.shutdown()
+
+
+def test_shutdown_cancels_queued_jobs(tmp_path, monkeypatch):
+    session_factory = make_session_factory(tmp_path)
+    running_id, queued_id = create_upload(session_factory), create_upload(session_factory)
+    queued_path = tmp_path / "queued.csv"
+    queued_path.write_text("", encoding="utf-8")
+    started, release = threading.Event(), threading.Event()
+
+    def slow_job(upload_id, *args):
+        started.set()
+        release.wait(5)
+
+    monkeypatch.setattr(upload_jobs, "run_upload_job", slow_job)
+    queue = UploadJobQueue(max_workers=1, max_pending=1, session_factory=session_factory)
+    queue.submit(running_id, "unused.csv")
+    started.wait(5)
+    queue.submit(queued_id, str(queued_path))
+
+    queue.shutdown(wait=False)
+    release.set()
+
+    db = session_factory()
+    assert db.get(UploadRecord, queued_id).status == "failed"
+    assert db.get(UploadRecord, running_id).status == "processing"
+    assert not queued_path.exists()
+
+
+def test_find_upload_by_hash_ignores_unfinished_uploads(tmp_path):
+    from services.upload_import import find_upload_by_hash
+
+    db = make_session_factory(tmp_path)()
+    for status in ("processing", "failed"):
+        db.add(UploadRecord(family_id=1, user_id=1, filename="a.csv", source_type="jd", status=status, file_hash="abc"))
+    db.commit()
+    assert find_upload_by_hash(db, 1, "abc") is None
+
+    completed = UploadRecord(family_id=1, user_id=1, filename="a.csv", source_type="jd", status="completed", file_hash="abc")
+    db.add(completed)
+    db.commit()
+    assert find_upload_by_hash(db, 1, "abc").id == completed.id
+    db.close()
+
+
+def test_delete_upload_only_removes_its_own_bills(tmp_path):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from api import upload
+    from api.deps import get_current_family_ids
+    from config.database import get_db
+
+    session_factory = make_session_factory(tmp_path)
+    # 两次上传的文件同名、内容不同
+    first_id = create_upload(session_factory)
+    run_upload_job(first_id, write_jd_file(tmp_path, 5), session_factory=session_factory)
+    second_id = create_upload(session_factory)
+    lines = [JD_HEADER] + [
+        f"2025-08-01 09:{i:02d}:00\t,京东超市,牛奶{i},{i + 10}.00,白条,交易成功,支出,食品酒饮,OTHER{i}\t,N{i}\t, ,\n"
+        for i in range(3)
+    ]
+    other_path = tmp_path / "other.csv"
+    other_path.write_text("".join(lines), encoding="utf-8")
+    run_upload_job(second_id, str(other_path), session_factory=session_factory)
+
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app = FastAPI()
+    app.include_router(upload.router)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_family_ids] = lambda: [1]
+
+    response = TestClient(app).delete(f"/upload/{first_id}", params={"delete_bills": True})
+    assert response.status_code == 200
+    assert response.json()["deleted_bills"] == 5
+
+    db = session_factory()
+    assert db.query(Bill).count() == 3
+    assert db.query(Bill).filter(Bill.upload_id == second_id).count() == 3
+    assert sum(row.bill_count for row in db.query(BillMonthlyRollup)) == 3
+    db.close()
+
+
+def test_fail_stale_uploads_marks_interrupted_imports(tmp_path, monkeypatch):
+    from datetime import timedelta
+
+    monkeypatch.setattr(upload_jobs.settings, "UPLOAD_STALE_SECONDS", 3600)
+    session_factory = make_session_factory(tmp_path)
+    stale_id = create_upload(session_factory)
+    recent_id = create_upload(session_factory)
+    done_id = create_upload(session_factory)
+
+    db = session_factory()
+    db.get(UploadRecord, stale_id).created_at = datetime.now() - timedelta(hours=2)
+    done = db.get(UploadRecord, done_id)
+    done.created_at = datetime.now() - timedelta(hours=2)
+    done.status = "completed"
+    db.commit()
+    db.close()
+
+    assert upload_jobs.fail_stale_uploads(session_factory) == 1
+
+    db = session_factory()
+    stale = db.get(UploadRecord, stale_id)
+    assert stale.status == "failed"
+    assert stale.error_message and stale.processed_at is not None
+    assert db.get(UploadRecord, recent_id).status == "processing"
+    assert db.get(UploadRecord, done_id).status == "completed"
+    db.close()
+
+
+def test_failed_import_caches_parsed_batches_for_retry(tmp_path, monkeypatch):
+    from parsers.jd_parser import JDParser
+    from services import upload_import
+    from services.parse_cache import ParseCache
+
+    monkeypatch.setattr(upload_import, "parse_cache", ParseCache(tmp_path / "cache"))
+    monkeypatch.setattr(upload_import.settings, "IMPORT_BATCH_SIZE", 4)
+    session_factory = make_session_factory(tmp_path)
+    path = write_jd_file(tmp_path, 10)
+
+    # 第二块写入时失败
+    real_insert = upload_import.bulk_insert_bills
+    calls = []
+
+    def flaky_insert(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 2:
+            raise ValueError("连接中断")
+        return real_insert(*args, **kwargs)
+
+    monkeypatch.setattr(upload_import, "bulk_insert_bills", flaky_insert)
+    db = session_factory()
+    with pytest.raises(ValueError):
+        upload_import.import_bills(db, JDParser(), path, 1, 1, "jd", "upload.csv", file_hash="abc")
+    db.rollback()
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+
+    # 重试时读取缓存，不再解析文件
+    class ExplodingParser(JDParser):
+        def iter_batches(self, *args, **kwargs):
+            raise AssertionError("缓存命中时不应重新解析")
+
+    result = upload_import.import_bills(db, ExplodingParser(), path, 1, 1, "jd", "upload.csv", file_hash="abc")
+    assert (result.total_records, result.created_count) == (10, 10)
+    db.close()